@@ -12,9 +12,11 @@ from collections.abc import (
     Mapping, MutableSequence, Sequence, Set, Sized,
 )
 import functools
+import heapq
 import inspect
 import itertools
 import math
+import operator
 import os
 import pathlib
 import random
@@ -23,6 +25,7 @@ import struct
 from types import EllipsisType, FunctionType
 
 from .utils.abc import NonStrSequence
+from .utils.aggregators import Accumulator, Aggregation
 from .utils.argutils import (
     check_int, check_int_positive, check_int_positive_or_none,
     check_int_zero_or_positive, check_k_args, check_slice_args, replace,
@@ -30,16 +33,37 @@ from .utils.argutils import (
 from .utils.classutils import (
     classonlymethod, lazyattr, multimethod, partialclassmethod,
 )
-from .utils.collections import Seen
-from .utils.compareutils import MAXIMUM, MINIMUM
+from .utils.collections import RecentSeen
+from .utils.compareutils import MAXIMUM, MINIMUM, minmax
 from .utils.diceutils import DiceRoll
+from .utils.fileutils import (
+    check_atomic, check_compression, iter_chunks, iter_lines,
+    open_writer, PARTITION_BUFFER_SIZE, PARTITION_MAX_OPEN,
+    PARTITION_MAX_PENDING, READ_BUFFER_SIZE, resolve_compression,
+    write_batched, WRITE_BUFFER_SIZE, write_partitions,
+)
 from .utils.flatten import flatten
-from .utils.funcutils import multilambda
+from .utils.funcutils import attach, multilambda
+from .utils.joins import check_how, hash_join, merge_join, pair as join_pair
 from .utils.merge import merge
 from .utils.randutils import SHARED_RANDOM
 from .utils.sentinels import _DROP, _END, _KEEP, _MISSING, _POOL, Sentinel
-from .utils.structutils import calc_struct_input
+from .utils.sketches import BloomFilter, HyperLogLog, KLLSketch, SpaceSaving
+from .utils.spill import external_sort, spill_groups
+from .utils.statsutils import (
+    check_precision, check_quantile, exact_sum, fsum_variance,
+    mean as stats_mean, quantiles as exact_quantiles,
+    RunningStats, sqrt as stats_sqrt, variance as stats_variance,
+)
+from .utils.stringutils import conjoin_phrases
+from .utils.structutils import (
+    get_struct, iter_framed_unpack, iter_mmap_unpack, pack_items, record_view,
+)
 from .utils.walk import walk_collection
+from .utils.windows import (
+    chunks, rolling_max, rolling_mean, rolling_min,
+    rolling_sum, rolling_variance, windows,
+)
 
 
 __all__ = ('Pipe',)
@@ -75,6 +99,131 @@ class PlainSource:
         return self._source
 
 
+########################################################################
+# Optimizer rules
+#
+# Each rule accepts a pipe's source and a list of its steps, and returns a
+# rewritten list of steps, or `None` if the rule doesn't apply. Only steps
+# tagged with an `opcode` (see `attach`) are candidates for rewriting; any
+# other step is opaque and left alone.
+
+# Steps that only ever drop or reorder items, and thus keep a stream of
+# distinct items distinct.
+_DISTINCT_PRESERVING_OPCODES = frozenset({
+    'drop', 'dropwhile', 'filter', 'reject', 'reverse', 'reverse_take',
+    'slice', 'sort', 'take', 'takewhile', 'topk', 'unique', 'unique_approx',
+    'unique_window',
+})
+
+
+def _opcode(stage):
+    return getattr(stage, 'opcode', None)
+
+
+def _take_count(stage):
+    """
+    Return the number of leading items kept by a `take` step, or a `slice`
+    step equivalent to one; otherwise, return `None`.
+    """
+    match _opcode(stage):
+        case 'take':
+            return stage.n
+        case 'slice' if stage.start == 0 and stage.step == 1 and stage.stop is not None and stage.stop >= 0:
+            return stage.stop
+    return None
+
+
+def _rule_slice_before_map(source, steps):
+    for i, (a, b) in enumerate(itertools.pairwise(steps)):
+        if _opcode(a) == 'map' and _opcode(b) in {'drop', 'slice', 'take'}:
+            return [*steps[:i], b, a, *steps[i + 2:]]
+    return None
+
+
+def _rule_sort_take_topk(source, steps):
+    for i, (a, b) in enumerate(itertools.pairwise(steps)):
+        if _opcode(a) != 'sort' or (n := _take_count(b)) is None:
+            continue
+        p = Pipe()
+        p = p.nlargest(n, key=a.key) if a.reverse else p.nsmallest(n, key=a.key)
+        return [*steps[:i], *p._steps, *steps[i + 2:]]
+    return None
+
+
+def _rule_filter_fusion(source, steps):
+    for i, (a, b) in enumerate(itertools.pairwise(steps)):
+        if _opcode(a) == _opcode(b) == 'filter':
+            preds = (*a.preds, *b.preds)
+            # Chaining `filter` objects within a single step keeps the
+            # per-item cost in C, unlike combining the predicates into a
+            # single Python-level function.
+            @attach(opcode='filter', preds=preds)
+            def pipe_filter(res):
+                for pred in preds:
+                    res = builtins.filter(pred, res)
+                return res
+            return [*steps[:i], pipe_filter, *steps[i + 2:]]
+    return None
+
+
+def _rule_map_fusion(source, steps):
+    for i, (a, b) in enumerate(itertools.pairwise(steps)):
+        if _opcode(a) == _opcode(b) == 'map' and len(a.funcs) == len(b.funcs) == 1:
+            f, g = funcs = (*a.funcs, *b.funcs)
+            # Only pairs are fused; composing more functions requires an
+            # extra Python-level call per item, which costs more than it
+            # saves.
+            @attach(opcode='map', funcs=funcs)
+            def pipe_map(res):
+                return (g(f(item)) for item in res)
+            return [*steps[:i], pipe_map, *steps[i + 2:]]
+    return None
+
+
+def _rule_reverse_take_tail(source, steps):
+    for i, (a, b) in enumerate(itertools.pairwise(steps)):
+        if _opcode(a) != 'reverse' or (n := _take_count(b)) is None:
+            continue
+        @attach(opcode='reverse_take')
+        def pipe_reverse_take(res):
+            match res:
+                case Sequence():
+                    return reversed(res[builtins.max(len(res) - n, 0):])
+                case _:
+                    return reversed(collections.deque(res, maxlen=n))
+        return [*steps[:i], pipe_reverse_take, *steps[i + 2:]]
+    return None
+
+
+def _rule_redundant_unique(source, steps):
+    match source:
+        case PlainSource(_source=Set() | Mapping()):
+            distinct = True
+        case _:
+            distinct = getattr(source, 'distinct', False)
+    for i, step in enumerate(steps):
+        match _opcode(step):
+            case 'unique' if distinct and step.key is None:
+                return [*steps[:i], *steps[i + 1:]]
+            case 'unique':
+                # A keyed unique only makes the keys distinct, not the items.
+                distinct = step.key is None
+            case opcode if opcode not in _DISTINCT_PRESERVING_OPCODES:
+                distinct = False
+    return None
+
+
+_OPTIMIZER_RULES = {
+    'slice-before-map': _rule_slice_before_map,
+    'sort-take-topk': _rule_sort_take_topk,
+    'filter-fusion': _rule_filter_fusion,
+    'map-fusion': _rule_map_fusion,
+    'reverse-take-tail': _rule_reverse_take_tail,
+    'redundant-unique': _rule_redundant_unique,
+}
+_OPTIMIZER_RULE_NAMES = conjoin_phrases(_OPTIMIZER_RULES.keys(), conj='or', fmt=repr)
+
+
 class Pipe:
     """
     A fluent interface for processing iterable data.
@@ -112,6 +261,11 @@ class Pipe:
     Additionally, all sinks return partials if called as class methods,
     which accept a source and return its evaluation using that sink.
 
+    Before evaluation, a pipe's steps are passed through a rule-based
+    optimizer, which rewrites the step chain into a cheaper equivalent (for
+    example, fusing `.sort().take(k)` into a heap-based top-k). See
+    {py:attr}`Pipe.OPTIMIZER_RULES`.
+
     All of the following examples are equivalent:
 
     ```{ipython}
@@ -148,10 +302,37 @@ class Pipe:
     """
     A sentinel used in certain stages.
     """
+    OPTIMIZER_RULES = tuple(_OPTIMIZER_RULES)
+    """
+    The names of the rules applied by the pipe optimizer, in the order they
+    are tried:
+
+    - `'slice-before-map'`: Move {py:meth}`Pipe.take`, {py:meth}`Pipe.slice`,
+      and {py:meth}`Pipe.drop` ahead of a preceding {py:meth}`Pipe.map`, so
+      that discarded items are never mapped.
+    - `'sort-take-topk'`: Replace {py:meth}`Pipe.sort` followed by
+      {py:meth}`Pipe.take` with the heap-based {py:meth}`Pipe.nsmallest` or
+      {py:meth}`Pipe.nlargest`, using `O(k)` memory.
+    - `'filter-fusion'`: Merge consecutive {py:meth}`Pipe.filter` steps.
+    - `'map-fusion'`: Merge pairs of consecutive {py:meth}`Pipe.map` steps.
+    - `'reverse-take-tail'`: Replace {py:meth}`Pipe.reverse` followed by
+      {py:meth}`Pipe.take` with a reversed slice of the tail of a sequence
+      (or, for other iterables, a bounded deque).
+    - `'redundant-unique'`: Drop a {py:meth}`Pipe.unique` whose input is
+      already known to be distinct (e.g., a set, a mapping's keys, a range,
+      or the output of a prior {py:meth}`Pipe.unique`).
+
+    Rewrites never change a pipe's result, but rules that skip items (such
+    as `'slice-before-map'`) mean that functions with side effects may be
+    called fewer times. See {py:meth}`Pipe.disable_rules` and
+    {py:meth}`Pipe.explain`.
+    """
 
     def __init__(self, source=_MISSING, *, rng=_MISSING):
         self._source = source if source is _MISSING else PlainSource(source)
         self._steps = []
+        self._disabled_rules = frozenset()
+        self._precision = 'fast'
         if rng is not _MISSING:
             self._set_rng(rng)
 
@@ -229,9 +410,23 @@ class Pipe:
         p._steps.append(step)
         return p
 
+    def _optimize(self):
+        steps = self._steps
+        applied = []
+        rules = [(k, v) for k, v in _OPTIMIZER_RULES.items() if k not in self._disabled_rules]
+        while True:
+            for name, rule in rules:
+                if (new_steps := rule(self._source, steps)) is not None:
+                    steps = new_steps
+                    applied.append(name)
+                    break
+            else:
+                return (steps, tuple(applied))
+
     def _process(self, sink):
+        steps, _ = self._optimize()
         res = self._depinject(self._source)
-        for step in self._steps:
+        for step in steps:
             res = self._depinject(step, res)
         if sink is not _MISSING:
             res = self._depinject(sink, res)
@@ -361,6 +556,113 @@ class Pipe:
         p._rng = p._rng.__class__(seed)
         return p
 
+    ##############################################################
+    # Numeric precision
+
+    def _get_precision(self, precision):
+        if precision is None:
+            return self._precision
+        check_precision('precision', precision)
+        return precision
+
+    def set_precision(self, precision):
+        """
+        Clone this pipe and set the precision used by the new pipe's
+        statistical sinks, unless they're called with their own `precision`.
+
+        `precision` must be one of `'fast'` (the default), `'fsum'`, or
+        `'exact'`; see {py:meth}`Pipe.mean`, {py:meth}`Pipe.stdev`,
+        {py:meth}`Pipe.sum`, and {py:meth}`Pipe.variance` for what each
+        means.
+
+        ```{ipython}
+
+        In [1]: p = Pipe([0.1] * 10).set_precision('fsum')
+
+        In [1]: p.sum(), p.mean()
+        Out[1]: (1.0, 0.1)
+
+        In [1]: p.sum(precision='fast')
+        Out[1]: 0.9999999999999999
+        ```
+
+        :param precision: The precision mode.
+        :type precision: {external:py:class}`str`
+        :rtype: {py:class}`Pipe`
+        """
+        check_precision('precision', precision)
+        p = self.clone()
+        p._precision = precision
+        return p
+
+    ##############################################################
+    # Optimizer control
+
+    def _check_rules(self, rules):
+        for rule in rules:
+            if rule not in _OPTIMIZER_RULES:
+                raise ValueError(f"Unknown optimizer rule {rule!r}; must be one of {_OPTIMIZER_RULE_NAMES}")
+        return frozenset(rules or _OPTIMIZER_RULES)
+
+    def disable_rules(self, *rules):
+        """
+        Clone this pipe and disable the named optimizer `rules` for the new
+        pipe.
+
+        If no rules are named, disable all of them.
+
+        See {py:attr}`Pipe.OPTIMIZER_RULES` for the available rules.
+
+        ```{ipython}
+
+        In [1]: p = Pipe([3, 1, 2]).sort().take(2)
+
+        In [1]: p.explain()
+        Out[1]: ('sort-take-topk',)
+
+        In [1]: p.disable_rules('sort-take-topk').explain()
+        Out[1]: ()
+        ```
+
+        :rtype: {py:class}`Pipe`
+        """
+        p = self.clone()
+        p._disabled_rules = self._disabled_rules | self._check_rules(rules)
+        return p
+
+    def enable_rules(self, *rules):
+        """
+        Clone this pipe and re-enable the named optimizer `rules` for the new
+        pipe.
+
+        If no rules are named, enable all of them.
+
+        See {py:attr}`Pipe.OPTIMIZER_RULES` for the available rules.
+
+        :rtype: {py:class}`Pipe`
+        """
+        p = self.clone()
+        p._disabled_rules = self._disabled_rules - self._check_rules(rules)
+        return p
+
+    def explain(self):
+        """
+        Return a tuple of the names of the optimizer rules that would be
+        applied when evaluating this pipe, in the order they would be applied.
+
+        A rule may be listed more than once if it applies in several places.
+
+        ```{ipython}
+
+        In [1]: Pipe.range(100).map(str).map(len).slice(10, 20).explain()
+        Out[1]: ('slice-before-map', 'slice-before-map', 'map-fusion')
+        ```
+
+        :rtype: {external:py:class}`tuple`
+        """
+        _, applied = self._optimize()
+        return applied
+
     ##############################################################
     # Clone an existing pipe
 
@@ -378,6 +680,8 @@ class Pipe:
         """
         p = self.__class__._with_source(self._source)
         p._steps = self._steps.copy()
+        p._disabled_rules = self._disabled_rules
+        p._precision = self._precision
         return p
 
     ##############################################################
@@ -498,10 +802,132 @@ class Pipe:
           Output
           : `*(key, ...)`{l=python}
         """
+        @attach(distinct=True)
         def pipe_keys():
             return mapping.keys()
         return cls._with_source(pipe_keys)
 
+    @classonlymethod
+    def lines(
+        cls, path, /, *, encoding='utf-8', errors='strict', compression='infer',
+        buffer_size=READ_BUFFER_SIZE, start=0, end=None, keepends=False,
+    ):
+        """
+        {{pipe_source}} Yield the lines of a text file, without their line
+        endings unless `keepends` is true.
+
+        The file is read through a buffer of `buffer_size` bytes. If
+        `compression` is `'gzip'`, `'bz2'`, or `'lzma'`, it's decompressed as
+        it's read; by default, the compression is inferred from the path's
+        suffix (`.gz`, `.bz2`, `.xz`, or `.lzma`), and `None` reads it as-is.
+
+        The file is opened only once the pipe is evaluated, and it's closed
+        as soon as the pipe finishes with it, including when a step or sink
+        like {py:meth}`Pipe.take` or {py:meth}`Pipe.find` stops early.
+
+        If `start` or `end` is provided, only the lines starting at a byte
+        offset from `start` up to (but not including) `end` are yielded, so
+        that a large file can be split among several workers by byte ranges,
+        with each line read by exactly one of them. Such files must be
+        uncompressed, with `'\\n'` or `'\\r\\n'` line endings, in an
+        encoding like UTF-8 where `'\\n'` is always a single byte.
+
+        ```{ipython}
+
+        In [1]: import tempfile, pathlib
+
+        In [1]: path = pathlib.Path(tempfile.mkdtemp()) / 'log.txt'
+
+        In [1]: path.write_text('meow\\nwoof\\nbaa\\n')
+        Out[1]: 14
+
+        In [1]: Pipe.lines(path).list()
+        Out[1]: ['meow', 'woof', 'baa']
+
+        In [1]: Pipe.lines(path, start=0, end=7).list(), Pipe.lines(path, start=7).list()
+        Out[1]: (['meow', 'woof'], ['baa'])
+        ```
+
+        :param path: The path of the file to read.
+        :type path: {py:class}`os.PathLike`
+        :param encoding: The file's text encoding.
+        :type encoding: {external:py:class}`str`
+        :param errors: How to handle encoding errors; see
+          {external:py:func}`open`.
+        :type errors: {external:py:class}`str`
+        :param compression: The file's compression format.
+        :type compression: {external:py:class}`str` or {py:obj}`None`
+        :param buffer_size: The size of the read buffer, in bytes.
+        :type buffer_size: {external:py:class}`int`
+        :param start: The byte offset of the first line to yield.
+        :type start: {external:py:class}`int`
+        :param end: The byte offset at or after which to stop yielding lines.
+        :type end: {external:py:class}`int` or {py:obj}`None`
+        :param keepends: Whether to keep line endings.
+        :type keepends: {external:py:class}`bool`
+        :rtype: {py:class}`Pipe`
+        :stage flow:
+          Output
+          : `*(str(), ...)`{l=python}
+        """
+        check_compression('compression', compression)
+        check_int_positive('buffer_size', buffer_size)
+        check_int_zero_or_positive('start', start)
+        if end is not None:
+            check_int_zero_or_positive('end', end)
+        if (start or end is not None) and resolve_compression(path, compression) is not None:
+            raise ValueError("start and end can't be used with compressed files")
+
+        def pipe_lines():
+            return iter_lines(
+                path, encoding=encoding, errors=errors, compression=compression,
+                buffer_size=buffer_size, start=start, end=end, keepends=keepends,
+            )
+        return cls._with_source(pipe_lines)
+
+    @classonlymethod
+    def mmap(cls, path, format_, /, *, offset=0, limit=None, release=True):
+        """
+        {{pipe_source}} Yield tuples unpacked using `format` from the
+        fixed-size records of a binary file, via a memory mapping.
+
+        Unlike passing the file's contents to {py:meth}`Pipe.struct_unpack`,
+        the file is never read into memory as a whole: records are unpacked
+        directly from a read-only {external:py:class}`mmap.mmap`, and if
+        `release` is true, pages are released with
+        {external:py:meth}`mmap.mmap.madvise` as they're finished with
+        (where supported), so memory use stays flat however large the file
+        is.
+
+        The first `offset` records are skipped, and at most `limit` records
+        are yielded, so that a large file can be split among several
+        workers; only the pages holding those records are mapped. The file
+        must not end with a partial record, unless `limit` stops short of
+        it.
+
+        See {external:py:meth}`struct.Struct.iter_unpack`.
+
+        :param path: The path of the file to read.
+        :type path: {py:class}`os.PathLike`
+        :param offset: The number of records to skip.
+        :type offset: {external:py:class}`int`
+        :param limit: The maximum number of records to yield.
+        :type limit: {external:py:class}`int` or {py:obj}`None`
+        :param release: Whether to release pages once they've been read.
+        :type release: {external:py:class}`bool`
+        :rtype: {py:class}`Pipe`
+        :stage flow:
+          Output
+          : `*(tuple(), ...)`{l=python}
+        """
+        get_struct(format_)
+        check_int_zero_or_positive('offset', offset)
+        if limit is not None:
+            check_int_zero_or_positive('limit', limit)
+        def pipe_mmap():
+            return iter_mmap_unpack(path, format_, offset=offset, limit=limit, release=release)
+        return cls._with_source(pipe_mmap)
+
     @classonlymethod
     def randfloat(cls, a=0, b=1, /):
         """
@@ -636,10 +1062,12 @@ class Pipe:
         """
         start, stop, step = check_slice_args('range', args, kwargs)
         if stop is None:
+            @attach(distinct=True)
             def pipe_range():
                 return itertools.count(start=start, step=step)
         else:
             stop = stop + (1 if step > 0 else -1)
+            @attach(distinct=True)
             def pipe_range():
                 return builtins.range(start, stop, step)
         return cls._with_source(pipe_range)
@@ -687,13 +1115,72 @@ class Pipe:
         """
         start, stop, step = check_slice_args('rangetil', args, kwargs)
         if stop is None:
+            @attach(distinct=True)
             def pipe_rangetil():
                 return itertools.count(start=start, step=step)
         else:
+            @attach(distinct=True)
             def pipe_rangetil():
                 return builtins.range(start, stop, step)
         return cls._with_source(pipe_rangetil)
 
+    @classonlymethod
+    def read_chunks(cls, path, size=READ_BUFFER_SIZE, /, *, copy=False, pool_size=2, sequential=True):
+        """
+        {{pipe_source}} Yield the contents of a binary file in chunks of `size`
+        bytes, the last of which may be shorter.
+
+        Chunks are read with `readinto` from an unbuffered file into a small
+        pool of `pool_size` reusable buffers, taken in turn, and yielded as
+        {external:py:class}`memoryview` slices of them, so reading a large
+        file allocates no memory per chunk. Consequently, each chunk is only
+        valid until `pool_size` more chunks have been read, after which its
+        buffer is overwritten; process each chunk as it arrives (e.g. by
+        hashing it, or with {py:meth}`Pipe.struct_unpack` with
+        `framed=True`), or if chunks must be kept, pass `copy=True` to yield
+        {external:py:class}`bytes` instead.
+
+        If `sequential` is true, the kernel is advised that the file will be
+        read sequentially, via {external:py:func}`os.posix_fadvise`, where
+        supported. The file is closed as soon as the pipe finishes with it.
+
+        ```{ipython}
+
+        In [1]: import tempfile, pathlib
+
+        In [1]: path = pathlib.Path(tempfile.mkdtemp()) / 'data.bin'
+
+        In [1]: path.write_bytes(b'MEOWWOOFMEOW')
+        Out[1]: 12
+
+        In [1]: Pipe.read_chunks(path, 5, copy=True).list()
+        Out[1]: [b'MEOWW', b'OOFME', b'OW']
+
+        In [1]: Pipe.read_chunks(path, 5).struct_unpack('<i', framed=True).list()
+        Out[1]: [(1464812877,), (1179602775,), (1464812877,)]
+        ```
+
+        :param path: The path of the file to read.
+        :type path: {py:class}`os.PathLike`
+        :param size: The size of each chunk, in bytes.
+        :type size: {external:py:class}`int`
+        :param copy: Whether to yield copies of each chunk.
+        :type copy: {external:py:class}`bool`
+        :param pool_size: The number of buffers to read chunks into.
+        :type pool_size: {external:py:class}`int`
+        :param sequential: Whether to advise the kernel of sequential reads.
+        :type sequential: {external:py:class}`bool`
+        :rtype: {py:class}`Pipe`
+        :stage flow:
+          Output
+          : `*(memoryview(), ...)`{l=python}
+        """
+        check_int_positive('size', size)
+        check_int_positive('pool_size', pool_size)
+        def pipe_read_chunks():
+            return iter_chunks(path, size, pool_size=pool_size, copy=copy, sequential=sequential)
+        return cls._with_source(pipe_read_chunks)
+
     @classonlymethod
     def repeat(cls, value, n=None):
         """
@@ -1146,6 +1633,62 @@ class Pipe:
                     )
             return self._with_step(pipe_interleave)
 
+    class merge_sorted(multimethod):
+        """
+        {{pipe_sourcestep}} Yield items from sub-iterables that are each
+        already sorted, in overall sorted order.
+
+        Sub-iterables are merged lazily with {external:py:func}`heapq.merge`,
+        holding only one item from each in memory at a time, so unlike
+        chaining them and calling {py:meth}`Pipe.sort`, this works with
+        sub-iterables that are too large for memory, or infinite. Each
+        sub-iterable must be sorted by `key` (in descending order, if
+        `reverse` is true); the result is unspecified otherwise.
+
+        The merge is stable: items that compare equal are yielded in the order
+        of the sub-iterables they came from.
+
+        Contrast with {py:meth}`Pipe.chain` and {py:meth}`Pipe.interleave`.
+
+        ```{ipython}
+
+        In [1]: Pipe.merge_sorted([1, 4, 7], [2, 5, 8], [3, 6, 9]).list()
+        Out[1]: [1, 2, 3, 4, 5, 6, 7, 8, 9]
+
+        In [1]: Pipe([['b', 'a'], ['d', 'c', 'a']]).merge_sorted(reverse=True).list()
+        Out[1]: ['d', 'c', 'b', 'a', 'a']
+
+        In [1]: Pipe.merge_sorted([(1, 'x'), (3, 'x')], [(1, 'y'), (2, 'y')], key=X[0]).list()
+        Out[1]: [(1, 'x'), (1, 'y'), (2, 'y'), (3, 'x')]
+        ```
+
+        :rtype: {py:class}`Pipe`
+        :stage flow:
+          Input
+          : `*(Iterable[T], ...)`{l=python}
+
+          Output
+          : `*(T(), ...)`{l=python}
+        """
+
+        def _class(cls, *iterables, key=None, reverse=False):
+            """
+            {{pipe_source}} Yield items from each of the sorted `iterables`, in
+            sorted order.
+            """
+            def pipe_merge_sorted():
+                return heapq.merge(*iterables, key=key, reverse=reverse)
+            return cls._with_source(pipe_merge_sorted)
+
+        def _instance(self, key=None, reverse=False):
+            """
+            {{pipe_step}} Yield items from each of this pipe's sorted items, in
+            sorted order.
+            """
+            def pipe_merge_sorted(res):
+                return heapq.merge(*res, key=key, reverse=reverse)
+            return self._with_step(pipe_merge_sorted)
+
     class struct_unpack(multimethod):
         """
         {{pipe_sourcestep}} Yield items unpacked from a buffer according to a
@@ -1153,6 +1696,25 @@ class Pipe:
 
         See {external:py:func}`struct.unpack`.
 
+        If `fields` is provided, as a sequence of names or a string of names
+        separated by spaces or commas, then instead of tuples, yield
+        lightweight, read-only views of each record, with an attribute for
+        each named field. Fields are unpacked from the underlying buffer only
+        when accessed, so e.g. filtering records by one field doesn't decode
+        the rest of each record, and the records of a buffer are never copied.
+        Views can also be indexed and iterated over like tuples, and compare
+        equal to tuples of the same values; use their `_astuple` or `_asdict`
+        methods to decode every field at once. As views share the buffer, they
+        reflect any changes to it.
+
+        As a step, each item is normally a single record. If `framed` is true,
+        items are instead treated as arbitrary chunks of a stream of records,
+        as read from a file or socket: records may span chunks, and each chunk
+        may hold any number of them. Complete records are unpacked straight
+        from each chunk, and only a record split across chunks is copied; it's
+        an error for the stream to end partway through a record. With
+        `fields`, the views of records within a chunk share its buffer.
+
         ```{ipython}
 
         In [1]: Pipe.struct_unpack('<i', b'MEOWWOOF').list()
@@ -1160,8 +1722,24 @@ class Pipe:
 
         In [1]: Pipe([b'MEOW', b'WOOF']).struct_unpack('<i').list()
         Out[1]: [(1464812877,), (1179602775,)]
+
+        In [1]: Pipe([b'ME', b'OWWOO', b'F']).struct_unpack('<i', framed=True).list()
+        Out[1]: [(1464812877,), (1179602775,)]
+
+        In [1]: buf = b'\\x01\\x00\\x03\\x00\\x02\\x00\\x05\\x00\\x03\\x00\\x03\\x00'
+
+        In [1]: (Pipe.struct_unpack('<hh', buf, fields='id status')
+           ...: .filter(X.attr('status') == 3)
+           ...: .list())
+        Out[1]: [Record(id=1, status=3), Record(id=3, status=3)]
         ```
 
+        :param fields: Names for the values of each record.
+        :type fields: {external:py:class}`str`, a sequence of
+          {external:py:class}`str`, or {py:obj}`None`
+        :param framed: As a step, whether items are chunks of a stream of
+          records, rather than single records.
+        :type framed: {external:py:class}`bool`
         :rtype: {py:class}`Pipe`
         :stage flow:
           Input
@@ -1170,23 +1748,45 @@ class Pipe:
           Output
           : `*(tuple(), ...)`{l=python}
         """
-        def _class(cls, format_, buffer, /):
+        def _class(cls, format_, buffer, /, *, fields=None):
             """
             {{pipe_source}} Yield tuples of unpacked bytes from `buffer` using
             `format`.
             """
-            def pipe_struct_unpack():
-                return struct.iter_unpack(format_, buffer)
+            if fields is None:
+                def pipe_struct_unpack():
+                    return struct.iter_unpack(format_, buffer)
+            else:
+                view_class = record_view(format_, fields)
+                size = view_class._struct.size
+                def pipe_struct_unpack():
+                    view = memoryview(buffer).cast('B')
+                    if len(view) % size:
+                        raise struct.error(f"iterative unpacking requires a buffer of a multiple of {size} bytes")
+                    return map(view_class, itertools.repeat(view), range(0, len(view), size))
             return cls._with_source(pipe_struct_unpack)
 
-        def _instance(self, format_, /):
+        def _instance(self, format_, /, *, fields=None, framed=False):
             """
             {{pipe_step}} Yield tuples of unpacked bytes from the pipe's items using
             `format`.
             """
-            def pipe_struct_unpack(res):
-                for item in res:
-                    yield struct.unpack(format_, item)
+            view_class = None if fields is None else record_view(format_, fields)
+            if framed:
+                get_struct(format_)
+                def pipe_struct_unpack(res):
+                    return iter_framed_unpack(res, format_, view_class=view_class)
+            elif view_class is None:
+                def pipe_struct_unpack(res):
+                    for item in res:
+                        yield struct.unpack(format_, item)
+            else:
+                size = view_class._struct.size
+                def pipe_struct_unpack(res):
+                    for item in res:
+                        if len(item) != size:
+                            raise struct.error(f"unpack requires a buffer of {size} bytes")
+                        yield view_class(item)
             return self._with_step(pipe_struct_unpack)
 
     class zip(multimethod):
@@ -1370,7 +1970,7 @@ class Pipe:
                 yield tuple(func(v) for func in funcs)
         return self._with_step(pipe_broadmap)
 
-    def chunk(self, n, *, step=_MISSING, fillvalue=_MISSING, fair=False):
+    def chunk(self, n, *, step=_MISSING, fillvalue=_MISSING, fair=False, container=tuple, typecode=None):
         """
         {{pipe_step}} Yield source items chunked into size-`n` tuples.
 
@@ -1384,6 +1984,16 @@ class Pipe:
         If `fair` is true and the final chunk is smaller than `n`, it will be
         dropped, otherwise it will be yielded as-is.
 
+        Chunks are tuples by default. `container` can instead be any callable
+        that builds a sized container from an iterable of items, such as
+        {external:py:class}`list`; or if `typecode` is provided, each chunk
+        is an {external:py:class}`array.array` of that type, which is far more
+        compact for numbers.
+
+        Non-overlapping chunks are sliced from the source at C speed, and
+        overlapping chunks are built from a ring buffer of the last `n` items.
+        For sliding windows that needn't be copied, see {py:meth}`Pipe.window`.
+
         ```{ipython}
 
         # Standard chunks:
@@ -1439,8 +2049,18 @@ class Pipe:
 
         In [1]: Pipe('abcde').chunk(3, step=4, fillvalue='x').list()
         Out[1]: [('a', 'b', 'c'), ('e', 'x', 'x')]
+
+        # Other containers
+        In [1]: Pipe('abcde').chunk(2, container=list).list()
+        Out[1]: [['a', 'b'], ['c', 'd'], ['e']]
+
+        In [1]: Pipe([1, 2, 3, 4, 5]).chunk(2, typecode='i', fillvalue=0).list()
+        Out[1]: [array('i', [1, 2]), array('i', [3, 4]), array('i', [5, 0])]
         ```
 
+        :param container: A callable building each chunk from an iterable.
+        :param typecode: The {external:py:mod}`array` typecode of each chunk.
+        :type typecode: {external:py:class}`str` or {py:obj}`None`
         :rtype: {py:class}`Pipe`
         :stage flow:
           Input
@@ -1454,34 +2074,16 @@ class Pipe:
         check_int_positive('n', n)
         step = replace(_MISSING, n, step)
         check_int_positive('step', step)
-        def pipe_chunk(ix):
-            chunk = collections.deque(maxlen=n)
-            while True:
-                try:
-                    v = next(ix)
-                except StopIteration:
-                    break
-                else:
-                    chunk.append(v)
-                    if len(chunk) < n:
-                        continue
-                    yield tuple(chunk)
-                    if step > 1:
-                        try:
-                            for _ in range(step):
-                                if chunk:
-                                    chunk.popleft()
-                                else:
-                                    next(ix)
-                        except StopIteration:
-                            break
-            final_chunk_len = len(chunk)
-            if 0 < final_chunk_len < n:
-                if fair:
-                    return
-                if fillvalue is not _MISSING:
-                    chunk.extend((fillvalue,) * (n - final_chunk_len))
-                yield tuple(chunk)
+        if typecode is not None:
+            if container is not tuple:
+                raise TypeError("'container' and 'typecode' are mutually exclusive")
+            # Fail early on an invalid typecode.
+            array.array(typecode)
+            container = functools.partial(array.array, typecode)
+        elif not callable(container):
+            raise TypeError("'container' must be a callable")
+        def pipe_chunk(res):
+            return chunks(res, n, step, fillvalue=fillvalue, fair=fair, container=container)
         return self._with_step(pipe_chunk)
 
     @multilambda('key')
@@ -1724,9 +2326,11 @@ class Pipe:
         """
         {{pipe_step}} Yield items, but skip consecutive duplicates.
 
-        If `key` is provided, compare `key(item)` instead of `item`.
+        If `key` is provided, compare `key(item)` instead of `item`. Items
+        (or keys) are compared by equality.
 
-        Contrast with {py:meth}`Pipe.unique`.
+        Contrast with {py:meth}`Pipe.unique`, and see {py:meth}`Pipe.rle` to
+        also count the duplicates skipped.
 
         ```{ipython}
 
@@ -1747,22 +2351,10 @@ class Pipe:
                 pass
             case _:
                 raise TypeError("'key' must be a callable")
-        last = _MISSING
-        if key is not _MISSING:
-            def pipe_depeat(res):
-                nonlocal last
-                for v in res:
-                    v_keyed = key(v)
-                    if v_keyed is not last:
-                        yield v
-                        last = v_keyed
-        else:
-            def pipe_depeat(res):
-                nonlocal last
-                for v in res:
-                    if v is not last:
-                        yield v
-                        last = v
+        key = replace(_MISSING, None, key)
+        def pipe_depeat(res):
+            for _, g in itertools.groupby(res, key):
+                yield next(g)
         return self._with_step(pipe_depeat)
 
     def dictmap(self, template=_MISSING, **kwargs):
@@ -1817,6 +2409,7 @@ class Pipe:
         :rtype: {py:class}`Pipe`
         """
         check_int_zero_or_positive('n', n)
+        @attach(opcode='drop', n=n)
         def pipe_drop(res):
             return itertools.islice(res, n, None)
         return self._with_step(pipe_drop)
@@ -1837,6 +2430,7 @@ class Pipe:
 
         :rtype: {py:class}`Pipe`
         """
+        @attach(opcode='dropwhile')
         def pipe_dropwhile(res):
             return itertools.dropwhile(pred, res)
         return self._with_step(pipe_dropwhile)
@@ -1896,6 +2490,46 @@ class Pipe:
                 c += 1
         return self._with_step(pipe_enumerate_info)
 
+    @multilambda('key', optional=True)
+    def external_sort(self, *, key=None, reverse=False, run_size=1_000_000, tempdir=None):
+        """
+        {{pipe_step}} Yield the source items, sorted, holding at most
+        `run_size` items in memory at a time.
+
+        The source is read in runs of `run_size` items, each of which is sorted
+        and spilled to an anonymous temporary file in `tempdir` (defaulting to
+        the system temporary directory). The sorted runs are then lazily merged
+        using {py:func}`heapq.merge`, so the sorted output streams without ever
+        holding the entire source in memory.
+
+        If the source fits within a single run, no temporary files are
+        written, and this behaves exactly like {py:meth}`Pipe.sort`. Like
+        {py:meth}`Pipe.sort`, the sort is stable.
+
+        The source must be finite, and it will be exhausted upon evaluation.
+        Items must be picklable.
+
+        ```{ipython}
+
+        In [1]: Pipe([2, 4, 1, 5, 3]).external_sort(run_size=2).list()
+        Out[1]: [1, 2, 3, 4, 5]
+
+        In [1]: Pipe([2, 4, 1, 5, 3]).external_sort(run_size=2, reverse=True).list()
+        Out[1]: [5, 4, 3, 2, 1]
+        ```
+
+        :param run_size: The maximum number of items to sort in memory at once.
+        :type run_size: {external:py:class}`int`
+        :param tempdir: The directory to write temporary files to.
+        :type tempdir: {py:class}`os.PathLike` or {py:obj}`None`
+        :rtype: {py:class}`Pipe`
+        """
+        check_int_positive('run_size', run_size)
+        @attach(opcode='sort', key=key, reverse=reverse)
+        def pipe_external_sort(res):
+            return external_sort(res, key=key, reverse=reverse, run_size=run_size, dir=tempdir)
+        return self._with_step(pipe_external_sort)
+
     @multilambda('pred')
     def filter(self, pred=None):
         """
@@ -1911,6 +2545,7 @@ class Pipe:
 
         :rtype: {py:class}`Pipe`
         """
+        @attach(opcode='filter', preds=(pred,))
         def pipe_filter(res):
             return builtins.filter(pred, res)
         return self._with_step(pipe_filter)
@@ -1989,6 +2624,90 @@ class Pipe:
                 yield from chunk
         return self._with_step(pipe_intersperse)
 
+    def join(self, other, /, key=None, *, left_key=None, right_key=None, how='inner',
+             combine=None, fillvalue=None, presorted=False):
+        """
+        {{pipe_step}} Join the source's items with the items of `other` whose
+        keys are equal, like SQL's `JOIN`.
+
+        Source items are keyed by `left_key`, and items of `other` by
+        `right_key`; `key` provides both, and items themselves are the keys
+        if none are provided.
+
+        `how` is one of:
+
+        - `'inner'`: Yield `combine(item, match)` for each pair of
+          matching items.
+        - `'left'`: Like `'inner'`, but also yield `combine(item, fillvalue)`
+          for each source item without a match.
+        - `'outer'`: Like `'left'`, but also yield `combine(fillvalue, match)`
+          for each item of `other` without a match.
+        - `'semi'`: Yield each source item that has a match.
+        - `'anti'`: Yield each source item that has no match.
+
+        `combine` defaults to returning a `(item, match)` tuple; it can't be
+        provided for `'semi'` and `'anti'` joins.
+
+        By default, this is a {wp}`hash join <Hash_join>`: `other` is read
+        into a table by key, and the source is streamed through it, so
+        results follow the source's order, with any unmatched items of
+        `other` last. If both are sized and the source is smaller, the table
+        is instead built from the source, and results follow the order of
+        `other`.
+
+        If `presorted` is true, both the source and `other` must already be
+        sorted in ascending order of key, and a {wp}`sort-merge join
+        <Sort-merge_join>` streams both in key order, holding only the items
+        of `other` with the current key in memory.
+
+        ```{ipython}
+
+        In [1]: users = [{'id': 1, 'name': 'ann'}, {'id': 2, 'name': 'bob'}]
+
+        In [1]: events = [{'user': 2, 'event': 'login'}, {'user': 3, 'event': 'login'}, {'user': 1, 'event': 'logout'}]
+
+        In [1]: (Pipe(events)
+           ...: .join(users, left_key=X['user'], right_key=X['id'],
+           ...:       combine=lambda e, u: (u['name'], e['event']))
+           ...: .list())
+        Out[1]: [('bob', 'login'), ('ann', 'logout')]
+
+        In [1]: (Pipe(events)
+           ...: .join(users, left_key=X['user'], right_key=X['id'], how='left',
+           ...:       combine=lambda e, u: (u and u['name'], e['event']))
+           ...: .list())
+        Out[1]: [('bob', 'login'), (None, 'login'), ('ann', 'logout')]
+
+        In [1]: Pipe([1, 2, 3, 4]).join([2, 4, 6], how='anti').list()
+        Out[1]: [1, 3]
+
+        In [1]: Pipe([1, 2, 2, 3]).join([2, 3, 3], how='outer', presorted=True).list()
+        Out[1]: [(1, None), (2, 2), (2, 2), (3, 3), (3, 3)]
+        ```
+
+        :param how: The kind of join.
+        :type how: {external:py:class}`str`
+        :param combine: A function combining a source item and a matching
+          item of `other`.
+        :param fillvalue: The value combined with items without a match.
+        :param presorted: Whether both sides are sorted by key.
+        :type presorted: {external:py:class}`bool`
+        :rtype: {py:class}`Pipe`
+        """
+        check_how('how', how)
+        if combine is None:
+            combine = join_pair
+        elif how in ('semi', 'anti'):
+            raise TypeError(f"'combine' can't be provided for a {how!r} join")
+        left_key, right_key = replace(None, key, left_key, right_key)
+        join = merge_join if presorted else hash_join
+        def pipe_join(res):
+            return join(
+                res, other, left_key=left_key, right_key=right_key, how=how,
+                combine=combine, fillvalue=fillvalue,
+            )
+        return self._with_step(pipe_join)
+
     def label(self, *keys, fillvalue=_MISSING, strict=False):
         """
         {{pipe_step}} Yield dicts representing each of `keys` zipped with each item.
@@ -2021,41 +2740,108 @@ class Pipe:
 
         :rtype: {py:class}`Pipe`
         """
+        @attach(opcode='map', funcs=(func,))
         def pipe_map(res):
             return builtins.map(func, res)
         return self._with_step(pipe_map)
 
-    def peek(self):
+    @multilambda('key', optional=True)
+    def nlargest(self, n, *, key=None):
         """
-        {{pipe_step}} Yield tuples of `(value, next_value)`.
+        {{pipe_step}} Yield the `n` largest items, from largest to smallest.
 
-        `next_value` is {py:data}`END` (bound to {py:attr}`Pipe.peek.END` as
-        well) if the current value is the last one.
+        This is equivalent to `.sort(key=key, reverse=True).take(n)`, including
+        its stability, but uses a heap to hold only `n` items at a time, taking
+        `O(len(source) * log(n))` time.
+
+        The source must be finite, and it will be exhausted upon
+        evaluation.
+
+        Contrast with {py:meth}`Pipe.nsmallest`.
+
+        See {py:func}`heapq.nlargest`.
 
         ```{ipython}
 
-        In [1]: Pipe([1, 2, 3]).peek().list()
-        Out[1]: [(1, 2), (2, 3), (3, <END>)]
+        In [1]: Pipe([2, 4, 1, 5, 3]).nlargest(3).list()
+        Out[1]: [5, 4, 3]
+
+        In [1]: Pipe(['bb', 'a', 'ccc', 'dd']).nlargest(2, key=len).list()
+        Out[1]: ['ccc', 'bb']
         ```
 
         :rtype: {py:class}`Pipe`
         """
-        def pipe_peek(ix):
-            try:
-                last_item = next(ix)
-            except StopIteration:
-                return
-            while True:
-                try:
-                    next_item = next(ix)
-                except StopIteration:
-                    yield (last_item, END)
-                    return
-                else:
-                    yield (last_item, next_item)
-                    last_item = next_item
-        return self._with_step(pipe_peek)
-    peek.END = END
+        check_int_zero_or_positive('n', n)
+        @attach(opcode='topk')
+        def pipe_nlargest(res):
+            return heapq.nlargest(n, res, key=key)
+        return self._with_step(pipe_nlargest)
+
+    @multilambda('key', optional=True)
+    def nsmallest(self, n, *, key=None):
+        """
+        {{pipe_step}} Yield the `n` smallest items, from smallest to largest.
+
+        This is equivalent to `.sort(key=key).take(n)`, including its
+        stability, but uses a heap to hold only `n` items at a time, taking
+        `O(len(source) * log(n))` time.
+
+        The source must be finite, and it will be exhausted upon
+        evaluation.
+
+        Contrast with {py:meth}`Pipe.nlargest`.
+
+        See {py:func}`heapq.nsmallest`.
+
+        ```{ipython}
+
+        In [1]: Pipe([2, 4, 1, 5, 3]).nsmallest(3).list()
+        Out[1]: [1, 2, 3]
+
+        In [1]: Pipe(['bb', 'a', 'ccc', 'dd']).nsmallest(2, key=len).list()
+        Out[1]: ['a', 'bb']
+        ```
+
+        :rtype: {py:class}`Pipe`
+        """
+        check_int_zero_or_positive('n', n)
+        @attach(opcode='topk')
+        def pipe_nsmallest(res):
+            return heapq.nsmallest(n, res, key=key)
+        return self._with_step(pipe_nsmallest)
+
+    def peek(self):
+        """
+        {{pipe_step}} Yield tuples of `(value, next_value)`.
+
+        `next_value` is {py:data}`END` (bound to {py:attr}`Pipe.peek.END` as
+        well) if the current value is the last one.
+
+        ```{ipython}
+
+        In [1]: Pipe([1, 2, 3]).peek().list()
+        Out[1]: [(1, 2), (2, 3), (3, <END>)]
+        ```
+
+        :rtype: {py:class}`Pipe`
+        """
+        def pipe_peek(ix):
+            try:
+                last_item = next(ix)
+            except StopIteration:
+                return
+            while True:
+                try:
+                    next_item = next(ix)
+                except StopIteration:
+                    yield (last_item, END)
+                    return
+                else:
+                    yield (last_item, next_item)
+                    last_item = next_item
+        return self._with_step(pipe_peek)
+    peek.END = END
 
     def permutations(self, k=None):
         """
@@ -2202,6 +2988,7 @@ class Pipe:
 
         :rtype: {py:class}`Pipe`
         """
+        @attach(opcode='reject')
         def pipe_reject(res):
             return itertools.filterfalse(pred, res)
         return self._with_step(pipe_reject)
@@ -2339,6 +3126,51 @@ class Pipe:
         p._steps.append(pipe_remap)
         return p
 
+    @multilambda('key', optional=True)
+    def rle(self, *, key=_MISSING):
+        """
+        {{pipe_step}} Yield a `(item, count)` tuple for each run of
+        consecutive equal items.
+
+        If `key` is provided, compare `key(item)` instead of `item`, and yield
+        the first item of each run.
+
+        This is {wp}`run-length encoding <Run-length_encoding>`. Unlike
+        {py:meth}`Pipe.chunkby`, the items of each run are counted rather than
+        collected, so memory use does not depend on the length of a run.
+
+        ```{ipython}
+
+        In [1]: Pipe('abbcccacbba').rle().list()
+        Out[1]: [('a', 1), ('b', 2), ('c', 3), ('a', 1), ('c', 1), ('b', 2), ('a', 1)]
+
+        In [1]: Pipe('aAbBBa').rle(key=str.lower).list()
+        Out[1]: [('a', 2), ('b', 3), ('a', 1)]
+        ```
+
+        :rtype: {py:class}`Pipe`
+        :stage flow:
+          Input
+          : `*(T(), ...)`{l=python}
+
+          Output
+          : `*((T, int), ...)`{l=python}
+        """
+        match key:
+            case Callable() | Sentinel():
+                pass
+            case _:
+                raise TypeError("'key' must be a callable")
+        key = replace(_MISSING, None, key)
+        def pipe_rle(res):
+            for _, g in itertools.groupby(res, key):
+                first = next(g)
+                # Count the rest of the run without a Python-level loop.
+                counter = itertools.count(1)
+                collections.deque(zip(g, counter), maxlen=0)
+                yield (first, next(counter))
+        return self._with_step(pipe_rle)
+
     def reverse(self):
         """
         {{pipe_step}} Yield the source values in reversed order.
@@ -2356,10 +3188,123 @@ class Pipe:
 
         :rtype: {py:class}`Pipe`
         """
+        @attach(opcode='reverse')
         def pipe_reverse(seq):
             return reversed(seq)
         return self._with_step(pipe_reverse)
 
+    def rolling_max(self, n):
+        """
+        {{pipe_step}} Yield the maximum of each sliding window of `n` items.
+
+        A monotonic deque of candidates, each greater than all those after it,
+        is maintained as items enter and leave the window, so each item costs
+        O(1) amortized, regardless of `n`. As with {py:meth}`Pipe.window`,
+        only full windows are considered, so there is one result per item
+        after the first `n - 1`.
+
+        ```{ipython}
+
+        In [1]: Pipe([3, 1, 4, 1, 5, 9, 2, 6]).rolling_max(3).list()
+        Out[1]: [4, 4, 5, 9, 9, 9]
+        ```
+
+        :rtype: {py:class}`Pipe`
+        """
+        check_int_positive('n', n)
+        def pipe_rolling_max(res):
+            return rolling_max(res, n)
+        return self._with_step(pipe_rolling_max)
+
+    def rolling_mean(self, n):
+        """
+        {{pipe_step}} Yield the mean of each sliding window of `n` items.
+
+        This is the result of {py:meth}`Pipe.rolling_sum` divided by `n`, and
+        likewise costs O(1) per item.
+
+        ```{ipython}
+
+        In [1]: Pipe([2, 4, 6, 8, 10]).rolling_mean(2).list()
+        Out[1]: [3.0, 5.0, 7.0, 9.0]
+        ```
+
+        :rtype: {py:class}`Pipe`
+        """
+        check_int_positive('n', n)
+        def pipe_rolling_mean(res):
+            return rolling_mean(res, n)
+        return self._with_step(pipe_rolling_mean)
+
+    def rolling_min(self, n):
+        """
+        {{pipe_step}} Yield the minimum of each sliding window of `n` items.
+
+        See {py:meth}`Pipe.rolling_max`.
+
+        ```{ipython}
+
+        In [1]: Pipe([3, 1, 4, 1, 5, 9, 2, 6]).rolling_min(3).list()
+        Out[1]: [1, 1, 1, 1, 2, 2]
+        ```
+
+        :rtype: {py:class}`Pipe`
+        """
+        check_int_positive('n', n)
+        def pipe_rolling_min(res):
+            return rolling_min(res, n)
+        return self._with_step(pipe_rolling_min)
+
+    def rolling_sum(self, n):
+        """
+        {{pipe_step}} Yield the sum of each sliding window of `n` items.
+
+        A running total is updated as each item enters and leaves the window,
+        so each item costs O(1), regardless of `n`; to keep float rounding
+        errors from accumulating, the total is recomputed from scratch once
+        every `n` items. As with {py:meth}`Pipe.window`, only full windows are
+        considered, so there is one result per item after the first `n - 1`.
+
+        ```{ipython}
+
+        In [1]: Pipe([1, 2, 3, 4, 5]).rolling_sum(3).list()
+        Out[1]: [6, 9, 12]
+        ```
+
+        :rtype: {py:class}`Pipe`
+        """
+        check_int_positive('n', n)
+        def pipe_rolling_sum(res):
+            return rolling_sum(res, n)
+        return self._with_step(pipe_rolling_sum)
+
+    def rolling_variance(self, n, *, sample=False):
+        """
+        {{pipe_step}} Yield the population variance of each sliding window of
+        `n` items, or the sample variance if `sample` is true.
+
+        The window's mean and sum of squared deviations are updated as each
+        item enters and leaves the window, so each item costs O(1),
+        regardless of `n`; as with {py:meth}`Pipe.rolling_sum`, both are
+        recomputed from scratch once every `n` items.
+
+        ```{ipython}
+
+        In [1]: Pipe([2, 4, 4, 4, 5, 5, 7, 9]).rolling_variance(4).list()
+        Out[1]: [0.75, 0.1875, 0.25, 1.1875, 2.75]
+        ```
+
+        :param sample: Whether to compute the sample variance.
+        :type sample: {external:py:class}`bool`
+        :rtype: {py:class}`Pipe`
+        """
+        check_int_positive('n', n)
+        if sample and n < 2:
+            raise ValueError("'n' must be at least 2 for the sample variance")
+        def pipe_rolling_variance(res):
+            return rolling_variance(res, n, sample=sample)
+        return self._with_step(pipe_rolling_variance)
+
     def sample(self, k=None, *, replacement=False):
         """
         {{pipe_step}} Yield a `k` length list of randomly chosen source values.
@@ -2457,6 +3402,7 @@ class Pipe:
         :rtype: {py:class}`Pipe`
         """
         start, stop, step = check_slice_args('slice', args, kwargs)
+        @attach(opcode='slice', start=start, stop=stop, step=step)
         def pipe_slice(res):
             return itertools.islice(res, start, stop, step)
         return self._with_step(pipe_slice)
@@ -2471,7 +3417,8 @@ class Pipe:
 
         `key` can either be provided as a callable, or a string
 
-        See {external:py:func}`sorted`.
+        See {external:py:func}`sorted`, and contrast with
+        {py:meth}`Pipe.external_sort` for sources too large to fit in memory.
 
         ```{ipython}
 
@@ -2484,6 +3431,7 @@ class Pipe:
 
         :rtype: {py:class}`Pipe`
         """
+        @attach(opcode='sort', key=key, reverse=reverse)
         def pipe_sort(res):
             return sorted(res, key=key, reverse=reverse)
         return self._with_step(pipe_sort)
@@ -2648,6 +3596,7 @@ class Pipe:
         :rtype: {py:class}`Pipe`
         """
         check_int_zero_or_positive('n', n)
+        @attach(opcode='take', n=n)
         def pipe_take(res):
             return itertools.islice(res, None, n)
         return self._with_step(pipe_take)
@@ -2668,6 +3617,7 @@ class Pipe:
 
         :rtype: {py:class}`Pipe`
         """
+        @attach(opcode='takewhile')
         def pipe_takewhile(res):
             return itertools.takewhile(pred, res)
         return self._with_step(pipe_takewhile)
@@ -2701,16 +3651,43 @@ class Pipe:
         return self._with_step(pipe_tap)
 
     @multilambda('key', optional=True)
-    def unique(self, /, key=_MISSING):
+    def unique(self, /, key=_MISSING, *, window=None, approx=False, capacity=None, error_rate=0.01):
         """
         {{pipe_step}} Yield only items that have not been yielded already.
 
+        If `key` is provided, compare `key(item)` instead of `item`.
+
+        Items (or keys) are compared by equality, and must be hashable. The
+        record of items seen is created fresh each time the pipe is evaluated.
+
+        By default, every item seen is remembered, so memory grows with the
+        number of distinct items. Two bounded-memory modes are available:
+
+        - If `window` is provided as a positive integer, only the `window`
+          most recently seen distinct items are remembered, and an item is
+          only skipped if it is among them. This is useful for dropping
+          "recent duplicates" from a long stream.
+
+        - If `approx` is true, seen items are tracked with a {wp}`Bloom filter
+          <Bloom_filter>` sized for `capacity` distinct items, using a fixed
+          amount of memory (about 1.2 bytes per item of `capacity` for the
+          default `error_rate`). No duplicate is ever yielded, but new items
+          will be wrongly skipped at a rate of roughly `error_rate`, a rate
+          which steadily rises if more than `capacity` distinct items are
+          seen.
+
         Contrast with {py:meth}`Pipe.depeat`
 
         ```{ipython}
 
         In [1]: Pipe('abbcccacbba').unique().list()
         Out[1]: ['a', 'b', 'c']
+
+        In [1]: Pipe('abbcccacbba').unique(window=2).list()
+        Out[1]: ['a', 'b', 'c', 'a', 'b', 'a']
+
+        In [1]: Pipe('abbcccacbba').unique(approx=True, capacity=1000).list()
+        Out[1]: ['a', 'b', 'c']
         ```
 
         ```{marble}
@@ -2719,6 +3696,15 @@ class Pipe:
         -a-b---c-----------d--->
         ```
 
+        :param window: The number of recently seen items to remember.
+        :type window: {external:py:class}`int` or {py:obj}`None`
+        :param approx: Whether to track seen items with a Bloom filter.
+        :type approx: {external:py:class}`bool`
+        :param capacity: The expected number of distinct items; required if
+          `approx` is true.
+        :type capacity: {external:py:class}`int` or {py:obj}`None`
+        :param error_rate: The target false positive rate for `approx`.
+        :type error_rate: {external:py:class}`float`
         :rtype: {py:class}`Pipe`
         """
         match key:
@@ -2726,23 +3712,165 @@ class Pipe:
                 pass
             case _:
                 raise TypeError("'key' must be a callable")
-        seen = Seen()
-        if key is not _MISSING:
+        key = replace(_MISSING, None, key)
+        if window is not None and approx:
+            raise TypeError("'window' and 'approx' are mutually exclusive")
+        if window is not None:
+            check_int_positive('window', window)
+            @attach(opcode='unique_window')
+            def pipe_unique(res):
+                seen = RecentSeen(window, key=key)
+                for v in res:
+                    if v not in seen:
+                        yield v
+        elif approx:
+            if capacity is None:
+                raise TypeError("'capacity' must be provided if 'approx' is true")
+            # Validate eagerly, rather than upon evaluation
+            BloomFilter(capacity, error_rate)
+            @attach(opcode='unique_approx')
             def pipe_unique(res):
+                bloom = BloomFilter(capacity, error_rate)
+                add = bloom.add
+                if key is None:
+                    for v in res:
+                        if add(v):
+                            yield v
+                else:
+                    for v in res:
+                        if add(key(v)):
+                            yield v
+        elif key is not None:
+            @attach(opcode='unique', key=key)
+            def pipe_unique(res):
+                seen = set()
                 for v in res:
                     v_keyed = key(v)
                     if v_keyed not in seen:
+                        seen.add(v_keyed)
                         yield v
         else:
+            @attach(opcode='unique', key=key)
             def pipe_unique(res):
+                seen = set()
                 for v in res:
                     if v not in seen:
+                        seen.add(v)
                         yield v
         return self._with_step(pipe_unique)
 
+    def window(self, n, *, step=1):
+        """
+        {{pipe_step}} Yield a view of each sliding window of `n` items,
+        starting every `step` items.
+
+        Items are written into a single ring buffer as they arrive, and each
+        window is a read-only {external:py:class}`Sequence
+        <collections.abc.Sequence>` view of that buffer, so a window costs
+        O(`step`) rather than the O(`n`) of copying it. In exchange, each
+        window is only valid until the next one is yielded; to keep windows,
+        copy them, e.g. with `.map(tuple)`, or use {py:meth}`Pipe.chunk`
+        instead.
+
+        Only full windows are yielded; if there are fewer than `n` items,
+        nothing is.
+
+        For sliding aggregates, see {py:meth}`Pipe.rolling_sum` and friends,
+        which avoid looking at every item of every window at all.
+
+        ```{ipython}
+
+        In [1]: Pipe('abcde').window(3).map(''.join).list()
+        Out[1]: ['abc', 'bcd', 'cde']
+
+        In [1]: Pipe('abcdefg').window(3, step=2).map(tuple).list()
+        Out[1]: [('a', 'b', 'c'), ('c', 'd', 'e'), ('e', 'f', 'g')]
+        ```
+
+        :param step: The number of items between the starts of windows.
+        :type step: {external:py:class}`int`
+        :rtype: {py:class}`Pipe`
+        :stage flow:
+          Input
+          : `*(T(), ...)`{l=python}
+
+          Output
+          : `*(Sequence[T], ...)`{l=python}
+        """
+        check_int_positive('n', n)
+        check_int_positive('step', step)
+        def pipe_window(res):
+            return windows(res, n, step)
+        return self._with_step(pipe_window)
+
     ##############################################################
     # Sinks: non-container results
 
+    @partialclassmethod
+    def aggregate(self, /, *, partial=False, **aggregators):
+        """
+        {{pipe_sink}} Compute several named aggregates of this pipe's items
+        in a single pass, and return a {external:py:class}`dict` of each
+        name and its result.
+
+        No items are held in memory, except by aggregators that collect them
+        (such as `'list'`). Each aggregator may be:
+
+        - The name of a built-in aggregator: `'count'`, `'sum'`, `'min'`,
+          `'max'`, `'mean'`, `'variance'`, `'stdev'` (the latter two for the
+          population), `'first'`, `'last'`, `'list'`, or `'set'`. All but
+          `'count'`, `'sum'`, `'list'`, and `'set'` result in `None` if there
+          are no items.
+        - A tuple of `(init, step, result)` functions: `init()` returns an
+          initial state, `step(state, item)` returns an updated state, and
+          `result(state)` returns the final value (or `result` may be `None`
+          to use the state itself). A fourth function, `merge(state_a,
+          state_b)`, may be added to support merging; see below.
+        - A tuple of `(aggregator, key)`, where `aggregator` is either of the
+          above, and `key` is a function (such as a shear) applied to each
+          item before it's aggregated.
+
+        If `partial` is true, return a `seittik.utils.aggregators.Accumulator`
+        instead of the results. Accumulators for the same aggregators can be
+        merged with `|` (or in place with their `merge` method), e.g. to
+        combine partial results computed in parallel, and their `result`
+        method returns the results. All built-in aggregators support merging.
+
+        ```{ipython}
+
+        In [1]: Pipe([3, 1, 4, 1, 5, 9, 2, 6]).aggregate(n='count', total='sum', lo='min', hi='max', avg='mean')
+        Out[1]: {'n': 8, 'total': 31, 'lo': 1, 'hi': 9, 'avg': 3.875}
+
+        In [1]: orders = [{'qty': 2, 'price': 5}, {'qty': 1, 'price': 12}]
+
+        In [1]: Pipe(orders).aggregate(units=('sum', X['qty']), dearest=('max', X['price']))
+        Out[1]: {'units': 3, 'dearest': 12}
+
+        In [1]: product = (lambda: 1, lambda state, item: state * item, None)
+
+        In [1]: Pipe([1, 2, 3, 4]).aggregate(product=product)
+        Out[1]: {'product': 24}
+
+        In [1]: a = Pipe([3, 1, 4]).aggregate(n='count', hi='max', partial=True)
+
+        In [1]: b = Pipe([1, 5]).aggregate(n='count', hi='max', partial=True)
+
+        In [1]: (a | b).result()
+        Out[1]: {'n': 5, 'hi': 5}
+        ```
+
+        :param partial: Whether to return a mergeable accumulator rather than
+          the results.
+        :type partial: {external:py:class}`bool`
+        :rtype: {external:py:class}`dict`
+        """
+        aggregation = Aggregation(aggregators)
+        def pipe_aggregate(res):
+            acc = Accumulator(aggregation)
+            acc.update(res)
+            return acc if partial else acc.result()
+        return self._evaluate(sink=pipe_aggregate)
+
     @partialclassmethod
     @multilambda('pred', optional=True)
     def all(self, pred=_MISSING):
@@ -2876,6 +4004,71 @@ class Pipe:
                     return builtins.sum(1 for value in res)
         return self._evaluate(sink=pipe_count)
 
+    @partialclassmethod
+    def count_distinct(self, *, approx=False, precision=14, sketch=False):
+        """
+        {{pipe_sink}} Return the number of distinct values in this pipe.
+
+        Values must be hashable. By default, the count is exact, which
+        requires memory proportional to the number of distinct values.
+
+        If `approx` is true, instead return an estimate from a
+        {wp}`HyperLogLog` sketch, which uses `2**precision` bytes of memory
+        regardless of the number of values. The estimate has a relative
+        standard error of about `1.04 / sqrt(2**precision)`; e.g., 0.81% for
+        the default `precision` of 14. `precision` must be between 4 and 18,
+        inclusive.
+
+        If `sketch` is also true, return the sketch itself, a
+        `seittik.utils.sketches.HyperLogLog`, rather than its estimate. Sketches
+        of the same precision can be merged with `|` (or in place with their
+        `merge` method), even across processes, to count the distinct values
+        of several pipes; `len(sketch)` gives the estimate.
+
+        ```{ipython}
+
+        In [1]: Pipe('abbcccacbba').count_distinct()
+        Out[1]: 3
+
+        In [1]: Pipe.rangetil(100_000).count_distinct(approx=True)
+        Out[1]: 99781
+
+        In [1]: a = Pipe.rangetil(0, 60_000).count_distinct(approx=True, sketch=True)
+
+        In [1]: b = Pipe.rangetil(40_000, 100_000).count_distinct(approx=True, sketch=True)
+
+        In [1]: len(a | b)
+        Out[1]: 99781
+        ```
+
+        :param approx: Whether to estimate the count with a HyperLogLog
+          sketch.
+        :type approx: {external:py:class}`bool`
+        :param precision: The precision of the sketch, if `approx` is true.
+        :type precision: {external:py:class}`int`
+        :param sketch: Whether to return the sketch rather than its estimate,
+          if `approx` is true.
+        :type sketch: {external:py:class}`bool`
+        :rtype: {external:py:class}`int`
+        """
+        if sketch and not approx:
+            raise TypeError("'sketch' requires 'approx' to be true")
+        if approx:
+            # Validate eagerly, rather than upon evaluation
+            HyperLogLog(precision)
+            def pipe_count_distinct(res):
+                hll = HyperLogLog(precision)
+                hll.update(res)
+                return hll if sketch else len(hll)
+        else:
+            def pipe_count_distinct(res):
+                match res:
+                    case Set() | Mapping():
+                        return len(res)
+                    case _:
+                        return len(builtins.set(res))
+        return self._evaluate(sink=pipe_count_distinct)
+
     @partialclassmethod
     def equal(self, default=_MISSING):
         """
@@ -2998,31 +4191,171 @@ class Pipe:
         return self._evaluate(sink=pipe_fold)
 
     @partialclassmethod
-    def frequencies(self):
+    def frequencies(self, *, top=None, approx=False, capacity=None, sketch=False,
+                    max_keys=None, stream=False, tempdir=None):
         """
         {{pipe_sink}} Return a {py:class}`collections.Counter` for this pipe's
         items.
 
+        If `top` is provided, instead return a list of the `top` most common
+        items and their counts, from most common to least, as with
+        {external:py:meth}`collections.Counter.most_common`.
+
+        If `approx` is true, count items with a {wp}`Space-Saving sketch
+        <Streaming_algorithm#Frequent_elements>`, which tracks at most
+        `capacity` items at a time (by default, ten times `top`) regardless
+        of how many distinct items there are. Estimated counts are never less
+        than true counts, and exceed them by at most `n / capacity`, where `n`
+        is the number of items; any item occurring more than `n / capacity`
+        times is guaranteed to be included. Either `top` or `capacity` must be
+        provided; if only `capacity` is, return all tracked items.
+
+        If `sketch` is also true, return the sketch itself, a
+        `seittik.utils.sketches.SpaceSaving`, rather than its most common
+        items. Sketches with the same capacity can be merged with `|` (or in
+        place with their `merge` method) to summarize several pipes, and then
+        queried with their `most_common` method; their `error` method gives
+        the maximum overestimate for an item.
+
+        Otherwise, if `max_keys` is provided, count items exactly while
+        holding at most about that many distinct items in memory at a time,
+        spilling partial counts to anonymous temporary files in `tempdir`
+        whenever there are more; see {py:meth}`Pipe.groupby`. If `stream` is
+        true, return an iterator of `(item, count)` pairs rather than a
+        `Counter`.
+
         ```{ipython}
 
         In [1]: (Pipe(['a', 'b', 'a', 'a', 'b', 'c', 'd', 'b', 'b', 'a', 'c', 'e', 'a'])
            ...: .frequencies())
         Out[1]: Counter({'a': 5, 'b': 4, 'c': 2, 'd': 1, 'e': 1})
+
+        In [1]: Pipe('abaabcdbbacea').frequencies(top=2)
+        Out[1]: [('a', 5), ('b', 4)]
+
+        In [1]: Pipe('abaabcdbbacea').frequencies(top=2, approx=True, capacity=3)
+        Out[1]: [('a', 5), ('b', 4)]
         ```
 
-        :rtype: {external:py:class}`collections.Counter`
-        """
-        def pipe_frequencies(res):
-            return collections.Counter(res)
+        :param top: The number of most common items to return.
+        :type top: {external:py:class}`int` or {py:obj}`None`
+        :param approx: Whether to count items with a sketch.
+        :type approx: {external:py:class}`bool`
+        :param capacity: The number of items tracked by the sketch, if
+          `approx` is true.
+        :type capacity: {external:py:class}`int` or {py:obj}`None`
+        :param sketch: Whether to return the sketch rather than its most
+          common items, if `approx` is true.
+        :type sketch: {external:py:class}`bool`
+        :param max_keys: The maximum number of distinct items to count in
+          memory at once.
+        :type max_keys: {external:py:class}`int` or {py:obj}`None`
+        :param stream: Whether to return an iterator of pairs rather than a
+          `Counter`.
+        :type stream: {external:py:class}`bool`
+        :param tempdir: The directory to write temporary files to.
+        :type tempdir: {py:class}`os.PathLike` or {py:obj}`None`
+        :rtype: {external:py:class}`collections.Counter`,
+          {external:py:class}`list`, or {external:py:class}`Iterator`
+        """
+        check_int_positive_or_none('top', top)
+        check_int_positive_or_none('max_keys', max_keys)
+        if stream and top is not None:
+            raise TypeError("'stream' and 'top' are mutually exclusive")
+        if not approx:
+            if capacity is not None:
+                raise TypeError("'capacity' requires 'approx' to be true")
+            if sketch:
+                raise TypeError("'sketch' requires 'approx' to be true")
+            def pipe_frequencies(res):
+                if max_keys is None:
+                    ret = collections.Counter(res)
+                    if stream:
+                        return iter(ret.items())
+                    return ret if top is None else ret.most_common(top)
+                pairs = spill_groups(
+                    res, collections.Counter.update, operator.add,
+                    max_groups=max_keys, table=collections.Counter, dir=tempdir,
+                )
+                if stream:
+                    return pairs
+                if top is not None:
+                    return heapq.nlargest(top, pairs, key=operator.itemgetter(1))
+                ret = collections.Counter()
+                # `Counter.update` would count the pairs themselves.
+                dict.update(ret, pairs)
+                return ret
+        else:
+            if max_keys is not None:
+                raise TypeError("'max_keys' requires 'approx' to be false")
+            if stream:
+                raise TypeError("'stream' requires 'approx' to be false")
+            if capacity is None:
+                if top is None:
+                    raise TypeError("'top' or 'capacity' must be provided if 'approx' is true")
+                capacity = 10 * top
+            check_int_positive('capacity', capacity)
+            def pipe_frequencies(res):
+                ss = SpaceSaving(capacity)
+                ss.update(res)
+                return ss if sketch else ss.most_common(top)
         return self._evaluate(sink=pipe_frequencies)
 
+    @partialclassmethod
+    def group_aggregate(self, key, /, **aggregators):
+        """
+        {{pipe_sink}} Return a {external:py:class}`dict` of several named
+        aggregates for each group of elements under the same `key` function
+        result, like SQL's `GROUP BY`.
+
+        This is equivalent to `groupby(key, agg=aggregators)`; see
+        {py:meth}`Pipe.groupby`, and {py:meth}`Pipe.aggregate` for the
+        aggregators available.
+
+        ```{ipython}
+
+        In [1]: sales = [
+           ...:     {'region': 'east', 'amount': 10},
+           ...:     {'region': 'west', 'amount': 5},
+           ...:     {'region': 'east', 'amount': 7},
+           ...: ]
+
+        In [1]: Pipe(sales).group_aggregate(X['region'], n='count', total=('sum', X['amount']))
+        Out[1]: {'east': {'n': 2, 'total': 17}, 'west': {'n': 1, 'total': 5}}
+        ```
+
+        :rtype: {external:py:class}`dict`
+        """
+        return self.groupby(key, agg=aggregators)
+
     @partialclassmethod
     @multilambda('key')
-    def groupby(self, key=_MISSING):
+    def groupby(self, key=_MISSING, *, agg=None, max_keys=None, stream=False, tempdir=None):
         """
         {{pipe_sink}} Return a {external:py:class}`dict` grouping
         together elements under the same `key` function result.
 
+        If `agg` is provided, aggregate each group as its elements arrive,
+        rather than collecting them into a list, so that memory use depends
+        only on the number of groups. `agg` may be either a single aggregator,
+        in which case each group's value is its result, or a mapping of names
+        and aggregators, in which case each group's value is a dict of each
+        name and its result. See {py:meth}`Pipe.aggregate` for the aggregators
+        available, and {py:meth}`Pipe.group_aggregate` for a shortcut.
+
+        If `max_keys` is provided, hold at most about that many groups in
+        memory at a time. Whenever there are more, the partial groups are
+        spilled to anonymous temporary files in `tempdir` (defaulting to the
+        system temporary directory), partitioned by a hash of their keys; each
+        partition is then read back and its partial groups combined, one
+        partition at a time. If spilling occurs, the order of the groups is
+        unspecified. Items (or, with `agg`, aggregator states) must be
+        picklable, and aggregators must support merging.
+
+        If `stream` is true, return an iterator of `(key, value)` pairs
+        rather than a dict, so that with `max_keys`, the result need not fit
+        in memory either.
+
         Contrast with {py:meth}`Pipe.chunkby`, which is a step that yields
         groups of matching adjacent elements.
 
@@ -3031,13 +4364,74 @@ class Pipe:
         In [1]: (Pipe([1, 2, 3, 4, 5, 6, 7, 8, 9, 10])
            ...: .groupby(lambda x: 'even' if x % 2 == 0 else 'odd'))
         Out[1]: {'odd': [1, 3, 5, 7, 9], 'even': [2, 4, 6, 8, 10]}
+
+        In [1]: (Pipe([1, 2, 3, 4, 5, 6, 7, 8, 9, 10])
+           ...: .groupby(lambda x: 'even' if x % 2 == 0 else 'odd', agg='sum'))
+        Out[1]: {'odd': 25, 'even': 30}
+
+        In [1]: (Pipe([1, 2, 3, 4, 5, 6, 7, 8, 9, 10])
+           ...: .groupby(X % 3, agg={'n': 'count', 'hi': 'max', 'squares': ('sum', X * X)}))
+        Out[1]:
+        {1: {'n': 4, 'hi': 10, 'squares': 166},
+         2: {'n': 3, 'hi': 8, 'squares': 93},
+         0: {'n': 3, 'hi': 9, 'squares': 126}}
+
+        In [1]: sorted(Pipe.rangetil(100_000).groupby(X % 5, agg='count', max_keys=2, stream=True))
+        Out[1]: [(0, 20000), (1, 20000), (2, 20000), (3, 20000), (4, 20000)]
         ```
-        """
+
+        :param agg: An aggregator, or a mapping of names and aggregators, to
+          apply to each group.
+        :param max_keys: The maximum number of groups to hold in memory at
+          once.
+        :type max_keys: {external:py:class}`int` or {py:obj}`None`
+        :param stream: Whether to return an iterator of pairs rather than a
+          dict.
+        :type stream: {external:py:class}`bool`
+        :param tempdir: The directory to write temporary files to.
+        :type tempdir: {py:class}`os.PathLike` or {py:obj}`None`
+        :rtype: {external:py:class}`dict` or {external:py:class}`Iterator`
+        """
+        check_int_positive_or_none('max_keys', max_keys)
+        if agg is None:
+            table = functools.partial(collections.defaultdict, list)
+            def update(groups, items):
+                for item in items:
+                    groups[key(item)].append(item)
+            def merge(group, other):
+                group.extend(other)
+                return group
+            def result(group):
+                return group
+        else:
+            if isinstance(agg, Mapping):
+                aggregation = Aggregation(agg)
+                def result(state):
+                    return aggregation.result(state)
+            else:
+                aggregation = Aggregation({'agg': agg})
+                def result(state):
+                    return aggregation.result(state)['agg']
+            if max_keys is not None:
+                for name, aggregator in zip(aggregation.names, aggregation.aggregators):
+                    if aggregator.merge is None:
+                        raise TypeError(f"Aggregator {name!r} does not support merging, as 'max_keys' requires")
+            table = dict
+            def update(states, items):
+                aggregation.update_groups(states, items, key)
+            def merge(state, other):
+                aggregation.merge(state, other)
+                return state
         def pipe_groupby(res):
-            ret = collections.defaultdict(list)
-            for item in res:
-                ret[key(item)].append(item)
-            return dict(ret)
+            if max_keys is None:
+                states = table()
+                update(states, res)
+                pairs = states.items()
+            else:
+                pairs = spill_groups(res, update, merge, max_groups=max_keys, table=table, dir=tempdir)
+            if stream:
+                return ((group, result(state)) for group, state in pairs)
+            return {group: result(state) for group, state in pairs}
         return self._evaluate(sink=pipe_groupby)
 
     @partialclassmethod
@@ -3113,12 +4507,27 @@ class Pipe:
         return self._evaluate(sink=pipe_max)
 
     @partialclassmethod
-    def mean(self, *, default=_MISSING):
+    def mean(self, *, default=_MISSING, precision=None):
         """
         {{pipe_sink}} Return the mean (average value) of this pipe's items.
 
         If `default` is provided, return it if the iterable is empty.
 
+        `precision` may be one of:
+
+        - `'fast'`: Sum the items and divide by their number, in a single
+          pass without holding the items in memory.
+        - `'fsum'`: Use {external:py:func}`statistics.fmean`, which converts
+          items to floats and sums them with {external:py:func}`math.fsum`, in
+          a single pass; slightly slower than `'fast'`, but with a correctly
+          rounded sum.
+        - `'exact'`: Use {external:py:func}`statistics.mean`, which holds all
+          items in memory and computes the mean with exact fractions before
+          rounding; this is much slower, but immune to rounding error.
+
+        If `precision` is not provided, use the pipe's precision; see
+        {py:meth}`Pipe.set_precision`.
+
         Contrast with {py:meth}`Pipe.median` and {py:meth}`Pipe.mode`.
 
         See {external:py:func}`statistics.mean`.
@@ -3131,23 +4540,49 @@ class Pipe:
         In [1]: Pipe([]).mean(default='meow')
         Out[1]: 'meow'
         ```
+
+        :param precision: How to trade speed for precision.
+        :type precision: {external:py:class}`str` or {py:obj}`None`
         """
-        def pipe_mean(seq):
-            try:
-                return statistics.mean(seq)
-            except statistics.StatisticsError:
-                if default is not _MISSING:
-                    return default
-                raise
+        precision = self._get_precision(precision)
+        match precision:
+            case 'fast':
+                def pipe_mean(res):
+                    try:
+                        return stats_mean(res)
+                    except statistics.StatisticsError:
+                        if default is not _MISSING:
+                            return default
+                        raise
+            case 'fsum':
+                def pipe_mean(res):
+                    try:
+                        return statistics.fmean(res)
+                    except statistics.StatisticsError:
+                        if default is not _MISSING:
+                            return default
+                        raise
+            case 'exact':
+                def pipe_mean(seq):
+                    try:
+                        return statistics.mean(seq)
+                    except statistics.StatisticsError:
+                        if default is not _MISSING:
+                            return default
+                        raise
         return self._evaluate(sink=pipe_mean)
 
     @partialclassmethod
-    def median(self, *, default=_MISSING):
+    def median(self, *, default=_MISSING, approx=False, k=200):
         """
         {{pipe_sink}} Return the median (middle value) of this pipe's items.
 
         If `default` is provided, return it if the iterable is empty.
 
+        If `approx` is true, estimate the median with a streaming sketch in
+        bounded memory, rather than sorting all items; see
+        {py:meth}`Pipe.quantiles` for details and the meaning of `k`.
+
         Contrast with {py:meth}`Pipe.mean` and {py:meth}`Pipe.mode`.
 
         See {external:py:func}`statistics.median`.
@@ -3162,15 +4597,30 @@ class Pipe:
 
         In [1]: Pipe([]).median(default='meow')
         Out[1]: 'meow'
+
+        In [1]: Pipe.rangetil(1_000_000).median(approx=True)
+        Out[1]: 501224
         ```
         """
-        def pipe_median(res):
-            try:
-                return statistics.median(res)
-            except statistics.StatisticsError:
-                if default is not _MISSING:
-                    return default
-                raise
+        if approx:
+            # Validate eagerly, rather than upon evaluation
+            KLLSketch(k)
+            def pipe_median(res, rng):
+                kll = KLLSketch(k, rng=rng)
+                kll.update(res)
+                if not len(kll):
+                    if default is not _MISSING:
+                        return default
+                    raise statistics.StatisticsError("no median for empty data")
+                return kll.quantile(0.5)
+        else:
+            def pipe_median(res):
+                try:
+                    return statistics.median(res)
+                except statistics.StatisticsError:
+                    if default is not _MISSING:
+                        return default
+                    raise
         return self._evaluate(sink=pipe_median)
 
     @partialclassmethod
@@ -3284,17 +4734,8 @@ class Pipe:
         Out[1]: ('meow', 'meow')
         ```
         """
-        def pipe_minmax(ix):
-            try:
-                first_item = next(ix)
-            except StopIteration as exc:
-                if default is _MISSING:
-                    raise ValueError("minmax applied to empty iterable") from exc
-                return (default, default)
-            def _minmax_fold(a, b):
-                _min, _max = a
-                return (builtins.min(_min, b, key=key), builtins.max(_max, b, key=key))
-            return functools.reduce(_minmax_fold, ix, (first_item, first_item))
+        def pipe_minmax(res):
+            return minmax(res, key=key, default=default)
         return self._evaluate(sink=pipe_minmax)
 
     @partialclassmethod
@@ -3409,27 +4850,42 @@ class Pipe:
         return self._evaluate(sink=pipe_nth)
 
     @partialclassmethod
-    def struct_pack(self, format_, /):
+    def struct_pack(self, format_, /, *, file=None):
         """
         {{pipe_sink}} Return packed {external:py:class}`bytes` from this pipe's
         items using `format`.
 
         See {external:py:func}`struct.pack`.
 
+        Each record takes as many items as `format_` has values. Records are
+        packed with a cached {external:py:class}`struct.Struct` directly into
+        a single growing buffer, rather than as separate `bytes` objects; if
+        every value of `format_` has the same integer or double type, items
+        are instead gathered into an {external:py:class}`array.array`
+        (or if the source is already an array of that type, it's used as-is)
+        and its bytes are taken whole.
+
+        If `file` is provided, packed bytes are written to it in blocks as
+        they're produced, so the result is never held in memory as a whole,
+        and the number of bytes written is returned instead.
+
         ```{ipython}
 
         In [1]: Pipe([1464812877, 1179602775]).struct_pack('<i')
         Out[1]: b'MEOWWOOF'
+
+        In [1]: Pipe([1, b'ab', 2, b'cd']).struct_pack('>h2s')
+        Out[1]: b'\\x00\\x01ab\\x00\\x02cd'
         ```
+
+        :param format_: The {external:py:mod}`struct` format of each record.
+        :type format_: {external:py:class}`str`
+        :param file: A binary file to write the packed bytes to.
+        :type file: {external:py:class}`typing.BinaryIO`
+        :rtype: {external:py:class}`bytes` or {external:py:class}`int`
         """
-        def pipe_struct_pack(pipe):
-            fsize = calc_struct_input(format_)
-            if not fsize:
-                return b''
-            ret = []
-            for chunk in pipe.chunk(fsize):
-                ret.append(struct.pack(format_, *chunk))
-            return b''.join(ret)
+        def pipe_struct_pack(res):
+            return pack_items(res, format_, file=file)
         return self._evaluate(sink=pipe_struct_pack)
 
     @partialclassmethod
@@ -3482,6 +4938,91 @@ class Pipe:
             return math.prod(res)
         return self._evaluate(sink=pipe_product)
 
+    @partialclassmethod
+    def quantiles(self, qs=None, /, *, default=_MISSING, approx=False, k=200, sketch=False):
+        """
+        {{pipe_sink}} Return a list of the quantiles of this pipe's items, one
+        for each probability (between 0 and 1, inclusive) in `qs`.
+
+        If `default` is provided, return it if the iterable is empty.
+
+        By default, quantiles are exact, and are linearly interpolated between
+        the two nearest items, so that the 0.5 quantile is the median, as with
+        {py:meth}`Pipe.median`. (This matches the "inclusive" method of
+        {external:py:func}`statistics.quantiles`.) Items are selected with
+        {wp}`quickselect`, in O(n) expected time rather than that of a full
+        sort, but all items must still be held in memory.
+
+        If `approx` is true, instead estimate quantiles with a streaming
+        {wp}`KLL sketch <Quantile_sketch#KLL_sketch>`, which holds about
+        `3 * k` items regardless of the number of items in the pipe.
+        Estimated quantiles are always items from the pipe, without
+        interpolation. Their error is measured in rank: for the default `k` of
+        200, each estimate's true rank is within about 1.65% of the requested
+        rank with 99% confidence; e.g., an estimated 0.99 quantile falls
+        between the true 0.9735 and 1.0 quantiles. Error shrinks roughly in
+        proportion to `1 / k`. Sketch compaction is randomized using the
+        pipe's RNG.
+
+        If `sketch` is also true, omit `qs` and return the sketch itself, a
+        `seittik.utils.sketches.KLLSketch`, rather than its estimates.
+        Sketches with the same `k` can be merged with `|` (or in place with
+        their `merge` method) to summarize several pipes, and then queried
+        with their `quantiles` method.
+
+        ```{ipython}
+
+        In [1]: Pipe([1, 2, 3, 5, 8, 13]).quantiles([0, 0.5, 0.9, 1])
+        Out[1]: [1, 4.0, 10.5, 13]
+
+        In [1]: Pipe.rangetil(1_000_000).quantiles([0.5, 0.95, 0.99], approx=True)
+        Out[1]: [499956, 949298, 989886]
+        ```
+
+        :param qs: The probabilities of the quantiles to return.
+        :type qs: {external:py:class}`~collections.abc.Iterable`
+        :param approx: Whether to estimate quantiles with a sketch.
+        :type approx: {external:py:class}`bool`
+        :param k: The size parameter of the sketch, if `approx` is true.
+        :type k: {external:py:class}`int`
+        :param sketch: Whether to return the sketch rather than its estimates,
+          if `approx` is true.
+        :type sketch: {external:py:class}`bool`
+        :rtype: {external:py:class}`list`
+        """
+        if sketch:
+            if not approx:
+                raise TypeError("'sketch' requires 'approx' to be true")
+            if qs is not None:
+                raise TypeError("'qs' must not be provided if 'sketch' is true")
+        else:
+            if qs is None:
+                raise TypeError("quantiles() missing required argument 'qs'")
+            qs = builtins.tuple(qs)
+            for q in qs:
+                check_quantile('q', q)
+        if approx:
+            # Validate eagerly, rather than upon evaluation
+            KLLSketch(k)
+            def pipe_quantiles(res, rng):
+                kll = KLLSketch(k, rng=rng)
+                kll.update(res)
+                if sketch:
+                    return kll
+                if not len(kll):
+                    if default is not _MISSING:
+                        return default
+                    raise statistics.StatisticsError("quantiles requires at least one data point")
+                return kll.quantiles(qs)
+        else:
+            def pipe_quantiles(seq, rng):
+                if not seq:
+                    if default is not _MISSING:
+                        return default
+                    raise statistics.StatisticsError("quantiles requires at least one data point")
+                return exact_quantiles(seq, qs, rng=rng)
+        return self._evaluate(sink=pipe_quantiles)
+
     @partialclassmethod
     def shuffle(self):
         """
@@ -3505,7 +5046,35 @@ class Pipe:
         return self._evaluate(sink=pipe_shuffle)
 
     @partialclassmethod
-    def stdev(self, sample=False, mean=None):
+    def stats(self):
+        """
+        {{pipe_sink}} Return the running count, mean, and variance of this
+        pipe's items, as a `seittik.utils.statsutils.RunningStats`.
+
+        The stats are computed in a single pass in O(1) memory, and have
+        `count` and `mean` attributes, and `variance(sample=False)` and
+        `stdev(sample=False)` methods. Stats from several pipes can be merged
+        with `|` (or in place with their `merge` method), e.g. to combine
+        results computed in parallel.
+
+        ```{ipython}
+
+        In [1]: a = Pipe([4, 6, 6, 6]).stats()
+
+        In [1]: b = Pipe([7, 7, 9, 11]).stats()
+
+        In [1]: ab = a | b
+
+        In [1]: ab.count, ab.mean, ab.variance(), ab.stdev(sample=True)
+        Out[1]: (8, 7.0, 4.0, 2.138089935299395)
+        ```
+        """
+        def pipe_stats(res):
+            return RunningStats(res)
+        return self._evaluate(sink=pipe_stats)
+
+    @partialclassmethod
+    def stdev(self, sample=False, mean=None, *, precision=None):
         """
         {{pipe_sink}} Return the standard deviation of the pipe's items.
 
@@ -3515,6 +5084,22 @@ class Pipe:
         If `mean` is provided, it should be the already-computed mean of the
         sample or population.
 
+        `precision` may be one of:
+
+        - `'fast'`: Compute the standard deviation in a single pass without
+          holding the items in memory, using Welford's algorithm; see
+          {py:meth}`Pipe.stats`.
+        - `'fsum'`: Hold all items in memory and compute the variance with
+          {external:py:func}`math.fsum` over two or three passes; slower than
+          `'fast'`, but with correctly rounded sums.
+        - `'exact'`: Use {external:py:func}`statistics.stdev` or
+          {external:py:func}`statistics.pstdev`, which hold all items in
+          memory and compute the variance with exact fractions before
+          rounding; this is much slower, but immune to rounding error.
+
+        If `precision` is not provided, use the pipe's precision; see
+        {py:meth}`Pipe.set_precision`.
+
         See {py:func}`statistics.stdev` and {py:func}`statistics.pstdev`.
 
         ```{ipython}
@@ -3525,32 +5110,297 @@ class Pipe:
         In [1]: Pipe([4, 6, 6, 6, 7, 7, 9, 11]).stdev(sample=True)
         Out[1]: 2.138089935299395
         ```
-        """
-        def pipe_stdev(seq):
-            if sample:
-                return statistics.stdev(seq, xbar=mean)
-            return statistics.pstdev(seq, mu=mean)
+
+        :param precision: How to trade speed for precision.
+        :type precision: {external:py:class}`str` or {py:obj}`None`
+        """
+        precision = self._get_precision(precision)
+        match precision:
+            case 'fast':
+                def pipe_stdev(res):
+                    return stats_sqrt(stats_variance(res, sample=sample, mu=mean))
+            case 'fsum':
+                def pipe_stdev(seq):
+                    return math.sqrt(fsum_variance(seq, sample=sample, mu=mean))
+            case 'exact':
+                def pipe_stdev(seq):
+                    if sample:
+                        return statistics.stdev(seq, xbar=mean)
+                    return statistics.pstdev(seq, mu=mean)
         return self._evaluate(sink=pipe_stdev)
 
     @partialclassmethod
-    def sum(self):
+    def sum(self, *, precision=None):
         """
         {{pipe_sink}} Return the arithmetical addition of the pipe's items.
 
+        `precision` may be one of:
+
+        - `'fast'`: Use {external:py:func}`sum`.
+        - `'fsum'`: Use {external:py:func}`math.fsum`, which converts items
+          to floats and returns a correctly rounded sum; slower than `'fast'`,
+          but immune to accumulated rounding error.
+        - `'exact'`: Accumulate floats as exact fractions, rounding once at the
+          end; like `'fsum'` for floats, but much slower, and other types
+          (e.g., {external:py:class}`int` or
+          {external:py:class}`~fractions.Fraction`) are summed as-is.
+
+        If `precision` is not provided, use the pipe's precision; see
+        {py:meth}`Pipe.set_precision`.
+
         See {external:py:func}`sum`.
 
         ```{ipython}
 
         In [1]: Pipe([1, 2, 3, 4, 5]).sum()
         Out[1]: 15
+
+        In [1]: Pipe([0.1] * 10).sum()
+        Out[1]: 0.9999999999999999
+
+        In [1]: Pipe([0.1] * 10).sum(precision='fsum')
+        Out[1]: 1.0
         ```
-        """
-        def pipe_sum(res):
-            return builtins.sum(res)
+
+        :param precision: How to trade speed for precision.
+        :type precision: {external:py:class}`str` or {py:obj}`None`
+        """
+        precision = self._get_precision(precision)
+        match precision:
+            case 'fast':
+                def pipe_sum(res):
+                    return builtins.sum(res)
+            case 'fsum':
+                def pipe_sum(res):
+                    return math.fsum(res)
+            case 'exact':
+                def pipe_sum(res):
+                    return exact_sum(res)
         return self._evaluate(sink=pipe_sum)
 
     @partialclassmethod
-    def variance(self, sample=False, mean=None):
+    def to_file(self, file, /, *, compression='infer', atomic=False, buffer_size=WRITE_BUFFER_SIZE):
+        """
+        {{pipe_sink}} Write this pipe's items, which must be bytes-like, to a
+        binary file, and return a tuple of the number of items and bytes
+        written.
+
+        `file` can be a path or a binary file object, which is left open.
+        Items are joined together in batches, and written only once at least
+        `buffer_size` bytes are pending, so memory use is bounded by the
+        buffer rather than by the size of the output.
+
+        If `compression` is `'gzip'`, `'bz2'`, or `'lzma'`, the output is
+        compressed as it's written; by default, the compression is inferred
+        from the path's suffix (`.gz`, `.bz2`, `.xz`, or `.lzma`), and `None`
+        writes it as-is. Compression is never inferred for a file object,
+        which may already compress its output (e.g. one returned by
+        {external:py:func}`gzip.open`). The number of bytes returned is always
+        that of the uncompressed output.
+
+        If `atomic` is true, the output is written to a temporary file next
+        to `file`, which is renamed over it only once every item has been
+        written; if anything goes wrong, the temporary file is removed, and
+        `file` is left untouched.
+
+        Contrast with {py:meth}`Pipe.to_lines`.
+
+        ```{ipython}
+
+        In [1]: import io
+
+        In [1]: f = io.BytesIO()
+
+        In [1]: Pipe([b'MEOW', b'WOOF']).to_file(f)
+        Out[1]: (2, 8)
+
+        In [1]: f.getvalue()
+        Out[1]: b'MEOWWOOF'
+        ```
+
+        :param file: The path of the file to write, or a binary file object.
+        :type file: {py:class}`os.PathLike` or {external:py:class}`typing.BinaryIO`
+        :param compression: The output's compression format.
+        :type compression: {external:py:class}`str` or {py:obj}`None`
+        :param atomic: Whether to replace the file only once it's complete.
+        :type atomic: {external:py:class}`bool`
+        :param buffer_size: The minimum number of bytes to write at once.
+        :type buffer_size: {external:py:class}`int`
+        :rtype: {external:py:class}`tuple`
+        """
+        check_compression('compression', compression)
+        check_atomic(file, atomic)
+        check_int_positive('buffer_size', buffer_size)
+
+        def pipe_to_file(res):
+            with open_writer(file, compression=compression, atomic=atomic) as f:
+                return write_batched(f, res, b''.join, buffer_size=buffer_size)
+        return self._evaluate(sink=pipe_to_file)
+
+    @partialclassmethod
+    def to_lines(
+        self, file, /, *, encoding='utf-8', errors='strict', newline='\n',
+        compression='infer', atomic=False, buffer_size=WRITE_BUFFER_SIZE,
+    ):
+        """
+        {{pipe_sink}} Write this pipe's items, which must be strings, to a text
+        file as lines ending with `newline`, and return a tuple of the number
+        of lines and bytes written.
+
+        Lines are encoded with `encoding` in batches, rather than one at a
+        time. See {py:meth}`Pipe.to_file` for the other arguments, which are
+        the same.
+
+        ```{ipython}
+
+        In [1]: import io
+
+        In [1]: f = io.BytesIO()
+
+        In [1]: Pipe(['meow', 'woof']).to_lines(f)
+        Out[1]: (2, 10)
+
+        In [1]: f.getvalue()
+        Out[1]: b'meow\\nwoof\\n'
+        ```
+
+        :param file: The path of the file to write, or a binary file object.
+        :type file: {py:class}`os.PathLike` or {external:py:class}`typing.BinaryIO`
+        :param encoding: The file's text encoding.
+        :type encoding: {external:py:class}`str`
+        :param errors: How to handle encoding errors; see
+          {external:py:func}`open`.
+        :type errors: {external:py:class}`str`
+        :param newline: The string ending each line.
+        :type newline: {external:py:class}`str`
+        :param compression: The output's compression format.
+        :type compression: {external:py:class}`str` or {py:obj}`None`
+        :param atomic: Whether to replace the file only once it's complete.
+        :type atomic: {external:py:class}`bool`
+        :param buffer_size: The minimum number of bytes to write at once.
+        :type buffer_size: {external:py:class}`int`
+        :rtype: {external:py:class}`tuple`
+        """
+        check_compression('compression', compression)
+        check_atomic(file, atomic)
+        check_int_positive('buffer_size', buffer_size)
+
+        def encode(lines):
+            return (newline.join(lines) + newline).encode(encoding, errors)
+
+        def pipe_to_lines(res):
+            with open_writer(file, compression=compression, atomic=atomic) as f:
+                return write_batched(f, res, encode, buffer_size=buffer_size)
+        return self._evaluate(sink=pipe_to_lines)
+
+    @partialclassmethod
+    def to_partitions(
+        self, key, path_template, /, *, serialize=None, max_open=PARTITION_MAX_OPEN,
+        binary=False, encoding='utf-8', errors='strict', newline='\n',
+        compression='infer', buffer_size=PARTITION_BUFFER_SIZE,
+        max_pending=PARTITION_MAX_PENDING,
+    ):
+        """
+        {{pipe_sink}} Write each of this pipe's items to a file chosen by its
+        result for `key`, and return a {external:py:class}`dict` of the number
+        of items written to each key's file, in order of first appearance.
+
+        Each key's path is `path_template.format(key=key)`, or if
+        `path_template` is callable, `path_template(key)`; missing parent
+        directories are created as needed. If `serialize` is provided, each
+        item is written as `serialize(item)`, so that e.g. records can be
+        keyed by a field and written as JSON. As with
+        {py:meth}`Pipe.to_lines`, items are written as lines of text, or if
+        `binary` is true, as with {py:meth}`Pipe.to_file`, as bytes.
+
+        This is a streaming counterpart to {py:meth}`Pipe.groupby`. Each
+        key's items are buffered separately until about `buffer_size` bytes
+        are pending, then written together, so only one partition's file is
+        touched at a time. If more than `max_pending` bytes are pending
+        across all keys, the largest buffers are written early, so memory use
+        stays bounded however many keys there are. At most `max_open` files
+        are kept open; when another is needed, the least recently used is
+        closed, and later reopened for appending if needed again, so any
+        number of partitions can be written without running out of file
+        handles. Each file is truncated when it's first opened.
+
+        Compressed files (see {py:meth}`Pipe.to_file`) get a new compressed
+        stream each time they're reopened, which is transparent to
+        decompressors, including {py:meth}`Pipe.lines`.
+
+        ```{ipython}
+
+        In [1]: import tempfile, pathlib
+
+        In [1]: root = pathlib.Path(tempfile.mkdtemp())
+
+        In [1]: events = [{'day': 'mon', 'msg': 'meow'}, {'day': 'tue', 'msg': 'woof'}, {'day': 'mon', 'msg': 'baa'}]
+
+        In [1]: Pipe(events).to_partitions(X['day'], root / '{key}.log', serialize=X['msg'])
+        Out[1]: {'mon': 2, 'tue': 1}
+
+        In [1]: Pipe.lines(root / 'mon.log').list()
+        Out[1]: ['meow', 'baa']
+        ```
+
+        :param key: A function returning an item's partition key.
+        :type key: {external:py:class}`collections.abc.Callable`
+        :param path_template: A path format string with a `{key}` field, or a
+          function returning each key's path.
+        :type path_template: {external:py:class}`str` or
+          {external:py:class}`collections.abc.Callable`
+        :param serialize: A function returning the string or bytes to write
+          for an item.
+        :type serialize: {external:py:class}`collections.abc.Callable` or
+          {py:obj}`None`
+        :param max_open: The maximum number of files to keep open at once.
+        :type max_open: {external:py:class}`int`
+        :param binary: Whether to write bytes-like items as-is, rather than
+          strings as lines.
+        :type binary: {external:py:class}`bool`
+        :param encoding: The text encoding of lines.
+        :type encoding: {external:py:class}`str`
+        :param errors: How to handle encoding errors; see
+          {external:py:func}`open`.
+        :type errors: {external:py:class}`str`
+        :param newline: The string ending each line.
+        :type newline: {external:py:class}`str`
+        :param compression: The output's compression format.
+        :type compression: {external:py:class}`str` or {py:obj}`None`
+        :param buffer_size: The number of bytes to buffer per partition.
+        :type buffer_size: {external:py:class}`int`
+        :param max_pending: The number of bytes to buffer across all
+          partitions.
+        :type max_pending: {external:py:class}`int`
+        :rtype: {external:py:class}`dict`
+        """
+        check_int_positive('max_open', max_open)
+        check_compression('compression', compression)
+        check_int_positive('buffer_size', buffer_size)
+        check_int_positive('max_pending', max_pending)
+        if callable(path_template):
+            path = path_template
+        else:
+            template = os.fspath(path_template)
+
+            def path(k):
+                return template.format(key=k)
+        if binary:
+            encode = b''.join
+        else:
+            def encode(lines):
+                return (newline.join(lines) + newline).encode(encoding, errors)
+
+        def pipe_to_partitions(res):
+            return write_partitions(
+                res, key, path, serialize=serialize, encode=encode,
+                compression=compression, max_open=max_open, buffer_size=buffer_size,
+                max_pending=max_pending,
+            )
+        return self._evaluate(sink=pipe_to_partitions)
+
+    @partialclassmethod
+    def variance(self, sample=False, mean=None, *, precision=None):
         """
         {{pipe_sink}} Return the variance of the pipe's items.
 
@@ -3560,21 +5410,52 @@ class Pipe:
         If `mean` is provided, it should be the already-computed mean of the
         sample or population.
 
+        `precision` may be one of:
+
+        - `'fast'`: Compute the variance in a single pass without holding the
+          items in memory, using Welford's algorithm; see
+          {py:meth}`Pipe.stats`.
+        - `'fsum'`: Hold all items in memory and compute the variance with
+          {external:py:func}`math.fsum` over two or three passes; slower than
+          `'fast'`, but with correctly rounded sums.
+        - `'exact'`: Use {external:py:func}`statistics.variance` or
+          {external:py:func}`statistics.pvariance`, which hold all items in
+          memory and compute the variance with exact fractions before
+          rounding; this is much slower, but immune to rounding error.
+
+        If `precision` is not provided, use the pipe's precision; see
+        {py:meth}`Pipe.set_precision`.
+
         See {py:func}`statistics.variance` and {py:func}`statistics.pvariance`.
 
         ```{ipython}
 
         In [1]: Pipe([4, 6, 6, 6, 7, 7, 9, 11]).variance()
-        Out[1]: 4
+        Out[1]: 4.0
 
         In [1]: Pipe([4, 6, 6, 6, 7, 7, 9, 11]).variance(sample=True)
         Out[1]: 4.571428571428571
+
+        In [1]: Pipe([4, 6, 6, 6, 7, 7, 9, 11]).variance(precision='exact')
+        Out[1]: 4
         ```
-        """
-        def pipe_variance(seq):
-            if sample:
-                return statistics.variance(seq, xbar=mean)
-            return statistics.pvariance(seq, mu=mean)
+
+        :param precision: How to trade speed for precision.
+        :type precision: {external:py:class}`str` or {py:obj}`None`
+        """
+        precision = self._get_precision(precision)
+        match precision:
+            case 'fast':
+                def pipe_variance(res):
+                    return stats_variance(res, sample=sample, mu=mean)
+            case 'fsum':
+                def pipe_variance(seq):
+                    return fsum_variance(seq, sample=sample, mu=mean)
+            case 'exact':
+                def pipe_variance(seq):
+                    if sample:
+                        return statistics.variance(seq, xbar=mean)
+                    return statistics.pvariance(seq, mu=mean)
         return self._evaluate(sink=pipe_variance)
 
     @partialclassmethod
@@ -3596,8 +5477,8 @@ class Pipe:
         Out[1]: 4
         ```
         """
-        def pipe_width(pipe):
-            min_value, max_value = pipe.minmax(default=default, key=key)
+        def pipe_width(res):
+            min_value, max_value = minmax(res, key=key, default=default)
             return max_value - min_value
         return self._evaluate(sink=pipe_width)
 
@@ -0,0 +1,416 @@
+"""
+Aggregators: reducers that summarize a stream of items in a single pass,
+several at a time.
+"""
+from collections.abc import Callable, Mapping
+import functools
+import itertools
+import operator
+
+from .sentinels import _MISSING
+from .statsutils import RunningStats
+
+
+__all__ = ()
+
+
+BATCH_SIZE = 1024
+"""
+The maximum number of items held in memory at once by
+{py:meth}`Aggregation.update`.
+"""
+
+
+class Aggregator:
+    """
+    A reducer defined by up to four functions:
+
+    - `init()` returns a new, empty state.
+    - `step(state, item)` returns the state updated with `item`. (It may
+      mutate `state` and return it.)
+    - `result(state)` returns the final value for a state; by default, the
+      state itself.
+    - `merge(state_a, state_b)` returns a state combining two states computed
+      separately, e.g. in parallel; without it, states can't be merged.
+
+    If `key` is provided, `step` receives `key(item)` instead of `item`.
+
+    `update(state, items)`, if provided, returns the state updated with a
+    (non-empty) list of items, and should be equivalent to calling `step`
+    with each item in turn. Items are aggregated in batches, so this can be
+    far faster (e.g., `sum` rather than repeated addition).
+    """
+    def __init__(self, init, step, result=None, merge=None, *, key=None, update=None):
+        for name, func in (('init', init), ('step', step)):
+            if not callable(func):
+                raise TypeError(f"Aggregator {name!r} must be callable; got {func!r}")
+        for name, func in (('result', result), ('merge', merge), ('key', key), ('update', update)):
+            if func is not None and not callable(func):
+                raise TypeError(f"Aggregator {name!r} must be callable or None; got {func!r}")
+        self.init = init
+        self.step = step
+        self.result = result
+        self.merge = merge
+        self.key = key
+        self.update = update
+
+    def __repr__(self):
+        name = getattr(self.step, '__name__', None) or repr(self.step)
+        if self.key is not None:
+            return f'<{self.__class__.__name__} {name} key={self.key!r}>'
+        return f'<{self.__class__.__name__} {name}>'
+
+    def with_key(self, key):
+        """
+        Return a copy of this aggregator that applies `key` to each item.
+        """
+        return self.__class__(self.init, self.step, self.result, self.merge, key=key, update=self.update)
+
+    def update_items(self, state, items):
+        """
+        Return `state` updated with each of `items`, a list.
+        """
+        if self.update is not None:
+            return self.update(state, items)
+        return functools.reduce(self.step, items, state)
+
+
+########################################################################
+# Built-in aggregators
+#
+# These are defined with module-level functions, rather than lambdas, so
+# that their states (and the accumulators holding them) can be pickled.
+
+def _count_step(state, item):
+    return state + 1
+
+
+def _count_update(state, items):
+    return state + len(items)
+
+
+def _sum_init():
+    return 0
+
+
+def _sum_update(state, items):
+    return sum(items, state)
+
+
+def _min_step(state, item):
+    return item if state is _MISSING or item < state else state
+
+
+def _min_merge(a, b):
+    if a is _MISSING:
+        return b
+    if b is _MISSING:
+        return a
+    return b if b < a else a
+
+
+def _min_update(state, items):
+    return _min_merge(state, min(items))
+
+
+def _max_step(state, item):
+    return item if state is _MISSING or item > state else state
+
+
+def _max_merge(a, b):
+    if a is _MISSING:
+        return b
+    if b is _MISSING:
+        return a
+    return b if b > a else a
+
+
+def _max_update(state, items):
+    return _max_merge(state, max(items))
+
+
+def _missing_init():
+    return _MISSING
+
+
+def _missing_result(state):
+    return None if state is _MISSING else state
+
+
+def _first_step(state, item):
+    return item if state is _MISSING else state
+
+
+def _first_merge(a, b):
+    return b if a is _MISSING else a
+
+
+def _first_update(state, items):
+    return items[0] if state is _MISSING else state
+
+
+def _last_step(state, item):
+    return item
+
+
+def _last_merge(a, b):
+    return a if b is _MISSING else b
+
+
+def _last_update(state, items):
+    return items[-1]
+
+
+def _mean_init():
+    return (0, 0)
+
+
+def _mean_step(state, item):
+    return (state[0] + 1, state[1] + item)
+
+
+def _mean_result(state):
+    return state[1] / state[0] if state[0] else None
+
+
+def _mean_merge(a, b):
+    return (a[0] + b[0], a[1] + b[1])
+
+
+def _mean_update(state, items):
+    return (state[0] + len(items), sum(items, state[1]))
+
+
+def _stats_step(state, item):
+    state.add(item)
+    return state
+
+
+def _stats_update(state, items):
+    state.update(items)
+    return state
+
+
+def _variance_result(state):
+    return state.variance() if state.count else None
+
+
+def _stdev_result(state):
+    return state.stdev() if state.count else None
+
+
+def _list_step(state, item):
+    state.append(item)
+    return state
+
+
+def _set_step(state, item):
+    state.add(item)
+    return state
+
+
+def _list_update(state, items):
+    state.extend(items)
+    return state
+
+
+def _set_update(state, items):
+    state.update(items)
+    return state
+
+
+def _set_merge(a, b):
+    a |= b
+    return a
+
+
+AGGREGATORS = {
+    'count': Aggregator(int, _count_step, merge=operator.add, update=_count_update),
+    'sum': Aggregator(_sum_init, operator.add, merge=operator.add, update=_sum_update),
+    'min': Aggregator(_missing_init, _min_step, _missing_result, _min_merge, update=_min_update),
+    'max': Aggregator(_missing_init, _max_step, _missing_result, _max_merge, update=_max_update),
+    'mean': Aggregator(_mean_init, _mean_step, _mean_result, _mean_merge, update=_mean_update),
+    'variance': Aggregator(RunningStats, _stats_step, _variance_result, operator.or_, update=_stats_update),
+    'stdev': Aggregator(RunningStats, _stats_step, _stdev_result, operator.or_, update=_stats_update),
+    'first': Aggregator(_missing_init, _first_step, _missing_result, _first_merge, update=_first_update),
+    'last': Aggregator(_missing_init, _last_step, _missing_result, _last_merge, update=_last_update),
+    'list': Aggregator(list, _list_step, merge=operator.add, update=_list_update),
+    'set': Aggregator(set, _set_step, merge=_set_merge, update=_set_update),
+}
+"""
+The built-in aggregators, by name.
+
+`min`, `max`, `mean`, `variance`, `stdev`, `first`, and `last` result in
+`None` if no items were aggregated. `variance` and `stdev` are for the
+population.
+"""
+
+
+def to_aggregator(spec):
+    """
+    Return an {py:class}`Aggregator` for `spec`, which may be:
+
+    - An {py:class}`Aggregator`.
+    - The name of a built-in aggregator; see {py:data}`AGGREGATORS`.
+    - A tuple of `(init, step, result)` or `(init, step, result, merge)`
+      functions.
+    - A tuple of `(spec, key)`, where `spec` is any of the above, and `key`
+      is a function (such as a shear) to apply to each item.
+    """
+    match spec:
+        case Aggregator():
+            return spec
+        case str():
+            try:
+                return AGGREGATORS[spec]
+            except KeyError:
+                raise ValueError(
+                    f"Unknown aggregator {spec!r}; must be one of {', '.join(map(repr, AGGREGATORS))}"
+                ) from None
+        case (inner, Callable() as key) if not callable(inner):
+            return to_aggregator(inner).with_key(key)
+        case (
+            (Callable(), Callable(), Callable() | None)
+            | (Callable(), Callable(), Callable() | None, Callable() | None)
+        ):
+            return Aggregator(*spec)
+        case _:
+            raise TypeError(f"Invalid aggregator {spec!r}")
+
+
+class Aggregation:
+    """
+    A set of named aggregators, computed together over the same items.
+
+    An aggregation's state is a list holding the state of each aggregator.
+    States are kept separate from the aggregation itself so that many can be
+    kept at once (e.g., one per group) without duplicating the aggregators.
+    """
+    def __init__(self, specs):
+        if not isinstance(specs, Mapping):
+            raise TypeError(f"Aggregators must be provided as a mapping of names; got {specs!r}")
+        if not specs:
+            raise TypeError("At least one aggregator must be provided")
+        self.names = tuple(specs)
+        self.aggregators = tuple(map(to_aggregator, specs.values()))
+        self._plan = tuple((i, agg.step, agg.key) for i, agg in enumerate(self.aggregators))
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {', '.join(self.names)}>"
+
+    def init(self):
+        """
+        Return a new, empty state.
+        """
+        return [agg.init() for agg in self.aggregators]
+
+    def update(self, state, iterable):
+        """
+        Update `state` in place with each item in `iterable`.
+
+        Items are aggregated in batches of up to {py:data}`BATCH_SIZE`.
+        """
+        aggregators = tuple(enumerate(self.aggregators))
+        ix = iter(iterable)
+        while items := list(itertools.islice(ix, BATCH_SIZE)):
+            for i, agg in aggregators:
+                keyed = items if agg.key is None else list(map(agg.key, items))
+                state[i] = agg.update_items(state[i], keyed)
+
+    def update_groups(self, states, iterable, key):
+        """
+        Update `states`, a dict of group keys and states, in place with each
+        item in `iterable`, grouped by `key(item)`.
+
+        A new state is added for each new group.
+        """
+        init = self.init
+        plan = self._plan
+        for item in iterable:
+            group = key(item)
+            state = states.get(group)
+            if state is None:
+                state = states[group] = init()
+            for i, step, item_key in plan:
+                state[i] = step(state[i], item if item_key is None else item_key(item))
+
+    def step(self, state, item):
+        """
+        Update `state` in place with `item`.
+        """
+        for i, step, key in self._plan:
+            state[i] = step(state[i], item if key is None else key(item))
+
+    def merge(self, state, other):
+        """
+        Update `state` in place to combine it with `other`.
+        """
+        for i, agg in enumerate(self.aggregators):
+            if agg.merge is None:
+                raise TypeError(f"Aggregator {self.names[i]!r} does not support merging")
+            state[i] = agg.merge(state[i], other[i])
+
+    def result(self, state):
+        """
+        Return a dict of each aggregator's name and result for `state`.
+        """
+        return {
+            name: (value if agg.result is None else agg.result(value))
+            for name, agg, value in zip(self.names, self.aggregators, state)
+        }
+
+
+class Accumulator:
+    """
+    An {py:class}`Aggregation` together with a single state, updated in place
+    as items are added.
+
+    Accumulators of the same aggregation can be merged with `|` (or in place
+    with `merge`), e.g. to combine partial results computed in parallel.
+    They can be pickled if their aggregators' functions and states can.
+
+    >>> acc = Accumulator(Aggregation({'n': 'count', 'total': 'sum', 'top': 'max'}))
+    >>> acc.update([3, 1, 4])
+    >>> other = Accumulator(acc.aggregation)
+    >>> other.update([1, 5])
+    >>> (acc | other).result()
+    {'n': 5, 'total': 14, 'top': 5}
+    """
+    def __init__(self, aggregation):
+        self.aggregation = aggregation
+        self.state = aggregation.init()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {', '.join(self.aggregation.names)}>"
+
+    def __or__(self, other):
+        if not isinstance(other, Accumulator):
+            return NotImplemented
+        ret = self.__class__(self.aggregation)
+        ret.merge(self, other)
+        return ret
+
+    def update(self, iterable):
+        """
+        Add each item in `iterable`.
+        """
+        self.aggregation.update(self.state, iterable)
+
+    def merge(self, *others):
+        """
+        Update this accumulator in place to also include the items added to
+        each of `others`.
+        """
+        for other in others:
+            if other.aggregation.names != self.aggregation.names:
+                raise ValueError(
+                    f"Cannot merge accumulators of different aggregators"
+                    f" ({', '.join(self.aggregation.names)} and {', '.join(other.aggregation.names)})"
+                )
+            self.aggregation.merge(self.state, other.state)
+
+    def result(self):
+        """
+        Return a dict of each aggregator's name and result.
+        """
+        return self.aggregation.result(self.state)
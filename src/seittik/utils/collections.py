@@ -1,3 +1,6 @@
+import collections
+
+
 __all__ = ()
 
 
@@ -26,8 +29,9 @@ class Seen:
     Container that returns `False` the first time a given object is
     tested for membership, and `True` thereafter.
 
-    `key` should be a one-argument function used as a comparison key, and
-    defaults to `hash`.
+    `key` should be a one-argument function used as a comparison key. If it
+    is not provided, objects are compared by equality. (A key of `hash` is
+    faster for large objects, but will treat colliding objects as equal.)
 
     For tracking mutable objects, consider `Seen(id)`.
 
@@ -39,12 +43,12 @@ class Seen:
     >>> [x in s for x in (a, b, c, a, b, c)]
     [False, False, False, True, True, True]
     """
-    def __init__(self, key=hash):
+    def __init__(self, key=None):
         self._seen = set()
         self._key = key
 
     def __contains__(self, obj):
-        obj_key = self._key(obj)
+        obj_key = obj if self._key is None else self._key(obj)
         if obj_key in self._seen:
             return True
         self._seen.add(obj_key)
@@ -58,3 +62,33 @@ class Seen:
 
     def clear(self):
         self._seen.clear()
+
+
+class RecentSeen(Seen):
+    """
+    Like {py:class}`Seen`, but only remembers the `maxlen` most recently
+    seen objects.
+
+    Testing an object for membership marks it as the most recently seen;
+    once more than `maxlen` distinct objects have been seen, the least
+    recently seen object is forgotten.
+
+    >>> s = RecentSeen(2)
+    >>> [x in s for x in (1, 2, 1, 3, 1, 2)]
+    [False, False, True, False, True, False]
+    """
+    def __init__(self, maxlen, key=None):
+        self._seen = collections.OrderedDict()
+        self._key = key
+        self.maxlen = maxlen
+
+    def __contains__(self, obj):
+        obj_key = obj if self._key is None else self._key(obj)
+        seen = self._seen
+        if obj_key in seen:
+            seen.move_to_end(obj_key)
+            return True
+        seen[obj_key] = None
+        if len(seen) > self.maxlen:
+            seen.popitem(last=False)
+        return False
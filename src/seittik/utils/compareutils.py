@@ -1,3 +1,9 @@
+from .sentinels import _MISSING
+
+
+__all__ = ()
+
+
 class Minimum:
     def __eq__(self, other):
         return False
@@ -28,3 +34,39 @@ class Maximum:
 
 MINIMUM = Minimum()
 MAXIMUM = Maximum()
+
+
+def minmax(iterable, *, key=None, default=_MISSING):
+    """
+    Return a tuple of `(min_value, max_value)` for `iterable` in a single
+    pass.
+
+    Ties are resolved the same way as {external:py:func}`min` and
+    {external:py:func}`max`, i.e., the first minimal and first maximal
+    items are returned.
+
+    If `iterable` is empty, return `(default, default)` if `default` is
+    provided; otherwise, raise {py:exc}`ValueError`.
+    """
+    ix = iter(iterable)
+    try:
+        lo = hi = next(ix)
+    except StopIteration as exc:
+        if default is _MISSING:
+            raise ValueError("minmax applied to empty iterable") from exc
+        return (default, default)
+    if key is None:
+        for item in ix:
+            if item < lo:
+                lo = item
+            if item > hi:
+                hi = item
+        return (lo, hi)
+    lo_key = hi_key = key(lo)
+    for item in ix:
+        item_key = key(item)
+        if item_key < lo_key:
+            lo, lo_key = item, item_key
+        if item_key > hi_key:
+            hi, hi_key = item, item_key
+    return (lo, hi)
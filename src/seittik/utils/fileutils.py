@@ -0,0 +1,440 @@
+"""
+Utilities for reading and writing files.
+"""
+import bz2
+import collections
+import contextlib
+import gzip
+import io
+import itertools
+import lzma
+import os
+
+
+__all__ = ()
+
+
+READ_BUFFER_SIZE = 1 << 16
+"""
+The default size of read buffers, in bytes.
+"""
+
+COMPRESSIONS = {
+    'bz2': bz2.BZ2File,
+    'gzip': gzip.GzipFile,
+    'lzma': lzma.LZMAFile,
+}
+"""
+The supported compression formats, and the file classes handling them.
+"""
+
+COMPRESSION_SUFFIXES = {
+    '.bz2': 'bz2',
+    '.gz': 'gzip',
+    '.lzma': 'lzma',
+    '.xz': 'lzma',
+}
+"""
+The file suffixes from which a compression format is inferred.
+"""
+
+
+def check_compression(name, value):
+    if value is not None and value != 'infer' and value not in COMPRESSIONS:
+        choices = ', '.join(map(repr, ['infer', *COMPRESSIONS, None]))
+        raise ValueError(f"{name} must be one of {choices}; got {value!r}")
+
+
+def resolve_compression(path, compression):
+    """
+    Return the compression format of the file at `path`: `compression`
+    itself, unless it's `'infer'`, in which case it's inferred from the
+    path's suffix, or `None` for an unrecognized suffix.
+    """
+    if compression != 'infer':
+        return compression
+    _, suffix = os.path.splitext(os.fspath(path))
+    return COMPRESSION_SUFFIXES.get(suffix.lower())
+
+
+def open_reader(path, *, compression=None, buffer_size=READ_BUFFER_SIZE):
+    """
+    Open the file at `path` for buffered binary reading with a buffer of
+    `buffer_size` bytes, transparently decompressing it if `compression` is
+    provided.
+    """
+    if compression is None:
+        # `buffering=1` requests line buffering, which binary files don't
+        # support, so use the smallest real buffer instead.
+        return open(path, 'rb', buffering=max(buffer_size, 2))
+    return io.BufferedReader(COMPRESSIONS[compression](path, 'rb'), buffer_size)
+
+
+def _advise_sequential(f):
+    # Hint that the file will be read sequentially, so the kernel can read
+    # ahead more aggressively, where supported.
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            pass
+
+
+def _read_full(readinto, view):
+    # Fill `view`, unless the file ends first, returning the bytes read.
+    n = readinto(view)
+    total = n or 0
+    size = len(view)
+    while n and total < size:
+        n = readinto(view[total:])
+        total += n or 0
+    return total
+
+
+def iter_chunks(path, size, *, pool_size=2, copy=False, sequential=True):
+    """
+    Yield the contents of the binary file at `path` in chunks of `size`
+    bytes (the last may be shorter), as {external:py:class}`memoryview`
+    objects.
+
+    Chunks are read with `readinto` directly from an unbuffered file into a
+    pool of `pool_size` reusable buffers, in turn, so no memory is allocated
+    per chunk; each chunk therefore remains valid only until `pool_size`
+    more chunks have been read. If `copy` is true, yield each chunk as
+    {external:py:class}`bytes` instead, which can be kept indefinitely.
+
+    If `sequential` is true, the kernel is advised that the file will be
+    read sequentially with {external:py:func}`os.posix_fadvise`, where
+    supported. The file is closed once the generator is exhausted or
+    closed.
+    """
+    pool = [memoryview(bytearray(size)) for _ in range(pool_size)]
+    with open(path, 'rb', buffering=0) as f:
+        if sequential:
+            _advise_sequential(f)
+        readinto = f.readinto
+        for view in itertools.cycle(pool):
+            n = _read_full(readinto, view)
+            if not n:
+                return
+            chunk = view if n == size else view[:n]
+            yield bytes(chunk) if copy else chunk
+            if n < size:
+                return
+
+
+def _split_text(f, size):
+    # Split text read `size` characters at a time on (translated) newlines,
+    # which is much faster than stripping each line of `f` in turn.
+    tail = ''
+    while chunk := f.read(size):
+        lines = (tail + chunk).split('\n')
+        tail = lines.pop()
+        yield from lines
+    if tail:
+        yield tail
+
+
+def _split_bytes(data, encoding, errors, keepends):
+    text = data.decode(encoding, errors)
+    if keepends:
+        return io.StringIO(text, newline='\n')
+    lines = text.split('\n')
+    if not lines[-1]:
+        # Only the final line of a file may lack a newline.
+        lines.pop()
+    if '\r' in text:
+        lines = [line[:-1] if line.endswith('\r') else line for line in lines]
+    return lines
+
+
+def iter_lines(
+    path, *, encoding='utf-8', errors='strict', compression='infer',
+    buffer_size=READ_BUFFER_SIZE, start=0, end=None, keepends=False,
+):
+    """
+    Yield the lines of the text file at `path`, without their line endings
+    unless `keepends` is true.
+
+    The file is read through a buffer of `buffer_size` bytes, and
+    decompressed according to `compression` (see
+    {py:func}`resolve_compression`). Rather than reading a line at a time,
+    lines are split from blocks of about `buffer_size` characters at a
+    time. The file is closed once the generator is exhausted or closed.
+
+    If `start` or `end` is provided, only lines starting at a byte offset
+    in `[start, end)` are yielded, so a file split into contiguous byte
+    ranges yields each line exactly once. Such files must be uncompressed,
+    use an encoding in which `'\\n'` is always the byte `b'\\n'` (such as
+    UTF-8), and use `'\\n'` or `'\\r\\n'` line endings, which are kept
+    as-is with `keepends`. Otherwise, lines are read with universal
+    newlines.
+    """
+    compression = resolve_compression(path, compression)
+    if not start and end is None:
+        with io.TextIOWrapper(
+            open_reader(path, compression=compression, buffer_size=buffer_size),
+            encoding=encoding, errors=errors,
+        ) as f:
+            if keepends:
+                yield from f
+            else:
+                yield from _split_text(f, buffer_size)
+        return
+    if compression is not None:
+        raise ValueError("Byte offsets can't be used with compressed files")
+    with open_reader(path, buffer_size=buffer_size) as f:
+        if start:
+            # Skip the rest of any line already in progress at `start`; it
+            # belongs to the preceding range.
+            f.seek(start - 1)
+            f.readline()
+        # `pos` is the offset of the start of `buf`, which always begins a
+        # line.
+        pos = f.tell()
+        buf = bytearray()
+        while end is None or pos < end:
+            block = f.read(buffer_size)
+            if not block:
+                if buf:
+                    yield from _split_bytes(buf, encoding, errors, keepends)
+                return
+            buf += block
+            cut = buf.rfind(b'\n') + 1
+            if end is not None and end - pos <= cut:
+                # The last line to yield is the one holding the byte before
+                # `end`.
+                cut = buf.index(b'\n', end - pos - 1) + 1
+                yield from _split_bytes(buf[:cut], encoding, errors, keepends)
+                return
+            if cut:
+                yield from _split_bytes(buf[:cut], encoding, errors, keepends)
+                del buf[:cut]
+                pos += cut
+
+
+WRITE_BUFFER_SIZE = 1 << 20
+"""
+The default number of bytes buffered between writes.
+"""
+
+WRITE_BATCH_SIZE = 1024
+"""
+The number of items joined together at a time when writing.
+"""
+
+
+def _compressor(compression, f):
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=f, mode='wb')
+    return COMPRESSIONS[compression](f, 'wb')
+
+
+def is_path(file):
+    """
+    Return whether `file` is a path, rather than a file object.
+    """
+    return isinstance(file, (str, bytes, os.PathLike))
+
+
+def check_atomic(file, atomic):
+    if atomic and not is_path(file):
+        raise TypeError(f"atomic writes require a path, not a file object; got {file!r}")
+
+
+@contextlib.contextmanager
+def open_writer(file, *, compression='infer', atomic=False):
+    """
+    Return a context manager opening `file`, either a path or a binary file
+    object, for binary writing, compressing what's written according to
+    `compression` (see {py:func}`resolve_compression`). Compression is never
+    inferred for a file object, only applied if given explicitly.
+
+    If `file` is a path and `atomic` is true, a temporary file is written in
+    the same directory, which replaces `file` only once the context exits
+    successfully, and which is removed otherwise; so `file` either keeps its
+    old contents or has all of its new ones. A file object is left open.
+    """
+    if not is_path(file):
+        # A file object may already compress what's written to it (e.g. one
+        # from `gzip.open`), so its name can't be trusted.
+        if compression == 'infer':
+            compression = None
+        if compression is None:
+            yield file
+        else:
+            with _compressor(compression, file) as f:
+                yield f
+        file.flush()
+        return
+    compression = resolve_compression(file, compression)
+    path = os.fspath(file)
+    if atomic:
+        head, tail = os.path.split(path)
+        # Opened exclusively, so the file gets the usual permissions.
+        target = os.path.join(head, f'.{tail}.{os.urandom(4).hex()}.tmp')
+        mode = 'xb'
+    else:
+        target = path
+        mode = 'wb'
+    try:
+        with open(target, mode) as raw:
+            if compression is None:
+                yield raw
+            else:
+                with _compressor(compression, raw) as f:
+                    yield f
+    except BaseException:
+        if atomic:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(target)
+        raise
+    if atomic:
+        os.replace(target, path)
+
+
+def write_batched(f, items, encode, *, buffer_size=WRITE_BUFFER_SIZE):
+    """
+    Write `items` to the binary file `f`, returning a tuple of the number of
+    items and of bytes written.
+
+    Items are taken {py:data}`WRITE_BATCH_SIZE` at a time, and each batch is
+    converted to bytes at once by `encode`, from a list of items; the
+    results are written whenever at least `buffer_size` bytes are pending,
+    so `f` sees a few large writes rather than one per item.
+    """
+    ix = iter(items)
+    n_items = n_bytes = 0
+    blocks = []
+    pending = 0
+    while batch := list(itertools.islice(ix, WRITE_BATCH_SIZE)):
+        data = encode(batch)
+        n_items += len(batch)
+        n_bytes += len(data)
+        blocks.append(data)
+        pending += len(data)
+        if pending >= buffer_size:
+            f.write(b''.join(blocks))
+            blocks.clear()
+            pending = 0
+    if blocks:
+        f.write(b''.join(blocks))
+    return (n_items, n_bytes)
+
+
+PARTITION_BUFFER_SIZE = 1 << 16
+"""
+The default number of bytes buffered for each partition between writes.
+"""
+
+PARTITION_MAX_OPEN = 64
+"""
+The default maximum number of partition files open at once.
+"""
+
+PARTITION_MAX_PENDING = 1 << 24
+"""
+The default maximum number of bytes buffered across all partitions.
+"""
+
+
+def _close_writer(writer):
+    raw, f = writer
+    try:
+        if f is not raw:
+            f.close()
+    finally:
+        raw.close()
+
+
+def write_partitions(
+    items, key, path, *, encode, serialize=None, compression='infer',
+    max_open=PARTITION_MAX_OPEN, buffer_size=PARTITION_BUFFER_SIZE,
+    max_pending=PARTITION_MAX_PENDING,
+):
+    """
+    Write each of `items` (or if `serialize` is provided, `serialize(item)`)
+    to the file at `path(key(item))`, returning a dict of the number of
+    items written for each key, in order of first appearance.
+
+    Each partition's items are buffered separately, and converted to bytes
+    by `encode`, from a list of items, once about `buffer_size` bytes (as
+    measured by the items' lengths) are pending, or at the end. So that
+    memory use doesn't grow with the number of partitions, once more than
+    `max_pending` bytes are pending across all of them, the largest
+    buffers are flushed until at most half that remains. Writers are
+    only opened to flush a buffer, and at most `max_open` are kept open at
+    once; the least recently used is closed to make room for another, and
+    reopened for appending if needed again. Each file is truncated when
+    first opened, and any missing parent directories are created.
+
+    Compression, per `compression` (see {py:func}`resolve_compression`),
+    starts a new compressed stream each time a file is reopened; gzip, bz2,
+    and lzma readers all read such concatenated streams transparently.
+    """
+    batches = {}
+    sizes = {}
+    counts = {}
+    pending = 0
+    started = set()
+    writers = collections.OrderedDict()
+
+    def flush(k, batch):
+        p = path(k)
+        writer = writers.get(p)
+        if writer is None:
+            if len(writers) >= max_open:
+                _, old = writers.popitem(last=False)
+                _close_writer(old)
+            if p in started:
+                mode = 'ab'
+            else:
+                head = os.path.dirname(os.fspath(p))
+                if head:
+                    os.makedirs(head, exist_ok=True)
+                started.add(p)
+                mode = 'wb'
+            raw = open(p, mode)
+            file_compression = resolve_compression(p, compression)
+            f = raw if file_compression is None else _compressor(file_compression, raw)
+            writers[p] = writer = (raw, f)
+        else:
+            writers.move_to_end(p)
+        writer[1].write(encode(batch))
+        counts[k] += len(batch)
+        batch.clear()
+
+    try:
+        for item in items:
+            k = key(item)
+            if serialize is not None:
+                item = serialize(item)
+            batch = batches.get(k)
+            if batch is None:
+                batch = batches[k] = []
+                sizes[k] = 0
+                counts[k] = 0
+            batch.append(item)
+            n = len(item)
+            size = sizes[k] + n
+            pending += n
+            if size >= buffer_size:
+                flush(k, batch)
+                pending -= size
+                size = 0
+            sizes[k] = size
+            if pending > max_pending:
+                for k in sorted(sizes, key=sizes.__getitem__, reverse=True):
+                    if pending <= max_pending // 2:
+                        break
+                    pending -= sizes[k]
+                    sizes[k] = 0
+                    flush(k, batches[k])
+        for k, batch in batches.items():
+            if batch:
+                flush(k, batch)
+    finally:
+        while writers:
+            _, writer = writers.popitem(last=False)
+            _close_writer(writer)
+    return counts
@@ -0,0 +1,161 @@
+"""
+Utilities for joining two iterables by key.
+"""
+from collections.abc import Sized
+import itertools
+
+from .argutils import replace
+
+
+__all__ = ()
+
+
+JOIN_HOWS = ('inner', 'left', 'outer', 'semi', 'anti')
+"""
+The supported kinds of join.
+"""
+
+
+def check_how(name, value):
+    if value not in JOIN_HOWS:
+        raise ValueError(
+            f"{name} must be one of {', '.join(map(repr, JOIN_HOWS))}; got {value!r}"
+        )
+
+
+def _identity(item):
+    return item
+
+
+def pair(left, right):
+    """
+    The default join combiner, returning a `(left, right)` tuple.
+    """
+    return (left, right)
+
+
+def _build(iterable, key):
+    table = {}
+    for item in iterable:
+        k = key(item)
+        items = table.get(k)
+        if items is None:
+            table[k] = [item]
+        else:
+            items.append(item)
+    return table
+
+
+def hash_join(left, right, *, left_key, right_key, how='inner', combine=pair, fillvalue=None):
+    """
+    Yield the {wp}`hash join <Hash_join>` of `left` and `right`, matching
+    items whose `left_key` and `right_key` results are equal. A key of
+    `None` matches items themselves.
+
+    For an `'inner'` join, yield `combine(l, r)` for each pair of matching
+    items; a `'left'` join also yields `combine(l, fillvalue)` for each
+    unmatched left item, and an `'outer'` join also yields
+    `combine(fillvalue, r)` for each unmatched right item. A `'semi'` join
+    yields each left item with a match, and an `'anti'` join each left item
+    without one.
+
+    The table is built on `right`, which is read in full before anything
+    is yielded, while `left` is streamed; for `'semi'` and `'anti'` joins,
+    only the keys of `right` are kept. If both are sized and `left` is
+    smaller, an `'inner'`, `'left'`, or `'outer'` join instead builds on
+    `left` and streams `right`. Either way, matching pairs are yielded in
+    the order of the streamed side, and unmatched items of the built side
+    are yielded last, in their original order.
+    """
+    if how in ('semi', 'anti'):
+        keys = set(right if right_key is None else map(right_key, right))
+        found = keys.__contains__
+        if left_key is not None:
+            def found(item):
+                return left_key(item) in keys
+        return (filter if how == 'semi' else itertools.filterfalse)(found, left)
+    left_key = replace(None, _identity, left_key)
+    right_key = replace(None, _identity, right_key)
+    if isinstance(left, Sized) and isinstance(right, Sized) and len(left) < len(right):
+        return _hash_join(
+            right, left, right_key, left_key,
+            keep_probe=(how == 'outer'), keep_build=(how != 'inner'),
+            combine=lambda right, left: combine(left, right), fillvalue=fillvalue,
+        )
+    return _hash_join(
+        left, right, left_key, right_key,
+        keep_probe=(how != 'inner'), keep_build=(how == 'outer'),
+        combine=combine, fillvalue=fillvalue,
+    )
+
+
+def _hash_join(probe, build, probe_key, build_key, *, keep_probe, keep_build, combine, fillvalue):
+    # Yield matches in terms of "probe" and "build" sides; `combine` always
+    # takes the probe item first.
+    table = _build(build, build_key)
+    matched = set() if keep_build else None
+    for item in probe:
+        k = probe_key(item)
+        matches = table.get(k)
+        if matches is None:
+            if keep_probe:
+                yield combine(item, fillvalue)
+            continue
+        if keep_build:
+            matched.add(k)
+        for match in matches:
+            yield combine(item, match)
+    if keep_build:
+        for k, items in table.items():
+            if k not in matched:
+                for item in items:
+                    yield combine(fillvalue, item)
+
+
+def merge_join(left, right, *, left_key, right_key, how='inner', combine=pair, fillvalue=None):
+    """
+    Yield the {wp}`sort-merge join <Sort-merge_join>` of `left` and
+    `right`, which must both be sorted in ascending order of their
+    `left_key` and `right_key` results, respectively.
+
+    Both are streamed, holding only the right items with the current key in
+    memory, and results are yielded in key order. See {py:func}`hash_join`
+    for the kinds of join and their results.
+    """
+    left_key = replace(None, _identity, left_key)
+    right_key = replace(None, _identity, right_key)
+    keep_left = how in ('left', 'outer', 'anti')
+    keep_right = how == 'outer'
+    left_groups = itertools.groupby(left, left_key)
+    right_groups = itertools.groupby(right, right_key)
+    lg = next(left_groups, None)
+    rg = next(right_groups, None)
+    while lg is not None and rg is not None:
+        lk, left_items = lg
+        rk, right_items = rg
+        if lk < rk:
+            if keep_left:
+                for item in left_items:
+                    yield item if how == 'anti' else combine(item, fillvalue)
+            lg = next(left_groups, None)
+        elif rk < lk:
+            if keep_right:
+                for item in right_items:
+                    yield combine(fillvalue, item)
+            rg = next(right_groups, None)
+        else:
+            if how == 'semi':
+                yield from left_items
+            elif how != 'anti':
+                matches = list(right_items)
+                for item in left_items:
+                    for match in matches:
+                        yield combine(item, match)
+            lg = next(left_groups, None)
+            rg = next(right_groups, None)
+    if keep_left and lg is not None:
+        for item in itertools.chain(lg[1], itertools.chain.from_iterable(g for _, g in left_groups)):
+            yield item if how == 'anti' else combine(item, fillvalue)
+    if keep_right and rg is not None:
+        for item in itertools.chain(rg[1], itertools.chain.from_iterable(g for _, g in right_groups)):
+            yield combine(fillvalue, item)
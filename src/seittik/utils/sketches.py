@@ -0,0 +1,649 @@
+"""
+Probabilistic data structures ("sketches") for summarizing streams in
+bounded memory.
+"""
+import bisect
+import collections
+import hashlib
+import heapq
+import itertools
+import math
+from operator import itemgetter
+import random
+import struct
+
+from .argutils import check_int, check_int_positive
+from .statsutils import check_quantile
+
+
+__all__ = ()
+
+
+_MASK64 = (1 << 64) - 1
+_LN2 = math.log(2)
+_INT64_BOUND = 1 << 63
+
+
+def mix64(x):
+    """
+    Scramble the bits of integer `x` into a well-distributed 64-bit integer,
+    using the finalizer from SplitMix64.
+
+    Python's `hash` is the identity function for small integers, which is
+    far too regular to use directly for sketches.
+    """
+    x &= _MASK64
+    x = ((x ^ (x >> 30)) * 0xbf58476d1ce4e5b9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94d049bb133111eb) & _MASK64
+    return x ^ (x >> 31)
+
+
+def _stable_digest(data):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+def stable_hash(obj):
+    """
+    Return a well-distributed 64-bit hash of `obj` that is the same in every
+    process.
+
+    Python's `hash` for `str` and `bytes` is randomized per process (see
+    {external:py:envvar}`PYTHONHASHSEED`), so it can't be used for sketches
+    that are saved or combined across processes.
+
+    Strings, bytes, numbers, `None`, and tuples and frozensets of these are
+    hashed by value, consistently with equality (e.g., `1`, `1.0`, and
+    `True` hash the same). Any other object is hashed via `hash`, and so is
+    only stable if its type's `__hash__` is.
+    """
+    match obj:
+        case str():
+            return _stable_digest(b's' + obj.encode('utf-8', 'surrogatepass'))
+        case bytes() | bytearray() | memoryview():
+            return _stable_digest(b'b' + bytes(obj))
+        case int() if -_INT64_BOUND <= obj < _INT64_BOUND:
+            return mix64(obj)
+        case int():
+            size = (obj.bit_length() + 8) // 8
+            return _stable_digest(b'i' + obj.to_bytes(size, 'little', signed=True))
+        case float() if obj.is_integer():
+            return stable_hash(int(obj))
+        case float():
+            return _stable_digest(b'f' + struct.pack('<d', obj))
+        case None:
+            return _stable_digest(b'n')
+        case tuple():
+            return _stable_digest(b't' + b''.join(
+                stable_hash(x).to_bytes(8, 'little') for x in obj
+            ))
+        case frozenset():
+            return _stable_digest(b'z' + b''.join(
+                h.to_bytes(8, 'little') for h in sorted(stable_hash(x) for x in obj)
+            ))
+        case _:
+            return mix64(hash(obj))
+
+
+def check_error_rate(name, value):
+    if not isinstance(value, (int, float)):
+        raise TypeError(f"{name} must be a number; got {value!r}")
+    if not 0 < value < 1:
+        raise ValueError(f"{name} must be between 0 and 1, exclusive; got {value!r}")
+
+
+class BloomFilter:
+    """
+    A set-like sketch that can test whether an object has *possibly* been
+    added, in fixed memory.
+
+    A Bloom filter never reports a false negative, but may report a false
+    positive. When no more than `capacity` distinct objects have been added,
+    the false positive rate is at most roughly `error_rate`; beyond that, it
+    grows steadily.
+
+    The filter uses `-capacity * ln(error_rate) / ln(2)**2` bits; e.g., about
+    1.2 bytes per object of capacity for an `error_rate` of 1%.
+
+    Objects must be hashable, and are hashed with {py:func}`stable_hash`,
+    which, unlike Python's `hash`, doesn't collide for e.g. `-1` and `-2`.
+
+    >>> bf = BloomFilter(1000)
+    >>> bf.add('a')
+    True
+    >>> bf.add('a')
+    False
+    >>> 'a' in bf, 'b' in bf
+    (True, False)
+    """
+    def __init__(self, capacity, error_rate=0.01):
+        check_int_positive('capacity', capacity)
+        check_error_rate('error_rate', error_rate)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = math.ceil(-capacity * math.log(error_rate) / _LN2 ** 2)
+        self.num_hashes = max(1, round(self.num_bits / capacity * _LN2))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._len = 0
+
+    def _positions(self, obj):
+        # Kirsch-Mitzenmacher double hashing: k positions from two hashes.
+        h1 = stable_hash(obj)
+        h2 = mix64(h1) | 1
+        m = self.num_bits
+        return [(h1 + i * h2) % m for i in range(self.num_hashes)]
+
+    def __contains__(self, obj):
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(obj))
+
+    def __len__(self):
+        """
+        Return the number of objects added that were not already (possibly)
+        present.
+        """
+        return self._len
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} ({len(self)}/{self.capacity})>'
+
+    def add(self, obj):
+        """
+        Add `obj` to the filter, and return `True` if it was definitely not
+        present beforehand, or `False` if it possibly was.
+        """
+        bits = self._bits
+        added = False
+        for pos in self._positions(obj):
+            i = pos >> 3
+            mask = 1 << (pos & 7)
+            if not bits[i] & mask:
+                bits[i] |= mask
+                added = True
+        if added:
+            self._len += 1
+        return added
+
+
+HLL_PRECISION_MIN = 4
+HLL_PRECISION_MAX = 18
+
+
+class HyperLogLog:
+    """
+    A sketch that estimates the number of distinct objects added, in fixed
+    memory.
+
+    The sketch uses `2**precision` one-byte registers, and its estimates
+    have a relative standard error of about `1.04 / sqrt(2**precision)`;
+    e.g., about 0.81% for the default precision of 14, using 16 KiB.
+    `precision` must be between 4 and 18, inclusive.
+
+    Objects must be hashable, and are hashed with {py:func}`stable_hash`, so
+    sketches of the same precision can be merged even if they were built in
+    different processes (e.g., after pickling), with the result estimating
+    the number of distinct objects added to any of them.
+
+    >>> hll = HyperLogLog()
+    >>> hll.update(range(1000))
+    >>> hll.update(range(500))
+    >>> 990 < len(hll) < 1010
+    True
+    """
+    def __init__(self, precision=14):
+        check_int('precision', precision)
+        if not HLL_PRECISION_MIN <= precision <= HLL_PRECISION_MAX:
+            raise ValueError(
+                f"precision must be between {HLL_PRECISION_MIN} and"
+                f" {HLL_PRECISION_MAX}; got {precision!r}"
+            )
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def __len__(self):
+        """
+        Return the estimated number of distinct objects, rounded to an
+        integer.
+        """
+        return round(self.estimate())
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} (~{len(self)})>'
+
+    def __eq__(self, other):
+        if not isinstance(other, HyperLogLog):
+            return NotImplemented
+        return self.precision == other.precision and self.registers == other.registers
+
+    def __or__(self, other):
+        if not isinstance(other, HyperLogLog):
+            return NotImplemented
+        ret = self.copy()
+        ret.merge(other)
+        return ret
+
+    @property
+    def relative_error(self):
+        """
+        The relative standard error of this sketch's estimates.
+        """
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add(self, obj):
+        """
+        Add `obj` to the sketch.
+        """
+        self.update((obj,))
+
+    def update(self, iterable):
+        """
+        Add each object in `iterable` to the sketch.
+        """
+        p = self.precision
+        q = 64 - p
+        q_mask = (1 << q) - 1
+        registers = self.registers
+        for obj in iterable:
+            h = stable_hash(obj)
+            i = h >> q
+            # The 1-based position of the leftmost 1-bit in the remaining
+            # `q` bits (or `q + 1` if they're all zero).
+            rank = q - (h & q_mask).bit_length() + 1
+            if rank > registers[i]:
+                registers[i] = rank
+
+    def copy(self):
+        """
+        Return a copy of this sketch.
+        """
+        ret = self.__class__.__new__(self.__class__)
+        ret.precision = self.precision
+        ret.registers = self.registers.copy()
+        return ret
+
+    def merge(self, *others):
+        """
+        Update this sketch in place to also count the objects added to each
+        of `others`, which must have the same precision.
+        """
+        for other in others:
+            if other.precision != self.precision:
+                raise ValueError(
+                    f"Cannot merge {self.__class__.__name__} sketches of"
+                    f" different precisions ({self.precision} and {other.precision})"
+                )
+            self.registers[:] = bytes(map(max, self.registers, other.registers))
+
+    def estimate(self):
+        """
+        Return the estimated number of distinct objects.
+        """
+        registers = self.registers
+        m = len(registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / math.fsum(2.0 ** -r for r in registers)
+        zeros = registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # Small-range correction: linear counting
+            return m * math.log(m / zeros)
+        return raw
+
+
+KLL_K_MIN = 8
+_KLL_C = 2 / 3
+
+
+class KLLSketch:
+    """
+    A sketch that estimates the quantiles of the objects added, in bounded
+    memory, using the {wp}`KLL algorithm <Quantile_sketch#KLL_sketch>`.
+
+    The sketch holds roughly `3 * k` objects, regardless of how many have
+    been added. Estimates are always objects that were added; their error is
+    measured in rank: for the default `k` of 200, an estimated quantile's
+    true rank is within about 1.65% (of the total number of objects) of the
+    requested rank with 99% confidence, and error shrinks roughly in
+    proportion to `1 / k`. `k` must be at least 8.
+
+    Objects must be mutually orderable. Sketches with the same `k` can be
+    merged, with the result summarizing all objects added to any of them.
+
+    Compaction is randomized using `rng`, which defaults to a new
+    {external:py:class}`random.Random`.
+
+    >>> kll = KLLSketch(rng=random.Random(0))
+    >>> kll.update(range(100_000))
+    >>> [round(x, -3) for x in kll.quantiles([0.5, 0.95, 0.99])]
+    [50000, 95000, 99000]
+    """
+    def __init__(self, k=200, *, rng=None):
+        check_int('k', k)
+        if k < KLL_K_MIN:
+            raise ValueError(f"k must be an integer >= {KLL_K_MIN}; got {k!r}")
+        self.k = k
+        self.rng = random.Random() if rng is None else rng
+        self.compactors = []
+        self._count = 0
+        self._size = 0
+        self._max_size = 0
+        self._grow()
+
+    def __len__(self):
+        """
+        Return the total number of objects added.
+        """
+        return self._count
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} ({len(self)})>'
+
+    def __or__(self, other):
+        if not isinstance(other, KLLSketch):
+            return NotImplemented
+        ret = self.copy()
+        ret.merge(other)
+        return ret
+
+    def _capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return math.ceil(self.k * _KLL_C ** depth) + 1
+
+    def _grow(self):
+        self.compactors.append([])
+        self._max_size = sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def _compress(self):
+        compactors = self.compactors
+        for level, items in enumerate(compactors):
+            if len(items) >= self._capacity(level):
+                if level + 1 == len(compactors):
+                    self._grow()
+                items.sort()
+                # With an odd number of items, the smallest stays behind.
+                start = len(items) % 2
+                compactors[level + 1].extend(items[start + self.rng.getrandbits(1)::2])
+                del items[start:]
+                break
+        self._size = sum(map(len, compactors))
+
+    def add(self, obj):
+        """
+        Add `obj` to the sketch.
+        """
+        self.update((obj,))
+
+    def update(self, iterable):
+        """
+        Add each object in `iterable` to the sketch.
+        """
+        ix = iter(iterable)
+        level0 = self.compactors[0]
+        while True:
+            room = self._max_size - self._size
+            before = len(level0)
+            level0.extend(itertools.islice(ix, room))
+            added = len(level0) - before
+            self._count += added
+            self._size += added
+            if self._size >= self._max_size:
+                self._compress()
+            if added < room:
+                return
+
+    def copy(self):
+        """
+        Return a copy of this sketch, sharing its RNG.
+        """
+        ret = self.__class__.__new__(self.__class__)
+        ret.__dict__.update(self.__dict__)
+        ret.compactors = [items.copy() for items in self.compactors]
+        return ret
+
+    def merge(self, *others):
+        """
+        Update this sketch in place to also summarize the objects added to
+        each of `others`, which must have the same `k`.
+        """
+        for other in others:
+            if other.k != self.k:
+                raise ValueError(
+                    f"Cannot merge {self.__class__.__name__} sketches with"
+                    f" different k ({self.k} and {other.k})"
+                )
+            while len(self.compactors) < len(other.compactors):
+                self._grow()
+            for mine, theirs in zip(self.compactors, other.compactors):
+                mine.extend(theirs)
+            self._count += other._count
+            self._size = sum(map(len, self.compactors))
+            while self._size >= self._max_size:
+                self._compress()
+
+    def _weighted(self):
+        # Each object at level `h` stands for `2**h` objects added.
+        weighted = sorted(
+            ((obj, 1 << level) for level, items in enumerate(self.compactors) for obj in items),
+            key=itemgetter(0),
+        )
+        cumulative = list(itertools.accumulate(w for _, w in weighted))
+        return [obj for obj, _ in weighted], cumulative
+
+    def quantiles(self, qs):
+        """
+        Return a list of the estimated quantiles for each probability in
+        `qs`.
+        """
+        qs = list(qs)
+        for q in qs:
+            check_quantile('q', q)
+        if not self._count:
+            raise ValueError("Cannot estimate quantiles of an empty sketch")
+        objs, cumulative = self._weighted()
+        total = cumulative[-1]
+        last = len(objs) - 1
+        return [objs[min(bisect.bisect_left(cumulative, q * total), last)] for q in qs]
+
+    def quantile(self, q):
+        """
+        Return the estimated quantile for probability `q`.
+        """
+        return self.quantiles((q,))[0]
+
+    def rank(self, obj):
+        """
+        Return the estimated fraction of objects added that are less than or
+        equal to `obj`.
+        """
+        if not self._count:
+            raise ValueError("Cannot estimate ranks in an empty sketch")
+        objs, cumulative = self._weighted()
+        i = bisect.bisect_right(objs, obj)
+        return cumulative[i - 1] / cumulative[-1] if i else 0.0
+
+
+SPACE_SAVING_BATCH_SIZE = 4096
+
+
+class SpaceSaving:
+    """
+    A sketch that tracks the most frequent objects added, and estimates
+    their counts, in fixed memory, using the {wp}`Space-Saving algorithm
+    <Streaming_algorithm#Frequent_elements>`.
+
+    At most `capacity` objects are tracked at once. When a new object
+    arrives and the sketch is full, it replaces the object with the lowest
+    count, inheriting that count. As a result, estimated counts are never
+    less than true counts, and exceed them by at most `total / capacity`,
+    where `total` is the number of objects added; any object added more
+    than `total / capacity` times is guaranteed to be tracked. The maximum
+    overestimate for a specific object is given by {py:meth}`error`.
+
+    Objects must be hashable. Sketches with the same capacity can be merged
+    (as in Cafaro et al.'s parallel Space-Saving), with the same error
+    guarantee relative to the combined total.
+
+    Like {external:py:class}`collections.Counter`, indexing a sketch returns
+    an object's estimated count (or 0 if it isn't tracked), and
+    {py:meth}`most_common` returns `(object, count)` pairs.
+
+    >>> ss = SpaceSaving(2)
+    >>> ss.update('abacabaad')
+    >>> ss.most_common()
+    [('a', 5), ('d', 4)]
+    >>> ss.error('d')
+    3
+    """
+    def __init__(self, capacity):
+        check_int_positive('capacity', capacity)
+        self.capacity = capacity
+        self.total = 0
+        self._counts = {}
+        self._errors = {}
+        # A heap of `(count, tiebreaker, obj)`, with at least one entry per
+        # tracked object; entries go stale as counts increase, and are fixed
+        # up lazily.
+        self._heap = []
+        self._tiebreaker = itertools.count()
+
+    def __len__(self):
+        """
+        Return the number of objects tracked.
+        """
+        return len(self._counts)
+
+    def __contains__(self, obj):
+        return obj in self._counts
+
+    def __getitem__(self, obj):
+        """
+        Return the estimated count of `obj`, or 0 if it isn't tracked.
+        """
+        return self._counts.get(obj, 0)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} ({len(self)}/{self.capacity}, total={self.total})>'
+
+    def __or__(self, other):
+        if not isinstance(other, SpaceSaving):
+            return NotImplemented
+        ret = self.copy()
+        ret.merge(other)
+        return ret
+
+    def _pop_min(self):
+        counts = self._counts
+        heap = self._heap
+        while True:
+            count, _, obj = heap[0]
+            current = counts.get(obj)
+            if current == count:
+                heapq.heappop(heap)
+                return obj, count
+            if current is None:
+                heapq.heappop(heap)
+            else:
+                heapq.heapreplace(heap, (current, next(self._tiebreaker), obj))
+
+    def _add(self, obj, count):
+        counts = self._counts
+        if obj in counts:
+            counts[obj] += count
+            return
+        error = 0
+        if len(counts) >= self.capacity:
+            victim, error = self._pop_min()
+            del counts[victim]
+            del self._errors[victim]
+        counts[obj] = error + count
+        self._errors[obj] = error
+        heapq.heappush(self._heap, (error + count, next(self._tiebreaker), obj))
+
+    def add(self, obj, count=1):
+        """
+        Add `obj` to the sketch `count` times.
+        """
+        check_int_positive('count', count)
+        self.total += count
+        self._add(obj, count)
+
+    def update(self, iterable):
+        """
+        Add each object in `iterable` to the sketch.
+        """
+        # Pre-counting each batch makes repeated objects far cheaper, and
+        # weighted updates keep the same error guarantee.
+        ix = iter(iterable)
+        add = self._add
+        while batch := collections.Counter(itertools.islice(ix, SPACE_SAVING_BATCH_SIZE)):
+            self.total += batch.total()
+            for obj, count in batch.items():
+                add(obj, count)
+
+    def error(self, obj):
+        """
+        Return the maximum amount by which the estimated count of `obj` may
+        exceed its true count.
+
+        If `obj` isn't tracked, this is the lowest tracked count (or 0 if the
+        sketch isn't full), which bounds its true count.
+        """
+        if obj in self._errors:
+            return self._errors[obj]
+        return self._min_count()
+
+    def _min_count(self):
+        if len(self._counts) < self.capacity:
+            return 0
+        return min(self._counts.values())
+
+    def most_common(self, n=None):
+        """
+        Return a list of the `n` tracked objects with the highest estimated
+        counts (or all of them, if `n` is `None`) as `(object, count)`
+        pairs, from highest count to lowest.
+        """
+        if n is None:
+            return sorted(self._counts.items(), key=itemgetter(1), reverse=True)
+        return heapq.nlargest(n, self._counts.items(), key=itemgetter(1))
+
+    def copy(self):
+        """
+        Return a copy of this sketch.
+        """
+        ret = self.__class__(self.capacity)
+        ret.total = self.total
+        ret._counts = self._counts.copy()
+        ret._errors = self._errors.copy()
+        ret._heap = self._heap.copy()
+        # Continue the original's tiebreakers, so that new heap entries
+        # never tie with copied ones and fall back to comparing objects.
+        ret._tiebreaker = itertools.count(next(self._tiebreaker))
+        return ret
+
+    def merge(self, *others):
+        """
+        Update this sketch in place to also summarize the objects added to
+        each of `others`, which must have the same capacity.
+        """
+        for other in others:
+            if other.capacity != self.capacity:
+                raise ValueError(
+                    f"Cannot merge {self.__class__.__name__} sketches of"
+                    f" different capacities ({self.capacity} and {other.capacity})"
+                )
+            # An object missing from a full sketch may have been counted up
+            # to that sketch's lowest count.
+            min_a = self._min_count()
+            min_b = other._min_count()
+            counts = {}
+            errors = {}
+            for obj in itertools.chain(self._counts, other._counts):
+                if obj in counts:
+                    continue
+                counts[obj] = self._counts.get(obj, min_a) + other._counts.get(obj, min_b)
+                errors[obj] = self._errors.get(obj, min_a) + other._errors.get(obj, min_b)
+            kept = heapq.nlargest(self.capacity, counts.items(), key=itemgetter(1))
+            self.total += other.total
+            self._counts = dict(kept)
+            self._errors = {obj: errors[obj] for obj in self._counts}
+            self._heap = [(count, next(self._tiebreaker), obj) for obj, count in kept]
+            heapq.heapify(self._heap)
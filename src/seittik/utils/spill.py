@@ -0,0 +1,236 @@
+"""
+Utilities for spilling items to temporary files, for processing data
+larger than memory.
+"""
+import heapq
+import itertools
+import pickle
+import tempfile
+
+
+__all__ = ()
+
+
+FRAME_SIZE = 1024
+"""
+The maximum number of items pickled together into a single frame.
+"""
+
+MAX_FAN_IN = 64
+"""
+The maximum number of sorted runs merged at once by `external_sort`.
+"""
+
+
+def batched(iterable, n):
+    """
+    Yield lists of up to `n` items from `iterable`.
+    """
+    ix = iter(iterable)
+    return iter(lambda: list(itertools.islice(ix, n)), [])
+
+
+class SpillFile:
+    """
+    An anonymous temporary file holding a sequence of items.
+
+    Items are pickled in frames of up to {py:data}`FRAME_SIZE` items, which
+    is far more compact and faster than pickling items one at a time.
+    Iterating over a spill file yields its items in the order they were
+    written, loading a single frame at a time.
+
+    The underlying file is deleted when the spill file is closed.
+    """
+    def __init__(self, dir=None):
+        self._file = tempfile.TemporaryFile(dir=dir)
+        self._len = 0
+
+    def __iter__(self):
+        f = self._file
+        f.flush()
+        f.seek(0)
+        load = pickle.load
+        while True:
+            try:
+                frame = load(f)
+            except EOFError:
+                return
+            yield from frame
+
+    def __len__(self):
+        return self._len
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} ({len(self)})>'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def close(self):
+        self._file.close()
+
+    def write(self, items):
+        """
+        Append `items` to the end of the file.
+        """
+        f = self._file
+        f.seek(0, 2)
+        for frame in batched(items, FRAME_SIZE):
+            pickle.dump(frame, f, protocol=pickle.HIGHEST_PROTOCOL)
+            self._len += len(frame)
+
+
+def _merge_runs(runs, key, reverse):
+    # `heapq.merge` breaks ties by the position of each iterable, so merging
+    # runs in the order they were created keeps the merge stable.
+    return heapq.merge(*runs, key=key, reverse=reverse)
+
+
+def external_sort(iterable, *, key=None, reverse=False, run_size, dir=None, fan_in=MAX_FAN_IN):
+    """
+    Yield the items of `iterable` in sorted order, holding at most
+    `run_size` items in memory at a time.
+
+    Items are sorted in runs of `run_size`, each of which is spilled to a
+    {py:class}`SpillFile` in `dir`, and the runs are then lazily merged.
+    If there are more than `fan_in` runs, consecutive runs are first merged
+    into larger runs, so that no more than `fan_in` files are read at once.
+
+    If `iterable` fits within a single run, nothing is written to disk.
+
+    As with {external:py:func}`sorted`, the sort is stable. All temporary
+    files are closed once the generator is exhausted or closed.
+    """
+    ix = iter(iterable)
+    run = list(itertools.islice(ix, run_size))
+    # Look past the first run, so that an input of exactly `run_size` items
+    # is still sorted in memory.
+    ahead = list(itertools.islice(ix, 1))
+    if not ahead:
+        run.sort(key=key, reverse=reverse)
+        yield from run
+        return
+    ix = itertools.chain(ahead, ix)
+    # Every spill file ever created, so that all are cleaned up no matter
+    # where we stop.
+    spills = []
+    def new_spill(items):
+        spill = SpillFile(dir=dir)
+        spills.append(spill)
+        spill.write(items)
+        return spill
+    try:
+        runs = []
+        while run:
+            run.sort(key=key, reverse=reverse)
+            runs.append(new_spill(run))
+            # Empty the run before reading the next, so only one is held.
+            run.clear()
+            run.extend(itertools.islice(ix, run_size))
+        while len(runs) > fan_in:
+            merged_runs = []
+            for group in batched(runs, fan_in):
+                merged_runs.append(new_spill(_merge_runs(group, key, reverse)))
+                for old_spill in group:
+                    old_spill.close()
+            runs = merged_runs
+        yield from _merge_runs(runs, key, reverse)
+    finally:
+        for spill in spills:
+            spill.close()
+
+
+GROUP_BATCH_SIZE = 1024
+"""
+The number of items added to the in-memory table of `spill_groups` between
+checks of its size.
+"""
+
+GROUP_FAN_OUT = 16
+"""
+The default number of partitions `spill_groups` spills groups into.
+"""
+
+MAX_GROUP_DEPTH = 4
+"""
+The maximum number of times `spill_groups` repartitions a partition that
+still has too many groups to fit in memory.
+"""
+
+
+def _spill_partitions(pairs, spills, depth):
+    # Salting the hash with the depth partitions a partition's keys anew
+    # each time it's repartitioned. (Files are never read by another
+    # process, so the hash needn't be stable across processes.)
+    fan_out = len(spills)
+    buckets = [[] for _ in spills]
+    for pair in pairs:
+        buckets[hash((depth, pair[0])) % fan_out].append(pair)
+    for spill, bucket in zip(spills, buckets):
+        spill.write(bucket)
+
+
+def spill_groups(iterable, update, merge, *, max_groups, table=dict, dir=None,
+                 fan_out=GROUP_FAN_OUT, _depth=0):
+    """
+    Yield `(key, state)` pairs aggregating the items of `iterable` by group,
+    holding the states of roughly `max_groups` groups in memory at a time.
+
+    `update(states, items)` must update `states`, a mapping of group keys
+    and states created by calling `table`, with each of a list of `items`.
+    `merge(state, other)` must return a single state combining two partial
+    states of the same group.
+
+    Whenever the in-memory table grows past `max_groups`, its partial states
+    are spilled to `fan_out` {py:class}`SpillFile`s in `dir`, partitioned by
+    a hash of their keys, and the table is cleared. Each partition is
+    then read back and its partial states merged, one partition at a time,
+    as in the partitioning phase of a {wp}`grace hash join <Hash_join>`; a
+    partition that is itself too large is partitioned again with a
+    differently salted hash, up to {py:data}`MAX_GROUP_DEPTH` times.
+
+    If every group fits in memory, nothing is written to disk, and groups
+    are yielded in the order they first appeared; otherwise, their order is
+    unspecified. The partial states of a group are merged in the order they
+    were spilled. All temporary files are closed once the generator is
+    exhausted or closed.
+    """
+    ix = iter(iterable)
+    states = table()
+    spills = None
+    try:
+        for items in batched(ix, GROUP_BATCH_SIZE):
+            update(states, items)
+            if len(states) > max_groups and _depth < MAX_GROUP_DEPTH:
+                if spills is None:
+                    spills = [SpillFile(dir=dir) for _ in range(fan_out)]
+                _spill_partitions(states.items(), spills, _depth)
+                states = table()
+        if spills is None:
+            yield from states.items()
+            return
+        _spill_partitions(states.items(), spills, _depth)
+        del states
+        def merge_pairs(states, pairs):
+            for key, state in pairs:
+                if key in states:
+                    states[key] = merge(states[key], state)
+                else:
+                    states[key] = state
+        for spill in spills:
+            yield from spill_groups(
+                spill, merge_pairs, merge, max_groups=max_groups, dir=dir,
+                fan_out=fan_out, _depth=_depth + 1,
+            )
+            spill.close()
+    finally:
+        if spills is not None:
+            for spill in spills:
+                spill.close()
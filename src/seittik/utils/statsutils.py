@@ -0,0 +1,355 @@
+"""
+Utilities for computing statistics over streams and sequences.
+"""
+from collections.abc import Sized
+from decimal import Decimal
+from fractions import Fraction
+import itertools
+import math
+from operator import itemgetter
+import random
+import statistics
+
+
+__all__ = ()
+
+
+_SELECT_CUTOFF = 32
+
+PRECISIONS = ('fast', 'fsum', 'exact')
+"""
+The supported precision modes of statistics sinks.
+"""
+
+
+def check_precision(name, value):
+    if value not in PRECISIONS:
+        raise ValueError(
+            f"{name} must be one of {', '.join(map(repr, PRECISIONS))}; got {value!r}"
+        )
+
+
+def mean(iterable):
+    """
+    Return the mean of `iterable` in a single pass, by dividing the sum of
+    its items by their number.
+
+    Unlike {external:py:func}`statistics.fmean`, items are not converted to
+    floats, so e.g. the mean of `Decimal` items is a `Decimal`.
+    """
+    if isinstance(iterable, Sized):
+        n = len(iterable)
+        total = sum(iterable)
+    else:
+        # Count items while summing them, without a Python-level loop.
+        counter = itertools.count()
+        total = sum(map(itemgetter(0), zip(iterable, counter)))
+        n = next(counter)
+    if not n:
+        raise statistics.StatisticsError("mean requires at least one data point")
+    return total / n
+
+
+def exact_sum(iterable):
+    """
+    Return the sum of `iterable`, accumulating floats as exact fractions.
+
+    If any item is a float, the exact total is rounded to a float once at the
+    end, as with {external:py:func}`math.fsum`; otherwise, the total is
+    returned as-is, so e.g. the sum of `Fraction` items is a `Fraction`.
+
+    If any item is an infinity or NaN, the result is the float sum of just
+    those items: infinite, or NaN if they were NaN or infinities of both
+    signs.
+    """
+    # Like `statistics`, sum float numerators by denominator, which is far
+    # faster than adding up `Fraction` objects.
+    partials = {}
+    get_partial = partials.get
+    has_float = False
+    # Infinities and NaNs have no integer ratio, so they're added up
+    # separately; not with `math.fsum`, which raises for `inf + -inf`.
+    nonfinite = None
+    other = 0
+    for x in iterable:
+        if isinstance(x, float):
+            has_float = True
+            try:
+                n, d = x.as_integer_ratio()
+            except (OverflowError, ValueError):
+                nonfinite = x if nonfinite is None else nonfinite + x
+                continue
+            partials[d] = get_partial(d, 0) + n
+        else:
+            other += x
+    if nonfinite is not None:
+        return nonfinite
+    total = other + sum(Fraction(n, d) for d, n in partials.items())
+    return float(total) if has_float else total
+
+
+def fsum_variance(seq, *, sample=False, mu=None):
+    """
+    Return the population variance of `seq` (or the sample variance, if
+    `sample` is true), using {external:py:func}`math.fsum` for every sum.
+
+    This makes one pass over `seq` (three if `mu` isn't provided), so it
+    must be a sequence, but it is far more accurate than a single pass of
+    float arithmetic, and far faster than exact fractions.
+    """
+    n = len(seq)
+    if sample and n < 2:
+        raise statistics.StatisticsError("variance requires at least two data points")
+    if n < 1:
+        raise statistics.StatisticsError("pvariance requires at least one data point")
+    if mu is None:
+        mu = math.fsum(seq) / n
+        ss = math.fsum((x - mu) ** 2 for x in seq)
+        # Compensate for rounding error in the computed mean, as `statistics`
+        # does.
+        c = math.fsum(x - mu for x in seq)
+        ss -= c * c / n
+    else:
+        ss = math.fsum((x - mu) ** 2 for x in seq)
+    return ss / (n - 1 if sample else n)
+
+
+def variance(iterable, *, sample=False, mu=None):
+    """
+    Return the population variance of `iterable` (or the sample variance, if
+    `sample` is true) in a single pass, in O(1) memory.
+
+    If `mu` is provided, it is used as the mean; otherwise, the mean is
+    computed along with the variance by {py:class}`RunningStats`.
+    """
+    if mu is None:
+        return RunningStats(iterable).variance(sample)
+    ret = RunningStats()
+    n = 0
+    m2 = 0
+    for x in iterable:
+        n += 1
+        m2 += (x - mu) ** 2
+    ret.count = n
+    ret.mean = mu
+    ret.m2 = m2
+    return ret.variance(sample)
+
+
+def select(seq, ranks, *, rng=random):
+    """
+    Return a dict mapping each of `ranks` to the item of `seq` with that
+    (0-based) rank in sorted order, as with `sorted(seq)[rank]`.
+
+    This uses {wp}`quickselect`, partitioning only the parts of `seq`
+    containing a requested rank, for O(n) expected time rather than the
+    O(n log n) of a full sort. `seq` itself is not modified.
+
+    Pivots are chosen with `rng`.
+    """
+    n = len(seq)
+    for rank in ranks:
+        if not 0 <= rank < n:
+            raise IndexError(f"rank {rank!r} out of range for {n} items")
+    ret = {}
+    # (items, rank of first item, ranks within items)
+    stack = [(seq, 0, sorted(set(ranks)))]
+    while stack:
+        items, offset, ranks = stack.pop()
+        if len(items) <= _SELECT_CUTOFF:
+            items = sorted(items)
+            for rank in ranks:
+                ret[rank] = items[rank - offset]
+            continue
+        pivot = rng.choice(items)
+        lo = [x for x in items if x < pivot]
+        hi = [x for x in items if pivot < x]
+        lo_end = offset + len(lo)
+        hi_start = offset + len(items) - len(hi)
+        lo_ranks = []
+        hi_ranks = []
+        for rank in ranks:
+            if rank < lo_end:
+                lo_ranks.append(rank)
+            elif rank >= hi_start:
+                hi_ranks.append(rank)
+            else:
+                ret[rank] = pivot
+        if lo_ranks:
+            stack.append((lo, offset, lo_ranks))
+        if hi_ranks:
+            stack.append((hi, hi_start, hi_ranks))
+    return ret
+
+
+def check_quantile(name, q):
+    if not isinstance(q, (int, float)):
+        raise TypeError(f"{name} must be a number; got {q!r}")
+    if not 0 <= q <= 1:
+        raise ValueError(f"{name} must be between 0 and 1, inclusive; got {q!r}")
+
+
+def quantiles(seq, qs, *, rng=random):
+    """
+    Return a list of the exact quantiles of `seq` for each probability in
+    `qs`.
+
+    Quantiles are linearly interpolated between the two nearest items, so
+    that the 0.5 quantile is the median, as with
+    {external:py:func}`statistics.median`. (This is the "linear" method of
+    NumPy, and the "inclusive" method of
+    {external:py:func}`statistics.quantiles`.) No interpolation is done
+    between equal items, so non-numeric items are supported as long as the
+    quantile falls on an item or between equal items.
+    """
+    n = len(seq)
+    if not n:
+        raise ValueError("quantiles requires at least one item")
+    positions = []
+    for q in qs:
+        check_quantile('q', q)
+        pos = (n - 1) * q
+        positions.append((math.floor(pos), math.ceil(pos), pos - math.floor(pos)))
+    selected = select(seq, [r for lo, hi, _ in positions for r in (lo, hi)], rng=rng)
+    ret = []
+    for lo, hi, frac in positions:
+        a = selected[lo]
+        b = selected[hi]
+        ret.append(a if a == b or not frac else a + (b - a) * frac)
+    return ret
+
+
+def sqrt(x):
+    """
+    Return the square root of `x`, as a {external:py:class}`decimal.Decimal`
+    if `x` is one, and otherwise as a float.
+    """
+    if isinstance(x, Decimal):
+        return x.sqrt()
+    return math.sqrt(x)
+
+
+class RunningStats:
+    """
+    Streaming count, mean, and variance of numbers, in O(1) memory.
+
+    Numbers are added in a single pass with {wp}`Welford's algorithm
+    <Algorithms_for_calculating_variance#Welford's_online_algorithm>`, which
+    avoids the catastrophic cancellation of the naive sum-of-squares
+    formula. Instances can be merged with `|` (or in place with `merge`)
+    using Chan et al.'s parallel formula, so partial results computed
+    separately (e.g., per shard or per thread) can be combined.
+
+    >>> rs = RunningStats()
+    >>> rs.update([4, 6, 6, 6])
+    >>> rs.merge(RunningStats([7, 7, 9, 11]))
+    >>> rs.count, rs.mean, rs.variance(), rs.stdev()
+    (8, 7.0, 4.0, 2.0)
+    """
+    def __init__(self, iterable=()):
+        self.count = 0
+        self.mean = 0.0
+        # Sum of squared deviations from the mean
+        self.m2 = 0.0
+        self.update(iterable)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} (count={self.count}, mean={self.mean!r})>'
+
+    def __eq__(self, other):
+        if not isinstance(other, RunningStats):
+            return NotImplemented
+        return (self.count, self.mean, self.m2) == (other.count, other.mean, other.m2)
+
+    def __or__(self, other):
+        if not isinstance(other, RunningStats):
+            return NotImplemented
+        ret = self.copy()
+        ret.merge(other)
+        return ret
+
+    def update(self, iterable):
+        """
+        Add each number in `iterable`.
+        """
+        n = self.count
+        mean = self.mean
+        m2 = self.m2
+        ix = iter(iterable)
+        if not n:
+            # Seed from the first number, rather than the float defaults, so
+            # that e.g. Decimals and Fractions keep their type.
+            for x in ix:
+                n = 1
+                mean = x
+                m2 = x - x
+                break
+        for x in ix:
+            n += 1
+            delta = x - mean
+            mean += delta / n
+            m2 += delta * (x - mean)
+        self.count = n
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, x):
+        """
+        Add the number `x`.
+        """
+        if not self.count:
+            self.count = 1
+            self.mean = x
+            self.m2 = x - x
+            return
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+    def copy(self):
+        """
+        Return a copy of these stats.
+        """
+        ret = self.__class__()
+        ret.count = self.count
+        ret.mean = self.mean
+        ret.m2 = self.m2
+        return ret
+
+    def merge(self, *others):
+        """
+        Update these stats in place to also include the numbers added to each
+        of `others`.
+        """
+        for other in others:
+            if not other.count:
+                continue
+            if not self.count:
+                self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+                continue
+            n = self.count + other.count
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / n
+            self.m2 += other.m2 + delta * delta * self.count * other.count / n
+            self.count = n
+
+    def variance(self, sample=False):
+        """
+        Return the population variance, or the sample variance if `sample` is
+        true.
+        """
+        if sample:
+            if self.count < 2:
+                raise statistics.StatisticsError("variance requires at least two data points")
+            return self.m2 / (self.count - 1)
+        if self.count < 1:
+            raise statistics.StatisticsError("pvariance requires at least one data point")
+        return self.m2 / self.count
+
+    def stdev(self, sample=False):
+        """
+        Return the population standard deviation, or the sample standard
+        deviation if `sample` is true.
+        """
+        return sqrt(self.variance(sample))
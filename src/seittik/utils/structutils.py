@@ -1,8 +1,471 @@
+import array
+import functools
+import itertools
+import mmap
+import os
 import re
+import struct
+import sys
+
+from .windows import chunks
+
+
+__all__ = ()
 
 
 STRUCT_FORMAT_RE = re.compile(r'(\d+)?[?bBcdefhHiIlLnNpPqQs]')
 
+MMAP_BLOCK_SIZE = 1 << 20
+"""
+The approximate number of bytes of a memory-mapped file unpacked between
+releases of its pages by `iter_mmap_unpack`.
+"""
+
 
 def calc_struct_input(s):
     return sum((1 if count is None else int(count)) for count in (m.groups()[0] for m in STRUCT_FORMAT_RE.finditer(s)))
+
+
+@functools.lru_cache(maxsize=256)
+def get_struct(format_):
+    """
+    Return a compiled {external:py:class}`struct.Struct` for `format_`,
+    caching the most recently used.
+    """
+    return struct.Struct(format_)
+
+
+def _release_pages(mm, start, end):
+    # Drop the resident pages of the mapping in [start, end), rounded inward
+    # to whole pages; they'll be read back from the file if touched again.
+    start = -(-start // mmap.PAGESIZE) * mmap.PAGESIZE
+    end -= end % mmap.PAGESIZE
+    if start < end:
+        mm.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+
+def iter_mmap_unpack(path, format_, *, offset=0, limit=None, release=True, block_size=MMAP_BLOCK_SIZE):
+    """
+    Yield tuples unpacked with `format_` from the fixed-size records of the
+    file at `path`, via a read-only memory mapping.
+
+    The first `offset` records are skipped, and at most `limit` are read;
+    only the pages containing those records are mapped, so disjoint ranges
+    of a file can be processed independently. It's an error for the file to
+    end with a partial record, unless `limit` stops short of it.
+
+    Records are unpacked a block of about `block_size` bytes at a time
+    directly from the mapping, without copying them into
+    {external:py:class}`bytes`. If `release` is true (and the platform
+    supports it), the pages of each block are released with
+    {external:py:meth}`mmap.mmap.madvise` once it has been unpacked, so that
+    the file's pages don't accumulate in memory.
+
+    The file is unmapped and closed once the generator is exhausted or
+    closed.
+    """
+    st = get_struct(format_)
+    record_size = st.size
+    if not record_size:
+        return
+    release = release and hasattr(mmap, 'MADV_DONTNEED')
+    with open(path, 'rb') as f:
+        file_size = os.fstat(f.fileno()).st_size
+        n_records, remainder = divmod(file_size, record_size)
+        if limit is None or offset + limit > n_records:
+            if remainder:
+                raise struct.error(
+                    f"file size {file_size} is not a multiple of the record size {record_size}"
+                )
+            end_record = n_records
+        else:
+            end_record = offset + limit
+        if offset >= end_record:
+            return
+        start = offset * record_size
+        end = end_record * record_size
+        # Mappings must start on an allocation boundary.
+        map_start = start - start % mmap.ALLOCATIONGRANULARITY
+        mm = mmap.mmap(f.fileno(), end - map_start, access=mmap.ACCESS_READ, offset=map_start)
+    # The mapping keeps its own handle on the file, so it can be closed here.
+    try:
+        if hasattr(mmap, 'MADV_SEQUENTIAL'):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        step = max(1, block_size // record_size) * record_size
+        pos = start - map_start
+        end -= map_start
+        with memoryview(mm) as view:
+            while pos < end:
+                block_end = min(pos + step, end)
+                with view[pos:block_end] as block:
+                    yield from st.iter_unpack(block)
+                if release:
+                    _release_pages(mm, pos, block_end)
+                pos = block_end
+    finally:
+        mm.close()
+
+
+def iter_framed_unpack(chunks, format_, *, view_class=None):
+    """
+    Yield tuples unpacked with `format_` from the fixed-size records of a
+    byte stream split into arbitrary `chunks`, e.g. as received from a
+    socket or read from a file.
+
+    The complete records of each chunk are unpacked directly from it with
+    {external:py:meth}`struct.Struct.iter_unpack` over a
+    {external:py:class}`memoryview` slice. Only a record split across chunk
+    boundaries is copied, into a small, reusable
+    {external:py:class}`bytearray` holding the partial record. It's an
+    error for the stream to end with a partial record.
+
+    If `view_class` is provided (see {py:func}`record_view`), yield views of
+    each record instead; those within a chunk share its buffer.
+
+    >>> list(iter_framed_unpack([b'\\x01\\x00\\x02', b'', b'\\x00\\x03\\x00'], '<h'))
+    [(1,), (2,), (3,)]
+    """
+    st = get_struct(format_)
+    size = st.size
+    if not size:
+        raise struct.error("framed unpacking requires a format with a nonzero size")
+    partial = bytearray()
+    for chunk in chunks:
+        view = memoryview(chunk).cast('B')
+        length = len(view)
+        pos = 0
+        if partial:
+            pos = size - len(partial)
+            partial += view[:pos]
+            if len(partial) < size:
+                continue
+            if view_class is None:
+                yield st.unpack(partial)
+            else:
+                yield view_class(bytes(partial))
+            partial.clear()
+        end = length - (length - pos) % size
+        if pos < end:
+            if view_class is None:
+                yield from st.iter_unpack(view[pos:end])
+            else:
+                yield from map(view_class, itertools.repeat(view), range(pos, end, size))
+        if end < length:
+            partial += view[end:]
+    if partial:
+        raise struct.error(f"stream ended with a partial record of {len(partial)} of {size} bytes")
+
+
+STRUCT_BYTE_ORDERS = '@=<>!'
+
+STRUCT_TOKEN_RE = re.compile(r'\s*(\d*)([xcbB?hHiIlLqQnNefdspP])\s*')
+
+
+def struct_fields(format_):
+    """
+    Return a list of `(format, offset)` pairs, one for each value unpacked
+    with `format_`, where `format` unpacks that value alone from `offset`.
+
+    >>> struct_fields('<hx2i4s')
+    [('<h', 0), ('<i', 3), ('<i', 7), ('<4s', 11)]
+    """
+    get_struct(format_)
+    prefix = format_[:1] if format_[:1] in STRUCT_BYTE_ORDERS else ''
+    ret = []
+    preceding = prefix
+    for m in STRUCT_TOKEN_RE.finditer(format_, len(prefix)):
+        count, code = m.groups()
+        if code in 'sp':
+            tokens = [count + code]
+        elif code == 'x':
+            tokens = []
+            preceding += count + code
+        else:
+            tokens = [code] * int(count or 1)
+        for token in tokens:
+            # The field's own size is independent of its position, so its
+            # offset is whatever (possibly aligned) size precedes it.
+            offset = struct.calcsize(preceding + token) - struct.calcsize(prefix + token)
+            ret.append((prefix + token, offset))
+            preceding += token
+    return ret
+
+
+class RecordView:
+    """
+    A lightweight, read-only view of one fixed-size record within a buffer.
+
+    Subclasses created by {py:func}`record_view` have an attribute for each
+    named field, which is unpacked from the buffer only when it's accessed,
+    so reading one field of a record doesn't decode the rest.
+
+    Views can also be indexed and iterated over like tuples, and compare
+    equal to tuples of the same values. As views don't copy their buffers,
+    they reflect any changes made to them.
+    """
+    __slots__ = ('_buffer', '_offset')
+    _fields = ()
+    _struct = None
+
+    def __init__(self, buffer, offset=0):
+        self._buffer = buffer
+        self._offset = offset
+
+    def __repr__(self):
+        values = ', '.join(f'{name}={getattr(self, name)!r}' for name in self._fields)
+        return f'{self.__class__.__name__}({values})'
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __iter__(self):
+        return iter(self._astuple())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._astuple()[index]
+        return getattr(self, self._fields[index])
+
+    def __eq__(self, other):
+        if isinstance(other, RecordView):
+            return self._astuple() == other._astuple()
+        if isinstance(other, tuple):
+            return self._astuple() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def _astuple(self):
+        """
+        Return a tuple of every field's value.
+        """
+        return self._struct.unpack_from(self._buffer, self._offset)
+
+    def _asdict(self):
+        """
+        Return a dict of each field's name and value.
+        """
+        return dict(zip(self._fields, self._astuple()))
+
+
+def _field_property(name, format_, offset):
+    unpack_from = get_struct(format_).unpack_from
+    def fget(self):
+        return unpack_from(self._buffer, self._offset + offset)[0]
+    fget.__name__ = name
+    return property(fget, doc=f"The {name!r} field, unpacked with {format_!r} at offset {offset}.")
+
+
+def record_view(format_, fields, name='Record'):
+    """
+    Return a {py:class}`RecordView` subclass named `name` for records
+    packed with `format_`, with an attribute for each of `fields`: a
+    sequence of names for each value, or a string of names separated by
+    spaces or commas.
+
+    Classes are cached, so asking for the same record view again returns
+    the same class.
+
+    >>> Point = record_view('<hh', 'x y', 'Point')
+    >>> p = Point(b'\\x01\\x00\\x02\\x00')
+    >>> p, p.y, p[0], tuple(p)
+    (Point(x=1, y=2), 2, 1, (1, 2))
+    """
+    if isinstance(fields, str):
+        fields = fields.replace(',', ' ').split()
+    return _record_view(format_, tuple(fields), name)
+
+
+@functools.lru_cache(maxsize=256)
+def _record_view(format_, fields, name):
+    field_formats = struct_fields(format_)
+    if len(fields) != len(field_formats):
+        raise ValueError(
+            f"format {format_!r} has {len(field_formats)} fields, but {len(fields)} names were given"
+        )
+    for field in fields:
+        if not isinstance(field, str) or not field.isidentifier() or field.startswith('_'):
+            raise ValueError(f"Field names must be identifiers not starting with an underscore; got {field!r}")
+    if len(set(fields)) != len(fields):
+        raise ValueError(f"Field names must be unique; got {fields!r}")
+    namespace = {
+        '__slots__': (),
+        '_fields': fields,
+        '_struct': get_struct(format_),
+    }
+    for field, (field_format, offset) in zip(fields, field_formats):
+        namespace[field] = _field_property(field, field_format, offset)
+    return type(name, (RecordView,), namespace)
+
+
+PACK_BLOCK_SIZE = 1 << 16
+"""
+The approximate number of bytes packed by `pack_items` between writes to a
+file.
+"""
+
+_ARRAY_TYPECODES = {
+    kind: [code for code in codes if code in array.typecodes]
+    for kind, codes in (('signed', 'bhilq'), ('unsigned', 'BHILQ'), ('float', 'd'))
+}
+
+
+@functools.lru_cache(maxsize=256)
+def struct_value_count(format_):
+    """
+    Return the number of values packed into or unpacked from a single
+    record of `format_`.
+    """
+    return len(struct_fields(format_))
+
+
+@functools.lru_cache(maxsize=256)
+def array_layout(format_):
+    """
+    If every value of `format_` has the same integer or double type, with no
+    padding, return a tuple of an {external:py:mod}`array` typecode with the
+    same layout and whether its bytes must be swapped to match the format's
+    byte order; otherwise, return `None`.
+
+    >>> array_layout('>3d') == ('d', sys.byteorder == 'little')
+    True
+    >>> array_layout('<ihx') is None
+    True
+    """
+    fields = struct_fields(format_)
+    codes = {field_format[-1] for field_format, _ in fields}
+    if len(codes) != 1 or struct.calcsize(format_) != len(fields) * struct.calcsize(fields[0][0]):
+        return None
+    [code] = codes
+    if code.isupper():
+        kind = 'unsigned'
+    elif code == 'd':
+        # Not 'f': arrays silently overflow to infinity, where `struct` raises.
+        kind = 'float'
+    elif code in 'bhilq':
+        kind = 'signed'
+    else:
+        return None
+    size = struct.calcsize(fields[0][0])
+    for typecode in _ARRAY_TYPECODES[kind]:
+        if array.array(typecode).itemsize == size:
+            break
+    else:
+        return None
+    byte_order = format_[:1]
+    if byte_order in '<>!':
+        swap = (byte_order == '<') != (sys.byteorder == 'little')
+    else:
+        swap = False
+    return (typecode, swap)
+
+
+def _array_blocks(iterable, layout, count, block_size):
+    # Yield arrays of about `block_size` bytes of whole records; or if an
+    # item doesn't fit the typecode, finally yield an iterator of the
+    # remaining items, starting with its block, to be packed by `struct`
+    # instead.
+    typecode, swap = layout
+    itemsize = array.array(typecode).itemsize
+    n = max(1, block_size // (itemsize * count)) * count
+    if isinstance(iterable, array.array) and iterable.typecode == typecode:
+        blocks = (iterable[i:i + n] for i in range(0, len(iterable), n))
+    else:
+        blocks = None
+        ix = iter(iterable)
+    while True:
+        if blocks is not None:
+            block = next(blocks, None)
+            if block is None:
+                return
+        else:
+            items = list(itertools.islice(ix, n))
+            if not items:
+                return
+            try:
+                block = array.array(typecode, items)
+            except (OverflowError, TypeError):
+                # Let `struct` raise its own error for the bad value.
+                yield itertools.chain(items, ix)
+                return
+        if len(block) % count:
+            raise struct.error(f"pack expected {count} items for packing (got {len(block) % count})")
+        if swap:
+            block.byteswap()
+        yield block
+
+
+def _pack_records(iterable, count):
+    # Yield an argument tuple for each record.
+    if count == 1:
+        return zip(iterable)
+    return chunks(iterable, count)
+
+
+def pack_items(iterable, format_, *, file=None, block_size=PACK_BLOCK_SIZE):
+    """
+    Pack the items of `iterable` into records of `format_`, each taking as
+    many items as it has values, and return the packed bytes; or if `file`
+    is provided, write them to it, and return the number of bytes written.
+
+    If every value of `format_` has the same integer or double type, items are
+    gathered into an {external:py:class}`array.array` (or with `file`, one
+    array of about `block_size` bytes at a time), and its bytes are used
+    as-is (swapped, if needed); an array with a matching typecode is sliced
+    directly. Otherwise, records are packed with a cached
+    {external:py:class}`struct.Struct` directly into a growing
+    {external:py:class}`bytearray`, or with `file`, into a reusable buffer
+    of about `block_size` bytes, which is written out whenever it fills.
+    Either way, with `file`, memory use is bounded by `block_size`.
+    """
+    st = get_struct(format_)
+    count = struct_value_count(format_)
+    if not count:
+        return b'' if file is None else 0
+    packed = []
+    written = 0
+    layout = array_layout(format_)
+    if layout is not None:
+        # Without a file, the result is held in memory anyway, so a single
+        # block will do.
+        rest = None
+        for block in _array_blocks(iterable, layout, count, sys.maxsize if file is None else block_size):
+            if not isinstance(block, array.array):
+                rest = block
+            elif file is None:
+                packed.append(block.tobytes())
+            else:
+                with memoryview(block) as view:
+                    file.write(view.cast('B'))
+                written += len(block) * block.itemsize
+        if rest is None:
+            return b''.join(packed) if file is None else written
+        iterable = rest
+    size = st.size
+    pack_into = st.pack_into
+    records = _pack_records(iterable, count)
+    if file is None:
+        buf = bytearray(size * 64)
+        pos = 0
+        for record in records:
+            if pos == len(buf):
+                buf += bytes(len(buf))
+            pack_into(buf, pos, *record)
+            pos += size
+        del buf[pos:]
+        packed.append(buf)
+        return b''.join(packed)
+    buf = bytearray(max(1, block_size // size) * size)
+    pos = 0
+    for record in records:
+        if pos == len(buf):
+            file.write(buf)
+            written += pos
+            pos = 0
+        pack_into(buf, pos, *record)
+        pos += size
+    if pos:
+        with memoryview(buf) as view:
+            file.write(view[:pos])
+        written += pos
+    return written
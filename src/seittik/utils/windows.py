@@ -0,0 +1,266 @@
+"""
+Utilities for sliding windows over iterables.
+"""
+import collections
+from collections.abc import Sequence
+import itertools
+import operator
+
+from .sentinels import _END, _MISSING
+
+
+__all__ = ()
+
+
+class WindowView(Sequence):
+    """
+    A read-only view of a window held in a ring buffer, starting at
+    `start`.
+
+    Creating a view copies nothing, but it reflects the buffer's current
+    contents, so a view is only meaningful until the buffer is next
+    updated. To keep a window, copy it, e.g. with `tuple(view)`.
+
+    >>> buf = [4, 5, 3]
+    >>> view = WindowView(buf, 2)
+    >>> list(view), view[0], view[-1], len(view)
+    ([3, 4, 5], 3, 5, 3)
+    >>> buf[2] = 6
+    >>> view
+    WindowView([6, 4, 5])
+    """
+    __slots__ = ('_buf', '_start')
+
+    def __init__(self, buf, start=0):
+        self._buf = buf
+        self._start = start
+
+    def __len__(self):
+        return len(self._buf)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self._buf)))]
+        n = len(self._buf)
+        if not -n <= index < n:
+            raise IndexError("window index out of range")
+        return self._buf[(self._start + index) % n]
+
+    def __iter__(self):
+        buf = self._buf
+        start = self._start
+        if not start:
+            return iter(buf)
+        return itertools.chain(itertools.islice(buf, start, None), itertools.islice(buf, start))
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({list(self)!r})'
+
+
+def windows(iterable, n, step=1):
+    """
+    Yield a {py:class}`WindowView` of each full window of `n` items of
+    `iterable`, starting every `step` items.
+
+    Each new item is written into a single ring buffer of `n` items, so
+    each window costs O(`step`) rather than O(`n`); as with any
+    {py:class}`WindowView`, each window is only valid until the next is
+    yielded.
+    """
+    ix = iter(iterable)
+    buf = list(itertools.islice(ix, n))
+    if len(buf) < n:
+        return
+    yield WindowView(buf)
+    if step >= n:
+        # Windows don't overlap, so refill the whole buffer.
+        skip = step - n
+        while True:
+            if skip and next(itertools.islice(ix, skip - 1, None), _END) is _END:
+                return
+            buf[:] = itertools.islice(ix, n)
+            if len(buf) < n:
+                return
+            yield WindowView(buf)
+    start = 0
+    if step == 1:
+        for item in ix:
+            buf[start] = item
+            start += 1
+            if start == n:
+                start = 0
+            yield WindowView(buf, start)
+        return
+    while True:
+        items = list(itertools.islice(ix, step))
+        if len(items) < step:
+            return
+        end = start + step
+        if end <= n:
+            buf[start:end] = items
+        else:
+            buf[start:] = items[:n - start]
+            buf[:end - n] = items[n - start:]
+        start = end % n
+        yield WindowView(buf, start)
+
+
+def chunks(iterable, n, step=None, *, fillvalue=_MISSING, fair=False, container=tuple):
+    """
+    Yield chunks of `n` items of `iterable`, starting every `step` items
+    (by default, `n`), as built by `container` from an iterable of items.
+
+    If the items run out partway through a chunk, the final chunk is
+    dropped if `fair` is true, padded with `fillvalue` if it's provided, and
+    otherwise yielded as-is. When `step` is 1, full sliding windows make up
+    every item, so there is no such final chunk unless there are fewer than
+    `n` items in all; when `step` is between 1 and `n`, the final chunk
+    contains the last `n - step` items of the final window, plus any items
+    after it.
+
+    When chunks don't overlap, each is built at C speed with
+    {external:py:func}`itertools.islice`. Overlapping chunks are built from
+    a {external:py:class}`collections.deque` ring buffer of the last `n`
+    items, which is extended `step` items at a time.
+    """
+    step = n if step is None else step
+    ix = iter(iterable)
+
+    def finish(chunk):
+        if not chunk or fair:
+            return
+        if fillvalue is not _MISSING and len(chunk) < n:
+            chunk = itertools.chain(chunk, itertools.repeat(fillvalue, n - len(chunk)))
+        yield container(chunk)
+
+    if step >= n:
+        skip = step - n
+        while True:
+            chunk = container(itertools.islice(ix, n))
+            if len(chunk) < n:
+                yield from finish(chunk)
+                return
+            yield chunk
+            if skip and next(itertools.islice(ix, skip - 1, None), _END) is _END:
+                return
+    ring = collections.deque(itertools.islice(ix, n), maxlen=n)
+    if len(ring) < n:
+        yield from finish(ring)
+        return
+    yield container(ring)
+    if step == 1:
+        append = ring.append
+        for item in ix:
+            append(item)
+            yield container(ring)
+        return
+    extend = ring.extend
+    while True:
+        items = tuple(itertools.islice(ix, step))
+        if len(items) < step:
+            yield from finish([*itertools.islice(ring, step, None), *items])
+            return
+        extend(items)
+        yield container(ring)
+
+
+def rolling_sum(iterable, n):
+    """
+    Yield the sum of each full window of `n` items of `iterable`, updating
+    a running total in O(1) per item.
+
+    The total is recomputed from scratch once every `n` items, which costs
+    O(1) per item amortized, so rounding errors of float items can't
+    accumulate.
+    """
+    ix = iter(iterable)
+    buf = list(itertools.islice(ix, n))
+    if len(buf) < n:
+        return
+    total = sum(buf)
+    yield total
+    i = 0
+    for item in ix:
+        total += item - buf[i]
+        buf[i] = item
+        i += 1
+        if i == n:
+            i = 0
+            total = sum(buf)
+        yield total
+
+
+def rolling_mean(iterable, n):
+    """
+    Yield the mean of each full window of `n` items of `iterable`, in O(1)
+    per item. See {py:func}`rolling_sum`.
+    """
+    return (total / n for total in rolling_sum(iterable, n))
+
+
+def _moments(buf):
+    mean = sum(buf) / len(buf)
+    return mean, sum((x - mean) ** 2 for x in buf)
+
+
+def rolling_variance(iterable, n, *, sample=False):
+    """
+    Yield the population variance (or the sample variance, if `sample` is
+    true) of each full window of `n` items of `iterable`, in O(1) per item.
+
+    The window's mean and sum of squared deviations are updated as each
+    item enters and leaves the window, and recomputed from scratch once
+    every `n` items, as with {py:func}`rolling_sum`.
+    """
+    d = n - 1 if sample else n
+    ix = iter(iterable)
+    buf = list(itertools.islice(ix, n))
+    if len(buf) < n:
+        return
+    mean, m2 = _moments(buf)
+    yield m2 / d
+    i = 0
+    for item in ix:
+        old = buf[i]
+        buf[i] = item
+        new_mean = mean + (item - old) / n
+        m2 += (item - old) * (item - new_mean + old - mean)
+        mean = new_mean
+        i += 1
+        if i == n:
+            i = 0
+            mean, m2 = _moments(buf)
+        # Cancellation can leave a tiny negative result for a constant window.
+        yield max(m2, 0.0) / d
+
+
+def _rolling_extreme(iterable, n, keep):
+    # A monotonic deque of (index, item) pairs: each item is `keep`-ordered
+    # relative to the ones before it, so the front is always the extreme of
+    # the window. Each item is pushed and popped at most once.
+    candidates = collections.deque()
+    push = candidates.append
+    for i, item in enumerate(iterable):
+        while candidates and not keep(candidates[-1][1], item):
+            candidates.pop()
+        push((i, item))
+        if candidates[0][0] <= i - n:
+            candidates.popleft()
+        if i >= n - 1:
+            yield candidates[0][1]
+
+
+def rolling_min(iterable, n):
+    """
+    Yield the minimum of each full window of `n` items of `iterable`, in
+    O(1) per item amortized.
+    """
+    return _rolling_extreme(iterable, n, operator.lt)
+
+
+def rolling_max(iterable, n):
+    """
+    Yield the maximum of each full window of `n` items of `iterable`, in
+    O(1) per item amortized.
+    """
+    return _rolling_extreme(iterable, n, operator.gt)
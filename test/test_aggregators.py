@@ -0,0 +1,185 @@
+import operator
+import pickle
+
+import pytest
+
+from seittik.shears import X
+from seittik.utils.aggregators import (
+    Accumulator, Aggregation, Aggregator, AGGREGATORS, BATCH_SIZE, to_aggregator,
+)
+
+
+# Aggregator
+
+def test_aggregator_repr():
+    assert repr(AGGREGATORS['sum']) == '<Aggregator add>'
+
+
+def test_aggregator_with_key():
+    agg = AGGREGATORS['sum'].with_key(len)
+    assert agg.key is len
+    assert AGGREGATORS['sum'].key is None
+
+
+def test_aggregator_bad():
+    with pytest.raises(TypeError):
+        Aggregator(0, operator.add)
+    with pytest.raises(TypeError):
+        Aggregator(int, operator.add, 'meow')
+
+
+# to_aggregator
+
+def test_to_aggregator_name():
+    assert to_aggregator('count') is AGGREGATORS['count']
+
+
+def test_to_aggregator_instance():
+    agg = Aggregator(int, operator.add)
+    assert to_aggregator(agg) is agg
+
+
+def test_to_aggregator_triple():
+    agg = to_aggregator((int, operator.add, str))
+    assert (agg.init, agg.step, agg.result, agg.merge) == (int, operator.add, str, None)
+
+
+def test_to_aggregator_quad():
+    agg = to_aggregator((int, operator.add, None, operator.add))
+    assert agg.merge is operator.add
+
+
+def test_to_aggregator_keyed():
+    agg = to_aggregator(('sum', len))
+    assert agg.step is operator.add
+    assert agg.key is len
+    agg = to_aggregator(((int, operator.add, None), len))
+    assert agg.key is len
+
+
+@pytest.mark.parametrize('spec, exc', [
+    ('median', ValueError),
+    (42, TypeError),
+    ((int,), TypeError),
+    (('sum', 'len'), TypeError),
+])
+def test_to_aggregator_bad(spec, exc):
+    with pytest.raises(exc):
+        to_aggregator(spec)
+
+
+# Aggregation
+
+def test_aggregation():
+    aggregation = Aggregation({'n': 'count', 'hi': ('max', X['v'])})
+    state = aggregation.init()
+    aggregation.update(state, [{'v': 3}, {'v': 7}])
+    aggregation.step(state, {'v': 5})
+    assert aggregation.result(state) == {'n': 3, 'hi': 7}
+    assert repr(aggregation) == '<Aggregation n, hi>'
+
+
+def test_aggregation_merge():
+    aggregation = Aggregation({name: name for name in AGGREGATORS})
+    a = aggregation.init()
+    aggregation.update(a, [4, 6, 6, 6])
+    b = aggregation.init()
+    aggregation.update(b, [7, 7, 9, 11])
+    empty = aggregation.init()
+    aggregation.merge(a, b)
+    aggregation.merge(a, empty)
+    whole = aggregation.init()
+    aggregation.update(whole, [4, 6, 6, 6, 7, 7, 9, 11])
+    assert aggregation.result(a) == aggregation.result(whole)
+
+
+def test_aggregation_merge_into_empty():
+    aggregation = Aggregation({'lo': 'min', 'first': 'first', 'last': 'last'})
+    a = aggregation.init()
+    b = aggregation.init()
+    aggregation.update(b, [2, 1, 3])
+    aggregation.merge(a, b)
+    assert aggregation.result(a) == {'lo': 1, 'first': 2, 'last': 3}
+
+
+def test_aggregation_merge_unsupported():
+    aggregation = Aggregation({'x': (int, operator.add, None)})
+    with pytest.raises(TypeError):
+        aggregation.merge(aggregation.init(), aggregation.init())
+
+
+def test_aggregation_bad():
+    with pytest.raises(TypeError):
+        Aggregation({})
+    with pytest.raises(TypeError):
+        Aggregation(['count'])
+
+
+# Accumulator
+
+def test_accumulator():
+    acc = Accumulator(Aggregation({'n': 'count', 'total': 'sum'}))
+    acc.update([1, 2, 3])
+    acc.update([4])
+    assert acc.result() == {'n': 4, 'total': 10}
+    assert repr(acc) == '<Accumulator n, total>'
+
+
+def test_accumulator_or_does_not_mutate():
+    aggregation = Aggregation({'items': 'list', 'distinct': 'set'})
+    a = Accumulator(aggregation)
+    a.update([1, 2])
+    b = Accumulator(aggregation)
+    b.update([2, 3])
+    assert (a | b).result() == {'items': [1, 2, 2, 3], 'distinct': {1, 2, 3}}
+    assert a.result() == {'items': [1, 2], 'distinct': {1, 2}}
+
+
+def test_accumulator_merge_mismatch():
+    a = Accumulator(Aggregation({'n': 'count'}))
+    b = Accumulator(Aggregation({'total': 'sum'}))
+    with pytest.raises(ValueError):
+        a.merge(b)
+
+
+def test_accumulator_pickle():
+    acc = Accumulator(Aggregation({name: name for name in AGGREGATORS}))
+    acc.update([3, 1, 2])
+    assert pickle.loads(pickle.dumps(acc)).result() == acc.result()
+
+
+def test_aggregation_update_batches():
+    n = BATCH_SIZE * 3 + 7
+    aggregation = Aggregation({
+        'n': 'count', 'total': 'sum', 'lo': 'min', 'hi': 'max', 'first': 'first',
+        'last': 'last', 'avg': 'mean', 'doubled': ('sum', X * 2),
+        'custom': (int, operator.add, None),
+    })
+    state = aggregation.init()
+    aggregation.update(state, iter(range(n)))
+    assert aggregation.result(state) == {
+        'n': n, 'total': sum(range(n)), 'lo': 0, 'hi': n - 1, 'first': 0, 'last': n - 1,
+        'avg': (n - 1) / 2, 'doubled': 2 * sum(range(n)), 'custom': sum(range(n)),
+    }
+
+
+def test_aggregation_update_matches_step():
+    aggregation = Aggregation({name: name for name in AGGREGATORS})
+    a = aggregation.init()
+    aggregation.update(a, [5, 3, 8, 1])
+    b = aggregation.init()
+    for item in [5, 3, 8, 1]:
+        aggregation.step(b, item)
+    assert aggregation.result(a) == aggregation.result(b)
+
+
+def test_aggregation_update_groups():
+    aggregation = Aggregation({'n': 'count', 'total': ('sum', X['v'])})
+    states = {}
+    aggregation.update_groups(states, [{'k': 'a', 'v': 1}, {'k': 'b', 'v': 2}], X['k'])
+    aggregation.update_groups(states, [{'k': 'a', 'v': 3}], X['k'])
+    assert list(states) == ['a', 'b']
+    assert {k: aggregation.result(s) for k, s in states.items()} == {
+        'a': {'n': 2, 'total': 4},
+        'b': {'n': 1, 'total': 2},
+    }
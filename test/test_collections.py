@@ -1,4 +1,4 @@
-from seittik.utils.collections import defaultlist, Seen
+from seittik.utils.collections import defaultlist, RecentSeen, Seen
 
 import pytest
 
@@ -36,6 +36,12 @@ def test_seen_hash():
     assert [x in s for x in (1, 2, 1, 2, 3)] == [False, False, True, True, False]
 
 
+def test_seen_default_equality():
+    s = Seen()
+    # hash(-1) == hash(-2) in CPython
+    assert [x in s for x in (-1, -2, -1, -2)] == [False, False, True, True]
+
+
 def test_seen_id():
     s = Seen(id)
     a, b, c = [[1], [2], [1]]
@@ -72,3 +78,32 @@ def test_seen_bool():
     assert bool(s)
     s.clear()
     assert not bool(s)
+
+
+# RecentSeen
+
+def test_recentseen():
+    s = RecentSeen(2)
+    assert [x in s for x in (1, 2, 1, 3, 1, 2)] == [False, False, True, False, True, False]
+
+
+def test_recentseen_len():
+    s = RecentSeen(2)
+    for x in (1, 2, 3, 4):
+        x in s
+    assert len(s) == 2
+    assert repr(s) == '<RecentSeen (2)>'
+
+
+def test_recentseen_key():
+    s = RecentSeen(2, key=str.upper)
+    assert [x in s for x in 'aAbBcCa'] == [False, True, False, True, False, True, False]
+
+
+def test_recentseen_clear():
+    s = RecentSeen(2)
+    for x in (1, 2):
+        x in s
+    s.clear()
+    assert not s
+    assert 1 not in s
@@ -1,4 +1,6 @@
-from seittik.utils.compareutils import Maximum, Minimum
+from seittik.utils.compareutils import Maximum, Minimum, minmax
+
+import pytest
 
 
 def test_minimum_vs_maximum():
@@ -30,3 +32,18 @@ def test_maximum_repr():
 def test_minimum_repr():
     minimum = Minimum()
     assert repr(minimum) == '<MINIMUM>'
+
+
+def test_minmax():
+    assert minmax([3, 2, 5, 1, 4]) == (1, 5)
+    assert minmax(iter([3, 2, 5, 1, 4])) == (1, 5)
+
+
+def test_minmax_key_ties():
+    assert minmax(['bb', 'a', 'cc', 'd', 'ee'], key=len) == ('a', 'bb')
+
+
+def test_minmax_empty():
+    with pytest.raises(ValueError):
+        minmax([])
+    assert minmax([], default=0) == (0, 0)
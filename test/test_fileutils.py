@@ -0,0 +1,181 @@
+import gzip
+import io
+import pathlib
+
+import pytest
+
+from seittik.utils.fileutils import (
+    check_atomic, check_compression, iter_chunks, iter_lines, open_reader, open_writer,
+    resolve_compression, write_batched, write_partitions,
+)
+
+
+@pytest.mark.parametrize(('path', 'expected'), [
+    ('log.gz', 'gzip'),
+    ('log.txt.BZ2', 'bz2'),
+    (pathlib.Path('log.xz'), 'lzma'),
+    ('log.lzma', 'lzma'),
+    ('log.txt', None),
+    ('log', None),
+])
+def test_resolve_compression(path, expected):
+    assert resolve_compression(path, 'infer') == expected
+    assert resolve_compression(path, 'gzip') == 'gzip'
+    assert resolve_compression(path, None) is None
+
+
+def test_check_compression():
+    for value in ('infer', 'gzip', 'bz2', 'lzma', None):
+        check_compression('compression', value)
+    with pytest.raises(ValueError):
+        check_compression('compression', 'xz')
+
+
+def test_open_reader(tmp_path):
+    path = tmp_path / 'data'
+    with gzip.open(path, 'wb') as f:
+        f.write(b'meow' * 1000)
+    with open_reader(path, compression='gzip', buffer_size=10) as f:
+        assert f.read(8) == b'meowmeow'
+        assert len(f.read()) == 3992
+    assert f.closed
+
+
+@pytest.mark.filterwarnings('error')
+def test_open_reader_buffer_size_one(tmp_path):
+    path = tmp_path / 'data'
+    path.write_bytes(b'meow\npurr\n')
+    with open_reader(path, buffer_size=1) as f:
+        assert f.read() == b'meow\npurr\n'
+    assert list(iter_lines(path, buffer_size=1)) == ['meow', 'purr']
+
+
+def test_iter_lines_ranges(tmp_path):
+    path = tmp_path / 'lines.txt'
+    path.write_bytes(b'a\nbc\n\ndef')
+    # Each line belongs to the range holding its first byte.
+    assert list(iter_lines(path, end=0)) == []
+    assert list(iter_lines(path, end=1)) == ['a']
+    assert list(iter_lines(path, start=1, end=2)) == []
+    assert list(iter_lines(path, start=2, end=6)) == ['bc', '']
+    assert list(iter_lines(path, start=6, keepends=True)) == ['def']
+    assert list(iter_lines(path, start=100)) == []
+
+
+def test_iter_lines_compressed_ranges(tmp_path):
+    path = tmp_path / 'lines.gz'
+    path.write_bytes(gzip.compress(b'a\nb\n'))
+    with pytest.raises(ValueError):
+        list(iter_lines(path, start=1))
+
+
+def test_iter_chunks_short_reads(tmp_path, monkeypatch):
+    path = tmp_path / 'data'
+    path.write_bytes(bytes(range(100)))
+    with open(path, 'rb', buffering=0) as f:
+        file_class = type(f)
+    real_readinto = file_class.readinto
+    class ShortReads(file_class):
+        def readinto(self, buffer):
+            # Never read more than 7 bytes at once.
+            with memoryview(buffer) as view:
+                return real_readinto(self, view[:7])
+    monkeypatch.setattr('builtins.open', lambda *args, **kwargs: ShortReads(args[0], 'rb'))
+    chunks = [bytes(chunk) for chunk in iter_chunks(path, 30)]
+    assert chunks == [bytes(range(i, min(i + 30, 100))) for i in range(0, 100, 30)]
+
+
+class RecordingFile(io.BytesIO):
+    def __init__(self):
+        super().__init__()
+        self.sizes = []
+
+    def write(self, data):
+        self.sizes.append(len(data))
+        return super().write(data)
+
+
+def test_write_batched():
+    f = RecordingFile()
+    items = [b'x' * 10] * 5000
+    assert write_batched(f, items, b''.join, buffer_size=20000) == (5000, 50000)
+    assert f.getvalue() == b'x' * 50000
+    # Batches of 1024 items are written once 20000 bytes are pending.
+    assert f.sizes == [20480, 20480, 9040]
+    assert write_batched(RecordingFile(), [], b''.join) == (0, 0)
+
+
+def test_open_writer_atomic(tmp_path):
+    path = tmp_path / 'out'
+    with open_writer(path, atomic=True) as f:
+        f.write(b'meow')
+        [temp] = tmp_path.iterdir()
+        assert temp.name.startswith('.out.')
+        assert not path.exists()
+    assert path.read_bytes() == b'meow'
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_open_writer_file_object():
+    f = io.BytesIO()
+    f.name = 'out.gz'
+    with open_writer(f) as w:
+        w.write(b'meow')
+    assert f.getvalue() == b'meow'
+    with open_writer(f, compression='gzip') as w:
+        w.write(b'woof')
+    assert gzip.decompress(f.getvalue()[4:]) == b'woof'
+    assert not f.closed
+
+
+def test_check_atomic(tmp_path):
+    check_atomic(tmp_path / 'out', True)
+    check_atomic(io.BytesIO(), False)
+    with pytest.raises(TypeError):
+        check_atomic(io.BytesIO(), True)
+
+
+def test_write_partitions_lru(tmp_path, monkeypatch):
+    opened = []
+    real_open = open
+    def tracking_open(path, mode):
+        opened.append((pathlib.Path(path).name, mode))
+        return real_open(path, mode)
+    monkeypatch.setattr('builtins.open', tracking_open)
+    # Every item fills a buffer, so every item is written at once.
+    items = [b'a', b'b', b'a', b'c', b'a', b'b']
+    counts = write_partitions(
+        items, bytes.decode, lambda k: tmp_path / k, encode=b''.join, max_open=2, buffer_size=1,
+    )
+    monkeypatch.undo()
+    assert counts == {'a': 3, 'b': 2, 'c': 1}
+    # 'a' stays open as the most recently used; 'b' is evicted by 'c', then reopened.
+    assert opened == [('a', 'wb'), ('b', 'wb'), ('c', 'wb'), ('b', 'ab')]
+    assert [(tmp_path / k).read_bytes() for k in 'abc'] == [b'aaa', b'bb', b'c']
+
+
+def test_write_partitions_max_pending(tmp_path):
+    consumed = 0
+    written = []
+
+    def items():
+        nonlocal consumed
+        for i in range(10_000):
+            consumed += 1
+            yield b'%04d\n' % i
+
+    def encode(batch):
+        written.append(consumed)
+        return b''.join(batch)
+
+    # No key's own buffer ever fills, but the total pending across keys does.
+    counts = write_partitions(
+        items(), lambda item: item[-2:-1].decode(), lambda k: tmp_path / k,
+        encode=encode, buffer_size=1 << 20, max_pending=1000,
+    )
+    assert counts == {str(k): 1000 for k in range(10)}
+    assert written[0] < 10_000
+    assert sum(c < 10_000 for c in written) > 10
+    for k in range(10):
+        lines = (tmp_path / str(k)).read_bytes().splitlines()
+        assert lines == [b'%04d' % i for i in range(k, 10_000, 10)]
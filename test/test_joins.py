@@ -0,0 +1,101 @@
+import itertools
+import random
+
+import pytest
+
+from seittik.utils.joins import check_how, hash_join, JOIN_HOWS, merge_join
+
+
+def naive_join(left, right, how, left_key=None, right_key=None):
+    left_key = left_key or (lambda x: x)
+    right_key = right_key or (lambda x: x)
+    ret = []
+    matched_right = set()
+    for i, l in enumerate(left):
+        matches = [(j, r) for j, r in enumerate(right) if left_key(l) == right_key(r)]
+        if how == 'semi':
+            if matches:
+                ret.append(l)
+        elif how == 'anti':
+            if not matches:
+                ret.append(l)
+        else:
+            ret.extend((l, r) for _, r in matches)
+            matched_right.update(j for j, _ in matches)
+            if not matches and how in ('left', 'outer'):
+                ret.append((l, None))
+    if how == 'outer':
+        ret.extend((None, r) for j, r in enumerate(right) if j not in matched_right)
+    return ret
+
+
+def sort_key(item):
+    return repr(item)
+
+
+@pytest.mark.parametrize('how', JOIN_HOWS)
+@pytest.mark.parametrize('sized', [False, True])
+def test_hash_join(how, sized):
+    rng = random.Random(0)
+    left = [rng.randrange(20) for _ in range(50)]
+    right = [rng.randrange(20) for _ in range(30)]
+    expected = naive_join(left, right, how)
+    if sized:
+        result = list(hash_join(left, right, left_key=None, right_key=None, how=how))
+        # The table is built on the smaller side, changing the order.
+        assert sorted(result, key=sort_key) == sorted(expected, key=sort_key)
+        result = list(hash_join(right, left, left_key=None, right_key=None, how=how))
+        assert sorted(result, key=sort_key) == sorted(naive_join(right, left, how), key=sort_key)
+    else:
+        result = list(hash_join(iter(left), iter(right), left_key=None, right_key=None, how=how))
+        assert result == expected
+
+
+@pytest.mark.parametrize('how', JOIN_HOWS)
+def test_merge_join(how):
+    rng = random.Random(0)
+    left = sorted(rng.randrange(20) for _ in range(50))
+    right = sorted(rng.randrange(20) for _ in range(30))
+    expected = naive_join(left, right, how)
+    result = list(merge_join(iter(left), iter(right), left_key=None, right_key=None, how=how))
+    assert sorted(result, key=sort_key) == sorted(expected, key=sort_key)
+
+
+def test_merge_join_key_order():
+    left = [1, 3, 5]
+    right = [0, 3, 4, 6]
+    assert list(merge_join(left, right, left_key=None, right_key=None, how='outer')) == [
+        (None, 0), (1, None), (3, 3), (None, 4), (5, None), (None, 6),
+    ]
+
+
+def test_merge_join_streams():
+    left = itertools.count()
+    right = itertools.count(0, 2)
+    result = merge_join(left, right, left_key=None, right_key=None, how='left')
+    assert list(itertools.islice(result, 5)) == [(0, 0), (1, None), (2, 2), (3, None), (4, 4)]
+
+
+@pytest.mark.parametrize('join', [hash_join, merge_join])
+def test_join_keys_and_combine(join):
+    left = [('a', 1), ('b', 2), ('c', 3)]
+    right = [{'id': 'a', 'v': 10}, {'id': 'c', 'v': 30}, {'id': 'c', 'v': 31}]
+    result = join(
+        left, right, left_key=lambda x: x[0], right_key=lambda x: x['id'], how='left',
+        combine=lambda left, right: (left[1], right and right['v']), fillvalue=None,
+    )
+    assert list(result) == [(1, 10), (2, None), (3, 30), (3, 31)]
+
+
+@pytest.mark.parametrize('join', [hash_join, merge_join])
+@pytest.mark.parametrize('how', JOIN_HOWS)
+def test_join_empty(join, how):
+    assert list(join([], [], left_key=None, right_key=None, how=how)) == []
+    assert list(join([1], [], left_key=None, right_key=None, how=how)) == naive_join([1], [], how)
+    assert list(join([], [1], left_key=None, right_key=None, how=how)) == naive_join([], [1], how)
+
+
+def test_check_how():
+    check_how('how', 'inner')
+    with pytest.raises(ValueError):
+        check_how('how', 'cross')
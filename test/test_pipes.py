@@ -1,8 +1,21 @@
+import array
+import builtins
+import bz2
+import collections
+from decimal import Decimal
+from fractions import Fraction
+import gzip
+import io
 import itertools
+import lzma
+import random
+import statistics
+import struct
 
 import pytest
 
 from seittik.pipes import END, Pipe
+from seittik.shears import X
 
 
 ########################################################################
@@ -242,6 +255,165 @@ def test_pipe_cache():
     assert p3.list() == [3, 6, 9, 12, 15]
 
 
+########################################################################
+# Optimizer
+
+_OPTIMIZER_DATA = [
+    [],
+    [5],
+    [3, 1, 4, 1, 5, 9, 2, 6, 5, 3, 5, 8, 9, 7, 9, 3, 2, 3, 8, 4],
+    [(2, 'a'), (1, 'b'), (2, 'c'), (1, 'd'), (3, 'e'), (2, 'f'), (1, 'g')],
+]
+
+
+@pytest.mark.parametrize(
+    ['rule', 'build'],
+    [
+        ('slice-before-map', lambda p: p.map(repr).take(3)),
+        ('slice-before-map', lambda p: p.map(repr).slice(1, 6, 2)),
+        ('slice-before-map', lambda p: p.map(repr).drop(2)),
+        ('sort-take-topk', lambda p: p.sort().take(3)),
+        ('sort-take-topk', lambda p: p.sort(reverse=True).take(4)),
+        ('sort-take-topk', lambda p: p.sort(key=lambda x: repr(x)[:2]).take(5)),
+        ('sort-take-topk', lambda p: p.sort(key=lambda x: repr(x)[:2], reverse=True).slice(3)),
+        ('filter-fusion', lambda p: p.filter(lambda x: repr(x) < '5').filter(lambda x: repr(x) > '2')),
+        ('filter-fusion', lambda p: p.filter(bool).filter(lambda x: repr(x) > '2').filter(lambda x: repr(x) != '8')),
+        ('map-fusion', lambda p: p.map(repr).map(len)),
+        ('reverse-take-tail', lambda p: p.reverse().take(3)),
+        ('reverse-take-tail', lambda p: p.reverse().take(0)),
+        ('reverse-take-tail', lambda p: p.reverse().slice(30)),
+        ('redundant-unique', lambda p: p.unique().filter(bool).unique()),
+        ('redundant-unique', lambda p: p.unique(key=type).unique().unique()),
+    ],
+)
+@pytest.mark.parametrize('data', _OPTIMIZER_DATA)
+@pytest.mark.parametrize('wrap', [list, iter])
+def test_pipe_optimizer_differential(rule, build, data, wrap):
+    p = build(Pipe(wrap(data)))
+    assert rule in p.explain()
+    assert build(Pipe(wrap(data))).list() == build(Pipe(wrap(data))).disable_rules().list()
+
+
+def test_pipe_optimizer_slice_before_map_skips_calls():
+    called = []
+    p = Pipe.range(9).map(lambda x: called.append(x) or x * 2).slice(2, 8, 3)
+    assert p.list() == [4, 10]
+    assert called == [2, 5]
+
+
+def test_pipe_optimizer_sort_take_stable():
+    data = [(2, 'a'), (1, 'b'), (2, 'c'), (1, 'd'), (2, 'e')]
+    p = Pipe(data).sort(key=lambda x: x[0], reverse=True).take(2)
+    assert p.explain() == ('sort-take-topk',)
+    assert p.list() == [(2, 'a'), (2, 'c')]
+
+
+def test_pipe_optimizer_map_fusion_pairs_only():
+    p = Pipe([1, 2, 3]).map(str).map(int).map(str)
+    assert p.explain() == ('map-fusion',)
+    assert p.list() == ['1', '2', '3']
+
+
+def test_pipe_optimizer_reverse_take_tail_range():
+    p = Pipe(range(10**12)).reverse().take(3)
+    assert p.list() == [10**12 - 1, 10**12 - 2, 10**12 - 3]
+
+
+@pytest.mark.parametrize(
+    'build',
+    [
+        lambda: Pipe({3, 1, 2}).unique(),
+        lambda: Pipe({'a': 1, 'b': 2}).sort().unique(),
+        lambda: Pipe.keys({'a': 1, 'b': 2}).unique(),
+        lambda: Pipe.range(10).unique(),
+        lambda: Pipe.rangetil(10).filter(bool).unique(),
+        lambda: Pipe([1, 1, 2]).unique().take(5).unique(),
+    ],
+)
+def test_pipe_optimizer_redundant_unique(build):
+    assert build().explain() == ('redundant-unique',)
+    assert build().list() == build().disable_rules().list()
+
+
+@pytest.mark.parametrize(
+    'p',
+    [
+        Pipe([1, 1, 2]).unique(),
+        Pipe({1, 2}).map(lambda x: x // 2).unique(),
+        Pipe([1, 1, 2]).unique(key=lambda x: x).unique(key=lambda x: x),
+        Pipe.range(10).unique(key=lambda x: x),
+        Pipe([1.0, 1, True]).unique().unique(key=type).unique(),
+    ],
+)
+def test_pipe_optimizer_unique_kept(p):
+    assert p.explain() == ()
+
+
+def test_pipe_optimizer_unique_after_keyed_unique():
+    p = Pipe([1.0, 1, True]).unique(key=type).unique()
+    assert p.explain() == ()
+    assert p.list() == [1.0]
+
+
+def test_pipe_optimizer_opaque_steps():
+    p = Pipe([3, 1, 2]).sort().tap(lambda x: None).take(2)
+    assert p.explain() == ()
+
+
+def test_pipe_optimizer_disable_rules():
+    p = Pipe([3, 1, 2]).sort().map(str).take(2)
+    assert p.explain() == ('slice-before-map', 'sort-take-topk')
+    assert p.disable_rules('sort-take-topk').explain() == ('slice-before-map',)
+    assert p.disable_rules('slice-before-map').explain() == ()
+    assert p.disable_rules().explain() == ()
+    assert p.disable_rules().enable_rules('slice-before-map').explain() == ('slice-before-map',)
+    assert p.disable_rules().enable_rules().explain() == ('slice-before-map', 'sort-take-topk')
+
+
+def test_pipe_optimizer_disable_rules_partial():
+    p = Pipe().sort().take(2).disable_rules().list()
+    assert p([3, 1, 2]) == [1, 2]
+
+
+def test_pipe_optimizer_bad_rule():
+    with pytest.raises(ValueError, match='Unknown optimizer rule'):
+        Pipe([]).disable_rules('meow')
+    with pytest.raises(ValueError, match='Unknown optimizer rule'):
+        Pipe([]).enable_rules('meow')
+
+
+def test_pipe_optimizer_rules():
+    assert Pipe.OPTIMIZER_RULES == (
+        'slice-before-map',
+        'sort-take-topk',
+        'filter-fusion',
+        'map-fusion',
+        'reverse-take-tail',
+        'redundant-unique',
+    )
+
+
+########################################################################
+# Numeric precision
+
+def test_pipe_set_precision():
+    p = Pipe([0.1] * 10).set_precision('fsum')
+    assert p.sum() == 1.0
+    assert p.sum(precision='fast') == 0.9999999999999999
+    assert Pipe([0.1] * 10).sum() == 0.9999999999999999
+
+
+def test_pipe_set_precision_survives_steps():
+    p = Pipe().set_precision('exact').map(lambda x: x)
+    assert p([1, 2]).variance() == Fraction(1, 4)
+    assert p([1, 2]).variance(precision='fast') == 0.25
+
+
+def test_pipe_set_precision_bad():
+    with pytest.raises(ValueError):
+        Pipe([1]).set_precision('sloppy')
+
+
 ########################################################################
 # Random number generation setup
 
@@ -354,6 +526,133 @@ def test_pipe_source_randrange(random_seed_0):
     assert list(p.take(5)) == [4, 4, 1, 3, 5]
 
 
+# Pipe.lines
+
+LOG_LINES = [f'{i} {"meow" * (i % 5)}' for i in range(500)]
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    path = tmp_path / 'log.txt'
+    path.write_text(''.join(f'{line}\n' for line in LOG_LINES), encoding='utf-8')
+    return path
+
+
+def test_pipe_source_lines(log_path):
+    assert Pipe.lines(log_path).list() == LOG_LINES
+    assert Pipe.lines(log_path, keepends=True).list() == [f'{line}\n' for line in LOG_LINES]
+    assert Pipe.lines(log_path, buffer_size=7).list() == LOG_LINES
+
+
+def test_pipe_source_lines_newlines(tmp_path):
+    path = tmp_path / 'crlf.txt'
+    path.write_bytes('caf\xe9\r\nmeow\n\nwoof'.encode('utf-8'))
+    assert Pipe.lines(path).list() == ['caf\xe9', 'meow', '', 'woof']
+    assert Pipe.lines(path, start=0).list() == ['caf\xe9', 'meow', '', 'woof']
+    assert Pipe.lines(path, start=1).list() == ['meow', '', 'woof']
+    assert Pipe.lines(path, end=100, keepends=True).list() == ['caf\xe9\r\n', 'meow\n', '\n', 'woof']
+    assert Pipe.lines(path, keepends=True).list() == ['caf\xe9\n', 'meow\n', '\n', 'woof']
+
+
+@pytest.mark.parametrize(('compression', 'suffix'), [('gzip', '.gz'), ('bz2', '.bz2'), ('lzma', '.xz')])
+def test_pipe_source_lines_compression(tmp_path, compression, suffix):
+    opener = {'gzip': gzip.open, 'bz2': bz2.open, 'lzma': lzma.open}[compression]
+    path = tmp_path / f'log{suffix}'
+    with opener(path, 'wt', encoding='utf-8') as f:
+        f.writelines(f'{line}\n' for line in LOG_LINES)
+    assert Pipe.lines(path).list() == LOG_LINES
+    other = tmp_path / 'log.dat'
+    other.write_bytes(path.read_bytes())
+    assert Pipe.lines(other, compression=compression).list() == LOG_LINES
+    with pytest.raises(ValueError):
+        Pipe.lines(path, start=10)
+
+
+@pytest.mark.parametrize('n_ranges', [1, 2, 7, 100])
+@pytest.mark.parametrize('buffer_size', [5, 100, 65536])
+def test_pipe_source_lines_ranges(log_path, n_ranges, buffer_size):
+    size = log_path.stat().st_size
+    bounds = [size * i // n_ranges for i in range(n_ranges + 1)]
+    shards = [Pipe.lines(log_path, start=a, end=b, buffer_size=buffer_size) for a, b in zip(bounds, bounds[1:])]
+    assert Pipe.chain(*shards).list() == LOG_LINES
+
+
+def test_pipe_source_lines_closes_early(log_path, monkeypatch):
+    opened = []
+    def tracking_open(*args, **kwargs):
+        f = io.open(*args, **kwargs)
+        opened.append(f)
+        return f
+    monkeypatch.setattr(builtins, 'open', tracking_open)
+    assert Pipe.lines(log_path).take(2).list() == LOG_LINES[:2]
+    assert Pipe.lines(log_path, start=3).find(lambda line: 'meow' in line) == LOG_LINES[1]
+    monkeypatch.undo()
+    assert len(opened) == 2
+    assert all(f.closed for f in opened)
+
+
+def test_pipe_source_lines_bad(log_path):
+    with pytest.raises(ValueError):
+        Pipe.lines(log_path, compression='zip')
+    with pytest.raises(ValueError):
+        Pipe.lines(log_path, buffer_size=0)
+    with pytest.raises(TypeError):
+        Pipe.lines(log_path, start=1.5)
+
+
+# Pipe.mmap
+
+@pytest.fixture
+def records_path(tmp_path):
+    path = tmp_path / 'records.bin'
+    path.write_bytes(b''.join(struct.pack('<iH', i, i % 7) for i in range(1000)))
+    return path
+
+
+def test_pipe_source_mmap(records_path):
+    assert Pipe.mmap(records_path, '<iH').list() == [(i, i % 7) for i in range(1000)]
+
+
+def test_pipe_source_mmap_offset_limit(records_path):
+    assert Pipe.mmap(records_path, '<iH', offset=998).list() == [(998, 4), (999, 5)]
+    assert Pipe.mmap(records_path, '<iH', offset=10, limit=2).list() == [(10, 3), (11, 4)]
+    assert Pipe.mmap(records_path, '<iH', offset=990, limit=100).list() == [(i, i % 7) for i in range(990, 1000)]
+    assert Pipe.mmap(records_path, '<iH', offset=1000).list() == []
+    assert Pipe.mmap(records_path, '<iH', limit=0).list() == []
+
+
+def test_pipe_source_mmap_shards(records_path):
+    shards = [Pipe.mmap(records_path, '<iH', offset=i, limit=300, release=False) for i in range(0, 1000, 300)]
+    assert Pipe.chain(*shards).list() == Pipe.mmap(records_path, '<iH').list()
+
+
+def test_pipe_source_mmap_early_exit(records_path):
+    assert Pipe.mmap(records_path, '<iH').take(2).list() == [(0, 0), (1, 1)]
+
+
+def test_pipe_source_mmap_partial_record(tmp_path):
+    path = tmp_path / 'partial.bin'
+    path.write_bytes(b'\x01\x00\x00\x00\x02\x00')
+    with pytest.raises(struct.error):
+        Pipe.mmap(path, '<i').list()
+    assert Pipe.mmap(path, '<i', limit=1).list() == [(1,)]
+
+
+def test_pipe_source_mmap_empty(tmp_path):
+    path = tmp_path / 'empty.bin'
+    path.write_bytes(b'')
+    assert Pipe.mmap(path, '<i').list() == []
+
+
+def test_pipe_source_mmap_bad():
+    with pytest.raises(struct.error):
+        Pipe.mmap('nope.bin', '<Z')
+    with pytest.raises(ValueError):
+        Pipe.mmap('nope.bin', '<i', offset=-1)
+    with pytest.raises(TypeError):
+        Pipe.mmap('nope.bin', '<i', limit=1.5)
+
+
 # Pipe.randfloat
 
 def test_pipe_source_randfloat_0_1(random_seed_0):
@@ -422,6 +721,54 @@ def test_pipe_source_rangetil_infinite_negative():
     assert list(p.take(5)) == [5, 4, 3, 2, 1]
 
 
+# Pipe.read_chunks
+
+@pytest.fixture
+def data_path(tmp_path):
+    path = tmp_path / 'data.bin'
+    path.write_bytes(bytes(range(256)) * 40)
+    return path
+
+
+@pytest.mark.parametrize('size', [1, 100, 1024, 10240, 100000])
+def test_pipe_source_read_chunks(data_path, size):
+    data = data_path.read_bytes()
+    expected = [data[i:i + size] for i in range(0, len(data), size)]
+    assert Pipe.read_chunks(data_path, size).map(bytes).list() == expected
+    assert Pipe.read_chunks(data_path, size, copy=True).list() == expected
+
+
+def test_pipe_source_read_chunks_pool(data_path):
+    chunks = Pipe.read_chunks(data_path, 1000, pool_size=3).list()
+    assert all(isinstance(chunk, memoryview) for chunk in chunks)
+    # Buffers are reused in turn, so only the last few chunks are intact.
+    assert [chunk.obj for chunk in chunks[:3]] == [chunk.obj for chunk in chunks[3:6]]
+    assert len({id(chunk.obj) for chunk in chunks}) == 3
+    data = data_path.read_bytes()
+    assert bytes(chunks[-1]) == data[10000:]
+    assert bytes(chunks[-2]) == data[9000:10000]
+    copies = Pipe.read_chunks(data_path, 1000, copy=True).list()
+    assert b''.join(copies) == data
+
+
+def test_pipe_source_read_chunks_framed(records_path):
+    p = Pipe.read_chunks(records_path, 100, pool_size=1).struct_unpack('<iH', framed=True)
+    assert p.list() == [(i, i % 7) for i in range(1000)]
+
+
+def test_pipe_source_read_chunks_empty(tmp_path):
+    path = tmp_path / 'empty.bin'
+    path.write_bytes(b'')
+    assert Pipe.read_chunks(path, 10).list() == []
+
+
+def test_pipe_source_read_chunks_bad(data_path):
+    with pytest.raises(ValueError):
+        Pipe.read_chunks(data_path, 0)
+    with pytest.raises(ValueError):
+        Pipe.read_chunks(data_path, 10, pool_size=0)
+
+
 # Pipe.repeat
 
 def test_pipe_source_repeat():
@@ -570,6 +917,39 @@ def test_pipe_sourcestep_interleave_intermediate_fair():
     assert list(p) == ['a', 'd', 'g', 'b', 'e', 'h']
 
 
+# Pipe.merge_sorted
+
+def test_pipe_sourcestep_merge_sorted_constructor():
+    p = Pipe.merge_sorted([1, 4, 7], [2, 5, 8], [3, 6, 9])
+    assert list(p) == [1, 2, 3, 4, 5, 6, 7, 8, 9]
+
+
+def test_pipe_sourcestep_merge_sorted_intermediate():
+    p = Pipe([[1, 4, 7], [2, 5], [], [3, 6, 9]]).merge_sorted()
+    assert list(p) == [1, 2, 3, 4, 5, 6, 7, 9]
+
+
+def test_pipe_sourcestep_merge_sorted_reverse():
+    p = Pipe.merge_sorted('ca', 'dba', reverse=True)
+    assert list(p) == ['d', 'c', 'b', 'a', 'a']
+
+
+@pytest.mark.parametrize('reverse', [False, True])
+def test_pipe_sourcestep_merge_sorted_stable(reverse):
+    a = [(1, 'a'), (1, 'a'), (2, 'a')]
+    b = [(1, 'b'), (2, 'b')]
+    c = [(2, 'c')]
+    iterables = [sorted(x, key=X[0], reverse=reverse) for x in (a, b, c)]
+    expected = sorted(a + b + c, key=X[0], reverse=reverse)
+    assert Pipe.merge_sorted(*iterables, key=X[0], reverse=reverse).list() == expected
+    assert Pipe(iterables).merge_sorted(key=X[0], reverse=reverse).list() == expected
+
+
+def test_pipe_sourcestep_merge_sorted_lazy():
+    p = Pipe.merge_sorted(itertools.count(0, 2), itertools.count(1, 2))
+    assert p.take(5).list() == [0, 1, 2, 3, 4]
+
+
 # Pipe.struct_unpack
 
 def test_pipe_sourcestep_struct_unpack_constructor():
@@ -582,6 +962,71 @@ def test_pipe_sourcestep_struct_unpack_intermediate():
     assert bytes(p) == b'meow'
 
 
+RECORDS = b''.join(struct.pack('<hxHd', i, i % 3, i / 2) for i in range(10))
+
+
+def test_pipe_sourcestep_struct_unpack_fields_constructor():
+    records = Pipe.struct_unpack('<hxHd', RECORDS, fields='id status value').list()
+    assert records == [(i, i % 3, i / 2) for i in range(10)]
+    assert [r.id for r in records if r.status == 2] == [2, 5, 8]
+    assert repr(records[1]) == 'Record(id=1, status=1, value=0.5)'
+
+
+def test_pipe_sourcestep_struct_unpack_fields_filter():
+    p = Pipe.struct_unpack('<hxHd', RECORDS, fields=['id', 'status', 'value']).filter(X.attr('status') == 0)
+    assert p.map(X.attr('id')).list() == [0, 3, 6, 9]
+
+
+def test_pipe_sourcestep_struct_unpack_fields_shares_buffer():
+    buf = bytearray(RECORDS)
+    records = Pipe.struct_unpack('<hxHd', buf, fields='id status value').list()
+    buf[0] = 42
+    assert records[0].id == 42
+
+
+def test_pipe_sourcestep_struct_unpack_fields_intermediate():
+    chunks = [RECORDS[i:i + 13] for i in range(0, len(RECORDS), 13)]
+    records = Pipe(chunks).struct_unpack('<hxHd', fields='id status value').list()
+    assert [r._asdict() for r in records[:2]] == [
+        {'id': 0, 'status': 0, 'value': 0.0},
+        {'id': 1, 'status': 1, 'value': 0.5},
+    ]
+
+
+def test_pipe_sourcestep_struct_unpack_fields_bad():
+    with pytest.raises(ValueError):
+        Pipe.struct_unpack('<hxHd', RECORDS, fields='id status')
+    with pytest.raises(ValueError):
+        Pipe.struct_unpack('<hxHd', RECORDS, fields='id id value')
+    with pytest.raises(struct.error):
+        Pipe.struct_unpack('<hxHd', RECORDS[:-1], fields='id status value').list()
+    with pytest.raises(struct.error):
+        Pipe([RECORDS]).struct_unpack('<hxHd', fields='id status value').list()
+
+
+@pytest.mark.parametrize('chunk_size', [1, 5, 13, 26, 200])
+def test_pipe_sourcestep_struct_unpack_framed(chunk_size):
+    chunks = [RECORDS[i:i + chunk_size] for i in range(0, len(RECORDS), chunk_size)]
+    expected = list(struct.iter_unpack('<hxHd', RECORDS))
+    assert Pipe(chunks).struct_unpack('<hxHd', framed=True).list() == expected
+    records = Pipe(iter(chunks)).struct_unpack('<hxHd', fields='id status value', framed=True).list()
+    assert records == expected
+    assert [r.value for r in records] == [i / 2 for i in range(10)]
+
+
+def test_pipe_sourcestep_struct_unpack_framed_buffers():
+    chunks = [bytearray(b'MEO'), memoryview(b'WWOOF'), b'', array.array('B', b'MEOW')]
+    assert Pipe(chunks).struct_unpack('<i', framed=True).list() == [(1464812877,), (1179602775,), (1464812877,)]
+
+
+def test_pipe_sourcestep_struct_unpack_framed_partial():
+    p = Pipe([RECORDS[:7], RECORDS[7:-1]]).struct_unpack('<hxHd', framed=True)
+    with pytest.raises(struct.error):
+        p.list()
+    with pytest.raises(struct.error):
+        Pipe([b'abc']).struct_unpack('', framed=True).list()
+
+
 # Pipe.zip
 
 def test_pipe_sourcestep_zip_constructor():
@@ -725,6 +1170,49 @@ def test_pipe_step_chunk_sliding_window():
     assert list(p) == [('a', 'b', 'c'), ('e', 'x', 'x')]
 
 
+def test_pipe_step_chunk_overlapping_final():
+    p = Pipe('abcdef').chunk(4, step=2)
+    assert list(p) == [('a', 'b', 'c', 'd'), ('c', 'd', 'e', 'f'), ('e', 'f')]
+
+    p = Pipe('abcdef').chunk(5, step=2, fillvalue='x')
+    assert list(p) == [('a', 'b', 'c', 'd', 'e'), ('c', 'd', 'e', 'f', 'x')]
+
+    p = Pipe('abcdef').chunk(5, step=2, fair=True)
+    assert list(p) == [('a', 'b', 'c', 'd', 'e')]
+
+    p = Pipe('a').chunk(2, step=1)
+    assert list(p) == [('a',)]
+
+
+def test_pipe_step_chunk_container():
+    p = Pipe('abcde').chunk(2, container=list)
+    assert list(p) == [['a', 'b'], ['c', 'd'], ['e']]
+
+    p = Pipe('abcde').chunk(3, step=1, container=list)
+    assert list(p) == [['a', 'b', 'c'], ['b', 'c', 'd'], ['c', 'd', 'e']]
+
+    p = Pipe('abcde').chunk(2, container=list, fillvalue='x')
+    assert list(p) == [['a', 'b'], ['c', 'd'], ['e', 'x']]
+
+
+@pytest.mark.parametrize('step', [1, 2, 3])
+def test_pipe_step_chunk_typecode(step):
+    p = Pipe(range(5)).chunk(2, step=step, typecode='i', fillvalue=-1)
+    expected = Pipe(range(5)).chunk(2, step=step, fillvalue=-1).list()
+    result = p.list()
+    assert all(isinstance(chunk, array.array) and chunk.typecode == 'i' for chunk in result)
+    assert [tuple(chunk) for chunk in result] == expected
+
+
+def test_pipe_step_chunk_bad_container():
+    with pytest.raises(TypeError):
+        Pipe('abcde').chunk(2, container=list, typecode='i')
+    with pytest.raises(TypeError):
+        Pipe('abcde').chunk(2, container='list')
+    with pytest.raises(ValueError):
+        Pipe('abcde').chunk(2, typecode='?')
+
+
 # Pipe.chunkby
 
 def test_pipe_step_chunkby():
@@ -821,6 +1309,17 @@ def test_pipe_step_depeat_bad_key():
         list(Pipe('abbcccacbba').depeat(key=13))
 
 
+def test_pipe_step_depeat_equality():
+    a, b = [1], [1]
+    assert list(Pipe([a, b, [2]]).depeat()) == [[1], [2]]
+
+
+def test_pipe_step_depeat_reevaluated():
+    p = Pipe().depeat()
+    assert list(p('aab')) == ['a', 'b']
+    assert list(p('bba')) == ['b', 'a']
+
+
 # Pipe.dictmap
 
 def test_pipe_step_dictmap():
@@ -877,6 +1376,35 @@ def test_pipe_step_enumerate_info():
     assert repr(c_i) == '<EnumerateInfo index=2 is_first=False is_last=True>'
 
 
+# Pipe.external_sort
+
+def test_pipe_step_external_sort():
+    p = Pipe(iter([2, 4, 1, 5, 3])).external_sort(run_size=2)
+    assert list(p) == [1, 2, 3, 4, 5]
+
+
+def test_pipe_step_external_sort_key_reverse():
+    data = [(2, 'a'), (1, 'b'), (3, 'c'), (2, 'd'), (1, 'e'), (2, 'f')]
+    p = Pipe(data).external_sort(key=lambda x: x[0], reverse=True, run_size=2)
+    assert list(p) == sorted(data, key=lambda x: x[0], reverse=True)
+
+
+def test_pipe_step_external_sort_tempdir(tmp_path):
+    p = Pipe(range(10, 0, -1)).external_sort(run_size=3, tempdir=tmp_path)
+    assert list(p) == list(range(1, 11))
+
+
+def test_pipe_step_external_sort_take_topk():
+    p = Pipe(range(10, 0, -1)).external_sort(run_size=3).take(2)
+    assert p.explain() == ('sort-take-topk',)
+    assert list(p) == [1, 2]
+
+
+def test_pipe_step_external_sort_bad_run_size():
+    with pytest.raises(ValueError):
+        Pipe([]).external_sort(run_size=0)
+
+
 # Pipe.filter
 
 def test_pipe_step_filter():
@@ -913,6 +1441,56 @@ def test_pipe_step_intersperse_twice():
     assert list(p) == ['a', 'y', 'x', 'y', 'b', 'y', 'x', 'y', 'c', 'y', 'x', 'y', 'd', 'y', 'x', 'y', 'e']
 
 
+# Pipe.join
+
+USERS = [{'id': 1, 'name': 'ann'}, {'id': 2, 'name': 'bob'}, {'id': 4, 'name': 'cy'}]
+EVENTS = [{'user': 2, 'event': 'login'}, {'user': 3, 'event': 'login'}, {'user': 1, 'event': 'logout'}]
+
+
+def test_pipe_step_join_inner():
+    p = Pipe(iter(EVENTS)).join(USERS, left_key=X['user'], right_key=X['id'])
+    assert p.list() == [(EVENTS[0], USERS[1]), (EVENTS[2], USERS[0])]
+
+
+def test_pipe_step_join_combine():
+    p = Pipe(iter(EVENTS)).join(
+        USERS, left_key=X['user'], right_key=X['id'], how='left',
+        combine=lambda e, u: (u and u['name'], e['event']),
+    )
+    assert p.list() == [('bob', 'login'), (None, 'login'), ('ann', 'logout')]
+
+
+def test_pipe_step_join_outer():
+    p = Pipe(iter([1, 2])).join([2, 3], how='outer', fillvalue='-')
+    assert p.list() == [(1, '-'), (2, 2), ('-', 3)]
+
+
+def test_pipe_step_join_key():
+    p = Pipe(['apple', 'bob', 'cherry']).join(['avocado', 'cabbage'], key=X[0])
+    assert sorted(p) == [('apple', 'avocado'), ('cherry', 'cabbage')]
+
+
+@pytest.mark.parametrize('presorted', [False, True])
+def test_pipe_step_join_semi_anti(presorted):
+    assert Pipe([1, 2, 3, 4]).join([2, 4, 6], how='semi', presorted=presorted).list() == [2, 4]
+    assert Pipe([1, 2, 3, 4]).join([2, 4, 6], how='anti', presorted=presorted).list() == [1, 3]
+
+
+def test_pipe_step_join_presorted():
+    p = Pipe([1, 2, 2, 3]).join([2, 3, 3], how='outer', presorted=True)
+    assert p.list() == [(1, None), (2, 2), (2, 2), (3, 3), (3, 3)]
+    # An infinite source streams through a merge join.
+    p = Pipe.iterfunc(0, X + 1).join(range(0, 100, 10), presorted=True)
+    assert p.take(3).list() == [(0, 0), (10, 10), (20, 20)]
+
+
+def test_pipe_step_join_bad():
+    with pytest.raises(ValueError):
+        Pipe([1]).join([1], how='cross')
+    with pytest.raises(TypeError):
+        Pipe([1]).join([1], how='semi', combine=lambda a, b: a)
+
+
 # Pipe.label
 
 def test_pipe_step_label():
@@ -934,6 +1512,58 @@ def test_pipe_step_map_multilambda():
     assert list(p) == [2, 4, 6, 8, 10]
 
 
+# Pipe.nlargest
+
+def test_pipe_step_nlargest():
+    p = Pipe(iter([2, 4, 1, 5, 3])).nlargest(3)
+    assert list(p) == [5, 4, 3]
+
+
+def test_pipe_step_nlargest_key_stable():
+    data = [(2, 'a'), (1, 'b'), (3, 'c'), (2, 'd'), (3, 'e'), (2, 'f')]
+    p = Pipe(data).nlargest(4, key=lambda x: x[0])
+    assert list(p) == [(3, 'c'), (3, 'e'), (2, 'a'), (2, 'd')]
+    assert list(p) == Pipe(data).sort(key=lambda x: x[0], reverse=True).take(4).disable_rules().list()
+
+
+def test_pipe_step_nlargest_shear():
+    from seittik.shears import X
+    p = Pipe([{'n': 2}, {'n': 5}, {'n': 1}]).nlargest(2, key=X['n'])
+    assert list(p) == [{'n': 5}, {'n': 2}]
+
+
+def test_pipe_step_nlargest_multilambda():
+    p = Pipe(['bb', 'a', 'ccc'])
+    @p.nlargest(1, key=True)
+    def p(x):
+        return len(x)
+    assert list(p) == ['ccc']
+
+
+def test_pipe_step_nlargest_bad_n():
+    with pytest.raises(ValueError):
+        Pipe([]).nlargest(-1)
+
+
+# Pipe.nsmallest
+
+def test_pipe_step_nsmallest():
+    p = Pipe(iter([2, 4, 1, 5, 3])).nsmallest(3)
+    assert list(p) == [1, 2, 3]
+
+
+def test_pipe_step_nsmallest_key_stable():
+    data = [(2, 'a'), (1, 'b'), (3, 'c'), (2, 'd'), (1, 'e'), (2, 'f')]
+    p = Pipe(data).nsmallest(4, key=lambda x: x[0])
+    assert list(p) == [(1, 'b'), (1, 'e'), (2, 'a'), (2, 'd')]
+    assert list(p) == Pipe(data).sort(key=lambda x: x[0]).take(4).disable_rules().list()
+
+
+def test_pipe_step_nsmallest_more_than_source():
+    p = Pipe([2, 1]).nsmallest(5)
+    assert list(p) == [1, 2]
+
+
 # Pipe.peek
 
 def test_pipe_step_peek():
@@ -1090,6 +1720,91 @@ def test_pipe_step_remap_mapping_callables_bad_remap_value():
         list(p)
 
 
+# Pipe.rle
+
+def test_pipe_step_rle():
+    p = Pipe('abbcccacbba').rle()
+    assert list(p) == [('a', 1), ('b', 2), ('c', 3), ('a', 1), ('c', 1), ('b', 2), ('a', 1)]
+
+
+def test_pipe_step_rle_keyed():
+    p = Pipe('aAbBBa').rle(key=str.lower)
+    assert list(p) == [('a', 2), ('b', 3), ('a', 1)]
+
+
+def test_pipe_step_rle_multilambda():
+    p = Pipe('aAbBBa')
+    @p.rle(key=True)
+    def p(x):
+        return x.lower()
+    assert list(p) == [('a', 2), ('b', 3), ('a', 1)]
+
+
+def test_pipe_step_rle_empty():
+    assert list(Pipe([]).rle()) == []
+
+
+def test_pipe_step_rle_long_run():
+    p = Pipe.repeat(0, 100_000).append(1).rle()
+    assert list(p) == [(0, 100_000), (1, 1)]
+
+
+def test_pipe_step_rle_bad_key():
+    with pytest.raises(TypeError):
+        Pipe('abc').rle(key=13)
+
+
+# Pipe.rolling_*
+
+ROLLING_DATA = [3, 1, 4, 1, 5, 9, 2, 6, 5, 3, 5]
+
+
+def _rolling_naive(data, n, func):
+    return [func(data[i:i + n]) for i in range(len(data) - n + 1)]
+
+
+@pytest.mark.parametrize('n', [1, 2, 3, 11, 12])
+def test_pipe_step_rolling_max_min(n):
+    assert Pipe(ROLLING_DATA).rolling_max(n).list() == _rolling_naive(ROLLING_DATA, n, max)
+    assert Pipe(ROLLING_DATA).rolling_min(n).list() == _rolling_naive(ROLLING_DATA, n, min)
+
+
+@pytest.mark.parametrize('n', [1, 2, 3, 11, 12])
+def test_pipe_step_rolling_sum_mean(n):
+    assert Pipe(ROLLING_DATA).rolling_sum(n).list() == _rolling_naive(ROLLING_DATA, n, sum)
+    assert Pipe(ROLLING_DATA).rolling_mean(n).list() == pytest.approx(
+        _rolling_naive(ROLLING_DATA, n, lambda w: sum(w) / n)
+    )
+
+
+@pytest.mark.parametrize('n', [2, 3, 11])
+@pytest.mark.parametrize('sample', [False, True])
+def test_pipe_step_rolling_variance(n, sample):
+    func = statistics.variance if sample else statistics.pvariance
+    assert Pipe(ROLLING_DATA).rolling_variance(n, sample=sample).list() == pytest.approx(
+        _rolling_naive(ROLLING_DATA, n, func)
+    )
+
+
+def test_pipe_step_rolling_sum_no_drift():
+    rng = random.Random(0)
+    data = [rng.uniform(-1e6, 1e6) for _ in range(20_000)] + [0.1] * 100
+    assert Pipe(data).rolling_sum(100).list()[-1] == pytest.approx(10.0, rel=1e-9)
+
+
+def test_pipe_step_rolling_infinite():
+    assert Pipe.iterfunc(0, X + 1).rolling_sum(3).take(3).list() == [3, 6, 9]
+
+
+def test_pipe_step_rolling_bad():
+    with pytest.raises(ValueError):
+        Pipe([1]).rolling_sum(0)
+    with pytest.raises(TypeError):
+        Pipe([1]).rolling_max(1.5)
+    with pytest.raises(ValueError):
+        Pipe([1]).rolling_variance(1, sample=True)
+
+
 # Pipe.sample
 
 def test_pipe_step_sample_without_replacement(random_seed_0):
@@ -1238,6 +1953,100 @@ def test_pipe_step_unique_bad_key():
         list(Pipe('abbcccacbba').unique(key=13))
 
 
+def test_pipe_step_unique_reevaluated():
+    p = Pipe().unique()
+    assert list(p('abca')) == ['a', 'b', 'c']
+    assert list(p('abca')) == ['a', 'b', 'c']
+    p = Pipe('abbcccacbba').unique(key=str.upper)
+    assert list(p) == list(p) == ['a', 'b', 'c']
+
+
+def test_pipe_step_unique_hash_collision():
+    # hash(-1) == hash(-2) in CPython
+    assert list(Pipe([-1, -2, -1, -2]).unique()) == [-1, -2]
+    assert list(Pipe([-1, -2]).unique(key=lambda x: x)) == [-1, -2]
+
+
+def test_pipe_step_unique_window():
+    p = Pipe('abbcccacbba').unique(window=2)
+    assert list(p) == ['a', 'b', 'c', 'a', 'b', 'a']
+    assert list(p) == ['a', 'b', 'c', 'a', 'b', 'a']
+
+
+def test_pipe_step_unique_window_keyed():
+    p = Pipe('aAbBcCAa').unique(key=str.upper, window=2)
+    assert list(p) == ['a', 'b', 'c', 'A']
+
+
+def test_pipe_step_unique_window_bad():
+    with pytest.raises(TypeError):
+        Pipe('abc').unique(window=1.5)
+    with pytest.raises(ValueError):
+        Pipe('abc').unique(window=0)
+
+
+def test_pipe_step_unique_approx():
+    p = Pipe('abbcccacbba').unique(approx=True, capacity=100)
+    assert list(p) == list(p) == ['a', 'b', 'c']
+
+
+def test_pipe_step_unique_approx_hash_collisions():
+    p = Pipe([-1, -2, 5]).unique(approx=True, capacity=1000)
+    assert list(p) == [-1, -2, 5]
+
+
+def test_pipe_step_unique_approx_keyed():
+    p = Pipe('abBCcCAcbBA').unique(key=str.upper, approx=True, capacity=100)
+    assert list(p) == ['a', 'b', 'C']
+
+
+def test_pipe_step_unique_approx_no_duplicates():
+    res = list(Pipe.randrange(1000, rng=1).take(10_000).unique(approx=True, capacity=1000))
+    assert len(res) == len(set(res))
+    # Allow generously for false positives
+    assert len(res) > 950
+
+
+def test_pipe_step_unique_approx_bad():
+    with pytest.raises(TypeError):
+        Pipe('abc').unique(approx=True)
+    with pytest.raises(ValueError):
+        Pipe('abc').unique(approx=True, capacity=0)
+    with pytest.raises(ValueError):
+        Pipe('abc').unique(approx=True, capacity=10, error_rate=1)
+    with pytest.raises(TypeError):
+        Pipe('abc').unique(approx=True, capacity=10, window=5)
+
+
+# Pipe.window
+
+@pytest.mark.parametrize('n', [1, 2, 3, 5])
+@pytest.mark.parametrize('step', [1, 2, 3, 7])
+def test_pipe_step_window(n, step):
+    data = list(range(20))
+    expected = [tuple(data[i:i + n]) for i in range(0, len(data) - n + 1, step)]
+    assert Pipe(data).window(n, step=step).map(tuple).list() == expected
+
+
+def test_pipe_step_window_views():
+    windows = []
+    for window in Pipe('abcd').window(3):
+        assert len(window) == 3
+        windows.append((window[0], window[-1], window[1:]))
+    assert windows == [('a', 'c', ['b', 'c']), ('b', 'd', ['c', 'd'])]
+
+
+def test_pipe_step_window_short():
+    assert Pipe('ab').window(3).list() == []
+
+
+def test_pipe_step_window_bad():
+    with pytest.raises(ValueError):
+        Pipe('ab').window(0)
+    with pytest.raises(ValueError):
+        Pipe('ab').window(2, step=0)
+
+
 ########################################################################
 # Sinks: Containers
 
@@ -1316,6 +2125,76 @@ def test_pipe_sink_tuple():
 ########################################################################
 # Sinks: Misc
 
+# Pipe.aggregate
+
+def test_pipe_sink_aggregate():
+    p = Pipe(iter([3, 1, 4, 1, 5, 9, 2, 6]))
+    assert p.aggregate(n='count', total='sum', lo='min', hi='max', avg='mean') == {
+        'n': 8, 'total': 31, 'lo': 1, 'hi': 9, 'avg': 3.875,
+    }
+
+
+def test_pipe_sink_aggregate_all_builtins():
+    result = Pipe([4, 6, 6, 6, 7, 7, 9, 11]).aggregate(
+        var='variance', sd='stdev', first='first', last='last', items='list', distinct='set',
+    )
+    assert result == {
+        'var': 4, 'sd': 2, 'first': 4, 'last': 11,
+        'items': [4, 6, 6, 6, 7, 7, 9, 11], 'distinct': {4, 6, 7, 9, 11},
+    }
+
+
+def test_pipe_sink_aggregate_empty():
+    result = Pipe([]).aggregate(n='count', total='sum', lo='min', avg='mean', sd='stdev', first='first')
+    assert result == {'n': 0, 'total': 0, 'lo': None, 'avg': None, 'sd': None, 'first': None}
+
+
+def test_pipe_sink_aggregate_key():
+    orders = [{'qty': 2, 'price': 5}, {'qty': 1, 'price': 12}, {'qty': 4, 'price': 3}]
+    result = Pipe(orders).aggregate(units=('sum', X['qty']), dearest=('max', X['price']), n='count')
+    assert result == {'units': 7, 'dearest': 12, 'n': 3}
+
+
+def test_pipe_sink_aggregate_custom():
+    product = (lambda: 1, lambda state, item: state * item, None)
+    longest = (lambda: '', lambda state, item: max(state, item, key=len), str.upper)
+    result = Pipe(['a', 'bbb', 'cc']).aggregate(
+        product=(product, len), longest=longest,
+    )
+    assert result == {'product': 6, 'longest': 'BBB'}
+
+
+def test_pipe_sink_aggregate_single_pass():
+    calls = []
+    def source():
+        calls.append(1)
+        yield from [1, 2, 3]
+    assert Pipe(source()).aggregate(total='sum', hi='max') == {'total': 6, 'hi': 3}
+    assert calls == [1]
+
+
+def test_pipe_sink_aggregate_partial():
+    a = Pipe([3, 1, 4]).aggregate(n='count', hi='max', avg='mean', sd='stdev', partial=True)
+    b = Pipe([1, 5, 9, 2, 6]).aggregate(n='count', hi='max', avg='mean', sd='stdev', partial=True)
+    whole = Pipe([3, 1, 4, 1, 5, 9, 2, 6]).aggregate(n='count', hi='max', avg='mean', sd='stdev')
+    result = (a | b).result()
+    assert result == {**whole, 'sd': pytest.approx(whole['sd'])}
+
+
+def test_pipe_sink_aggregate_partial_classmethod():
+    agg = Pipe.aggregate(n='count', total='sum')
+    assert agg([1, 2, 3]) == {'n': 3, 'total': 6}
+
+
+def test_pipe_sink_aggregate_bad():
+    with pytest.raises(TypeError):
+        Pipe([1]).aggregate()
+    with pytest.raises(ValueError):
+        Pipe([1]).aggregate(x='median')
+    with pytest.raises(TypeError):
+        Pipe([1]).aggregate(x=42)
+
+
 # Pipe.all
 
 def test_pipe_sink_all_simple_true():
@@ -1406,6 +2285,41 @@ def test_pipe_sink_count_empty():
     assert p.count() == 0
 
 
+# Pipe.count_distinct
+
+def test_pipe_sink_count_distinct():
+    assert Pipe('abbcccacbba').count_distinct() == 3
+    assert Pipe(iter('abbcccacbba')).count_distinct() == 3
+    assert Pipe({1, 2, 3}).count_distinct() == 3
+    assert Pipe([]).count_distinct() == 0
+
+
+def test_pipe_sink_count_distinct_approx():
+    n = Pipe.range(20_000).map(str).cycle(3).count_distinct(approx=True)
+    assert abs(n - 20_000) < 20_000 * 0.03
+
+
+def test_pipe_sink_count_distinct_approx_small():
+    assert Pipe('abbcccacbba').count_distinct(approx=True) == 3
+    assert Pipe([]).count_distinct(approx=True) == 0
+
+
+def test_pipe_sink_count_distinct_approx_sketch():
+    a = Pipe.rangetil(0, 6_000).count_distinct(approx=True, precision=12, sketch=True)
+    b = Pipe.rangetil(4_000, 10_000).count_distinct(approx=True, precision=12, sketch=True)
+    assert abs(len(a | b) - 10_000) < 10_000 * 0.05
+    assert len(a) < len(a | b)
+
+
+def test_pipe_sink_count_distinct_bad_args():
+    with pytest.raises(TypeError):
+        Pipe('abc').count_distinct(sketch=True)
+    with pytest.raises(ValueError):
+        Pipe('abc').count_distinct(approx=True, precision=3)
+    with pytest.raises(TypeError):
+        Pipe('abc').count_distinct(approx=True, precision=12.0)
+
+
 # Pipe.equal
 
 def test_pipe_sink_equal_true():
@@ -1480,6 +2394,103 @@ def test_pipe_sink_frequencies():
     assert p.frequencies() == Counter({'a': 5, 'b': 4, 'c': 2, 'd': 1, 'e': 1})
 
 
+def test_pipe_sink_frequencies_top():
+    p = Pipe(iter('abaabcdbbacea'))
+    assert p.frequencies(top=2) == [('a', 5), ('b', 4)]
+
+
+def test_pipe_sink_frequencies_approx():
+    p = Pipe('abaabcdbbacea')
+    assert p.frequencies(top=2, approx=True) == [('a', 5), ('b', 4)]
+    assert len(p.frequencies(approx=True, capacity=2)) == 2
+
+
+def test_pipe_sink_frequencies_approx_heavy_hitters():
+    rng = random.Random(0)
+    data = [f'noise{rng.randrange(100_000)}' for _ in range(20_000)]
+    data += ['x'] * 900 + ['y'] * 600 + ['z'] * 300
+    rng.shuffle(data)
+    n = len(data)
+    result = Pipe(data).frequencies(top=3, approx=True, capacity=100)
+    assert [item for item, _ in result] == ['x', 'y', 'z']
+    for (item, count), true_count in zip(result, (900, 600, 300)):
+        assert true_count <= count <= true_count + n / 100
+
+
+def test_pipe_sink_frequencies_approx_sketch():
+    a = Pipe('aaab').frequencies(approx=True, capacity=2, sketch=True)
+    b = Pipe('bbbc').frequencies(approx=True, capacity=2, sketch=True)
+    merged = a | b
+    assert merged.total == 8
+    assert merged['b'] == 4
+    # 'a' may have been among the untracked items of the second pipe
+    assert merged['a'] == 4
+    assert merged.error('a') == 1
+
+
+def test_pipe_sink_frequencies_max_keys():
+    rng = random.Random(0)
+    data = [rng.randrange(1000) for _ in range(20_000)]
+    expected = collections.Counter(data)
+    result = Pipe(data).frequencies(max_keys=10)
+    assert isinstance(result, collections.Counter)
+    assert result == expected
+    assert [n for _, n in Pipe(data).frequencies(top=5, max_keys=10)] == [n for _, n in expected.most_common(5)]
+
+
+def test_pipe_sink_frequencies_stream():
+    assert list(Pipe('abaca').frequencies(stream=True)) == [('a', 3), ('b', 1), ('c', 1)]
+    rng = random.Random(0)
+    data = [rng.randrange(1000) for _ in range(20_000)]
+    assert dict(Pipe(data).frequencies(max_keys=10, stream=True)) == collections.Counter(data)
+
+
+def test_pipe_sink_frequencies_bad_args():
+    with pytest.raises(TypeError):
+        Pipe('abc').frequencies(approx=True)
+    with pytest.raises(TypeError):
+        Pipe('abc').frequencies(capacity=10)
+    with pytest.raises(TypeError):
+        Pipe('abc').frequencies(top=1, sketch=True)
+    with pytest.raises(ValueError):
+        Pipe('abc').frequencies(top=0)
+    with pytest.raises(ValueError):
+        Pipe('abc').frequencies(approx=True, capacity=0)
+    with pytest.raises(ValueError):
+        Pipe('abc').frequencies(max_keys=0)
+    with pytest.raises(TypeError):
+        Pipe('abc').frequencies(approx=True, top=1, max_keys=10)
+    with pytest.raises(TypeError):
+        Pipe('abc').frequencies(approx=True, top=1, stream=True)
+    with pytest.raises(TypeError):
+        Pipe('abc').frequencies(top=1, stream=True)
+
+
+# Pipe.group_aggregate
+
+def test_pipe_sink_group_aggregate():
+    sales = [
+        {'region': 'east', 'amount': 10},
+        {'region': 'west', 'amount': 5},
+        {'region': 'east', 'amount': 7},
+    ]
+    assert Pipe(sales).group_aggregate(
+        X['region'], n='count', total=('sum', X['amount']), top=('max', X['amount']),
+    ) == {
+        'east': {'n': 2, 'total': 17, 'top': 10},
+        'west': {'n': 1, 'total': 5, 'top': 5},
+    }
+
+
+def test_pipe_sink_group_aggregate_key_name():
+    # The key is positional-only, so `key` is free as an aggregate name.
+    assert Pipe([1, 2, 3]).group_aggregate(X % 2, key='max') == {1: {'key': 3}, 0: {'key': 2}}
+
+
+def test_pipe_sink_group_aggregate_partial():
+    assert Pipe.group_aggregate(X % 2, n='count')([1, 2, 3]) == {1: {'n': 2}, 0: {'n': 1}}
+
+
 # Pipe.groupby
 
 def test_pipe_sink_groupby_evens_odds():
@@ -1487,6 +2498,71 @@ def test_pipe_sink_groupby_evens_odds():
     assert p.groupby(lambda x: 'even' if x % 2 == 0 else 'odd') == {'odd': [1, 3, 5, 7, 9], 'even': [2, 4, 6, 8, 10]}
 
 
+def test_pipe_sink_groupby_agg_single():
+    p = Pipe([1, 2, 3, 4, 5, 6, 7, 8, 9, 10])
+    assert p.groupby(X % 2, agg='sum') == {1: 25, 0: 30}
+    assert p.groupby(X % 2, agg=('max', -X)) == {1: -1, 0: -2}
+
+
+def test_pipe_sink_groupby_agg_mapping():
+    p = Pipe([1, 2, 3, 4, 5, 6, 7, 8, 9, 10])
+    assert p.groupby(X % 3, agg={'n': 'count', 'hi': 'max', 'squares': ('sum', X * X)}) == {
+        1: {'n': 4, 'hi': 10, 'squares': 166},
+        2: {'n': 3, 'hi': 8, 'squares': 93},
+        0: {'n': 3, 'hi': 9, 'squares': 126},
+    }
+
+
+def test_pipe_sink_groupby_agg_streams():
+    # Groups are aggregated as items arrive, without collecting them.
+    p = Pipe(iter(range(100_000)))
+    assert p.groupby(X % 4, agg='count') == {0: 25_000, 1: 25_000, 2: 25_000, 3: 25_000}
+
+
+def test_pipe_sink_groupby_agg_empty():
+    assert Pipe([]).groupby(X % 2, agg={'n': 'count'}) == {}
+
+
+def test_pipe_sink_groupby_agg_bad():
+    with pytest.raises(ValueError):
+        Pipe([1]).groupby(X % 2, agg='nope')
+
+
+def test_pipe_sink_groupby_max_keys():
+    data = list(range(10_000))
+    groups = Pipe(data).groupby(X % 97, max_keys=5)
+    assert groups == {k: list(range(k, 10_000, 97)) for k in range(97)}
+
+
+def test_pipe_sink_groupby_max_keys_agg():
+    rng = random.Random(0)
+    data = [rng.randrange(1000) for _ in range(20_000)]
+    agg = {'n': 'count', 'total': 'sum', 'lo': 'min', 'first': 'first', 'last': 'last', 'seen': 'set'}
+    assert Pipe(data).groupby(X % 300, agg=agg, max_keys=10) == Pipe(data).groupby(X % 300, agg=agg)
+    means = Pipe(data).groupby(X % 300, agg='mean', max_keys=10)
+    assert means == pytest.approx(Pipe(data).groupby(X % 300, agg='mean'))
+
+
+def test_pipe_sink_groupby_stream():
+    p = Pipe(range(10_000))
+    result = p.groupby(X % 5, agg='count', stream=True)
+    assert not isinstance(result, dict)
+    assert list(result) == [(0, 2000), (1, 2000), (2, 2000), (3, 2000), (4, 2000)]
+    result = p.groupby(X % 5, agg='count', max_keys=2, stream=True)
+    assert sorted(result) == [(0, 2000), (1, 2000), (2, 2000), (3, 2000), (4, 2000)]
+
+
+def test_pipe_sink_groupby_tempdir(tmp_path):
+    assert Pipe(range(5000)).groupby(X % 50, agg='count', max_keys=3, tempdir=tmp_path) == dict.fromkeys(range(50), 100)
+
+
+def test_pipe_sink_groupby_max_keys_bad():
+    with pytest.raises(ValueError):
+        Pipe([1]).groupby(X % 2, max_keys=0)
+    with pytest.raises(TypeError):
+        Pipe([1]).groupby(X % 2, agg=(list, list.append, len), max_keys=10)
+
+
 # Pipe.identical
 
 def test_pipe_sink_identical_true():
@@ -1551,6 +2627,40 @@ def test_pipe_sink_mean_empty_default():
     assert p.mean(default='meow') == 'meow'
 
 
+def test_pipe_sink_mean_iterator():
+    assert Pipe(iter([1, 2, 3, 5, 8])).mean() == 3.8
+
+
+def test_pipe_sink_mean_decimal():
+    from decimal import Decimal
+    assert Pipe(iter([Decimal('0.1'), Decimal('0.2')])).mean() == Decimal('0.15')
+
+
+def test_pipe_sink_mean_exact():
+    from fractions import Fraction
+    assert Pipe([1, 2, 3, 5, 8]).mean(precision='exact') == 3.8
+    assert Pipe([Fraction(1, 3), Fraction(2, 3)]).mean(precision='exact') == Fraction(1, 2)
+
+
+def test_pipe_sink_mean_empty_iterator():
+    import statistics
+    with pytest.raises(statistics.StatisticsError):
+        Pipe(iter([])).mean()
+    assert Pipe(iter([])).mean(default='meow') == 'meow'
+    assert Pipe([]).mean(default='meow', precision='exact') == 'meow'
+
+
+def test_pipe_sink_mean_fsum():
+    assert Pipe(iter([0.1] * 10)).mean(precision='fsum') == 0.1
+    assert Pipe([1, 2, 3, 5, 8]).mean(precision='fsum') == 3.8
+    assert Pipe([]).mean(precision='fsum', default='meow') == 'meow'
+
+
+def test_pipe_sink_mean_bad_precision():
+    with pytest.raises(ValueError):
+        Pipe([1]).mean(precision='sloppy')
+
+
 # Pipe.median
 
 def test_pipe_sink_median_odd():
@@ -1574,6 +2684,26 @@ def test_pipe_sink_median_empty_default():
     assert p.median(default='meow') == 'meow'
 
 
+def test_pipe_sink_median_approx():
+    p = Pipe.range(100_000).map(lambda x: (x * 7919) % 100_000).median(approx=True)
+    assert abs(p - 50_000) < 100_000 * 0.02
+
+
+def test_pipe_sink_median_approx_small():
+    assert Pipe([1, 2, 3, 5, 8]).median(approx=True) == 3
+
+
+def test_pipe_sink_median_approx_empty():
+    import statistics
+    with pytest.raises(statistics.StatisticsError):
+        Pipe([]).median(approx=True)
+    assert Pipe([]).median(approx=True, default='meow') == 'meow'
+
+
+def test_pipe_sink_median_approx_partial():
+    assert Pipe().median(approx=True)([1, 2, 3, 5, 8]) == 3
+
+
 # Pipe.merge
 
 def test_pipe_merge():
@@ -1625,6 +2755,11 @@ def test_pipe_sink_minmax_empty():
         Pipe([]).minmax()
 
 
+def test_pipe_sink_minmax_ix_first_ties():
+    p = Pipe(iter(['bb', 'a', 'cc', 'd', 'ee']))
+    assert p.minmax(key=len) == ('a', 'bb')
+
+
 # Pipe.mode
 
 def test_pipe_sink_mode_single():
@@ -1712,6 +2847,58 @@ def test_pipe_sink_struct_pack_empty():
     assert p.struct_pack('') == b''
 
 
+def test_pipe_sink_struct_pack_mixed():
+    p = Pipe([1, b'ab', 2.5, 2, b'cd', -1.0])
+    expected = struct.pack('<h2sd', 1, b'ab', 2.5) + struct.pack('<h2sd', 2, b'cd', -1.0)
+    assert p.struct_pack('<h2sd') == expected
+
+
+def test_pipe_sink_struct_pack_homogeneous():
+    values = list(range(-1000, 1000, 7))
+    for format_ in ('<i', '>i', '!3q', '=H', '>d', '@l'):
+        if format_ == '=H':
+            items = [abs(v) for v in values[:len(values) // 3 * 3]]
+        elif format_ == '>d':
+            items = [v / 3 for v in values]
+        else:
+            items = values[:len(values) // 3 * 3]
+        st = struct.Struct(format_)
+        n = int(format_[1]) if format_[1].isdigit() else 1
+        expected = b''.join(st.pack(*items[i:i + n]) for i in range(0, len(items), n))
+        assert Pipe(items).struct_pack(format_) == expected
+
+
+def test_pipe_sink_struct_pack_array():
+    arr = array.array('i', [1, 2, 3])
+    assert Pipe(arr).struct_pack('>i') == b'\x00\x00\x00\x01\x00\x00\x00\x02\x00\x00\x00\x03'
+    assert arr.tolist() == [1, 2, 3]
+
+
+def test_pipe_sink_struct_pack_errors():
+    with pytest.raises(struct.error):
+        Pipe([1, 2, 3]).struct_pack('<2i')
+    with pytest.raises(struct.error):
+        Pipe([1, 2**40]).struct_pack('<i')
+    with pytest.raises(struct.error):
+        Pipe([1, 1.5]).struct_pack('<i')
+    with pytest.raises(struct.error):
+        Pipe([1, b'ab', 2]).struct_pack('<h2s')
+    with pytest.raises(OverflowError):
+        Pipe([1e40]).struct_pack('<f')
+
+
+def test_pipe_sink_struct_pack_file(tmp_path):
+    items = [v for i in range(5000) for v in (i, f'{i:04}'.encode())]
+    expected = Pipe(items).struct_pack('<i4s')
+    path = tmp_path / 'records'
+    with path.open('wb') as f:
+        assert Pipe(items).struct_pack('<i4s', file=f) == len(expected) == 40000
+    assert path.read_bytes() == expected
+    with path.open('wb') as f:
+        assert Pipe(range(10)).struct_pack('<q', file=f) == 80
+    assert path.read_bytes() == struct.pack('<10q', *range(10))
+
+
 # Pipe.partition
 
 def test_pipe_sink_partition_simple():
@@ -1731,6 +2918,80 @@ def test_pipe_sink_product():
     assert p.product() == 120
 
 
+# Pipe.quantiles
+
+def test_pipe_sink_quantiles():
+    p = Pipe([1, 2, 3, 5, 8, 13])
+    assert p.quantiles([0, 0.5, 0.9, 1]) == [1, 4.0, 10.5, 13]
+
+
+@pytest.mark.parametrize('data', [
+    [3, 1, 4, 1, 5, 9, 2, 6, 5, 3, 5],
+    list(range(1000)),
+    [random.Random(n).random() for n in range(1001)],
+])
+def test_pipe_sink_quantiles_matches_statistics(data):
+    import statistics
+    expected = statistics.quantiles(data, n=10, method='inclusive')
+    actual = Pipe(iter(data)).quantiles([i / 10 for i in range(1, 10)])
+    assert actual == pytest.approx(expected)
+
+
+def test_pipe_sink_quantiles_non_numeric():
+    assert Pipe('edcba').quantiles([0, 0.5, 1]) == ['a', 'c', 'e']
+
+
+def test_pipe_sink_quantiles_empty():
+    import statistics
+    with pytest.raises(statistics.StatisticsError):
+        Pipe([]).quantiles([0.5])
+    assert Pipe([]).quantiles([0.5], default='meow') == 'meow'
+
+
+def test_pipe_sink_quantiles_approx():
+    data = Pipe.range(100_000).map(lambda x: (x * 7919) % 100_000).list()
+    p50, p95, p99 = Pipe(data).quantiles([0.5, 0.95, 0.99], approx=True)
+    assert abs(p50 - 50_000) < 2_000
+    assert abs(p95 - 95_000) < 2_000
+    assert abs(p99 - 99_000) < 1_000
+
+
+def test_pipe_sink_quantiles_approx_seeded():
+    def p():
+        return Pipe.range(100_000).seed_rng(1)
+    assert p().quantiles([0.5], approx=True, k=16) == p().quantiles([0.5], approx=True, k=16)
+
+
+def test_pipe_sink_quantiles_approx_empty():
+    import statistics
+    with pytest.raises(statistics.StatisticsError):
+        Pipe([]).quantiles([0.5], approx=True)
+    assert Pipe([]).quantiles([0.5], approx=True, default='meow') == 'meow'
+
+
+def test_pipe_sink_quantiles_approx_sketch():
+    a = Pipe.rangetil(0, 50_000).quantiles(approx=True, sketch=True)
+    b = Pipe.rangetil(50_000, 100_000).quantiles(approx=True, sketch=True)
+    merged = a | b
+    assert len(merged) == 100_000
+    assert abs(merged.quantile(0.5) - 50_000) < 2_000
+
+
+def test_pipe_sink_quantiles_bad_args():
+    with pytest.raises(TypeError):
+        Pipe([1]).quantiles()
+    with pytest.raises(ValueError):
+        Pipe([1]).quantiles([1.5])
+    with pytest.raises(TypeError):
+        Pipe([1]).quantiles(['0.5'])
+    with pytest.raises(TypeError):
+        Pipe([1]).quantiles(sketch=True)
+    with pytest.raises(TypeError):
+        Pipe([1]).quantiles([0.5], approx=True, sketch=True)
+    with pytest.raises(ValueError):
+        Pipe([1]).quantiles([0.5], approx=True, k=4)
+
+
 # Pipe.shuffle
 
 def test_pipe_step_shuffle(random_seed_0):
@@ -1738,6 +2999,29 @@ def test_pipe_step_shuffle(random_seed_0):
     assert list(p.shuffle()) == ['e', 'c', 'b', 'a', 'f', 'd']
 
 
+# Pipe.stats
+
+def test_pipe_sink_stats():
+    stats = Pipe(iter([4, 6, 6, 6, 7, 7, 9, 11])).stats()
+    assert stats.count == 8
+    assert stats.mean == 7
+    assert stats.variance() == 4
+    assert stats.stdev() == 2
+
+
+def test_pipe_sink_stats_merge():
+    a = Pipe([4, 6, 6, 6]).stats()
+    b = Pipe([7, 7, 9, 11]).stats()
+    ab = a | b
+    assert ab.count == 8
+    assert ab.mean == 7
+    assert ab.variance(sample=True) == pytest.approx(4.571428571428571)
+
+
+def test_pipe_sink_stats_empty():
+    assert Pipe([]).stats().count == 0
+
+
 # Pipe.stdev
 
 def test_pipe_sink_stdev_population():
@@ -1750,6 +3034,48 @@ def test_pipe_sink_stdev_sample():
     assert p.stdev(sample=True) == pytest.approx(2.138089935299395)
 
 
+def test_pipe_sink_stdev_iterator():
+    p = Pipe(iter([4, 6, 6, 6, 7, 7, 9, 11]))
+    assert p.stdev() == 2
+
+
+def test_pipe_sink_stdev_mean():
+    p = Pipe([4, 6, 6, 6, 7, 7, 9, 11])
+    assert p.stdev(mean=7) == 2
+    assert p.stdev(sample=True, mean=7) == pytest.approx(2.138089935299395)
+
+
+def test_pipe_sink_stdev_exact():
+    p = Pipe([4, 6, 6, 6, 7, 7, 9, 11])
+    assert p.stdev(precision='exact') == 2
+    assert p.stdev(sample=True, precision='exact') == pytest.approx(2.138089935299395)
+
+
+def test_pipe_sink_stdev_fsum():
+    p = Pipe([4, 6, 6, 6, 7, 7, 9, 11])
+    assert p.stdev(precision='fsum') == 2
+    assert p.stdev(sample=True, precision='fsum') == pytest.approx(2.138089935299395)
+
+
+def test_pipe_sink_stdev_decimal():
+    p = Pipe([Decimal(1), Decimal(2), Decimal(4)])
+    assert p.stdev() == statistics.pstdev([Decimal(1), Decimal(2), Decimal(4)])
+    assert p.stdev(sample=True) == statistics.stdev([Decimal(1), Decimal(2), Decimal(4)])
+    assert isinstance(p.stdev(), Decimal)
+    assert p.stdev(mean=Decimal(2)) == (Decimal(5) / 3).sqrt()
+
+
+def test_pipe_sink_stdev_fraction():
+    p = Pipe([Fraction(1), Fraction(2), Fraction(4)])
+    assert p.stdev() == pytest.approx(statistics.pstdev([Fraction(1), Fraction(2), Fraction(4)]))
+    assert p.stdev(sample=True) == pytest.approx(statistics.stdev([Fraction(1), Fraction(2), Fraction(4)]))
+
+
+def test_pipe_sink_stdev_bad_precision():
+    with pytest.raises(ValueError):
+        Pipe([1]).stdev(precision='sloppy')
+
+
 # Pipe.sum
 
 def test_pipe_sink_sum():
@@ -1757,6 +3083,180 @@ def test_pipe_sink_sum():
     assert p.sum() == 15
 
 
+@pytest.mark.parametrize('precision, expected', [
+    ('fast', 0.9999999999999999),
+    ('fsum', 1.0),
+    ('exact', 1.0),
+])
+def test_pipe_sink_sum_precision(precision, expected):
+    assert Pipe(iter([0.1] * 10)).sum(precision=precision) == expected
+
+
+def test_pipe_sink_sum_exact_types():
+    assert Pipe([Fraction(1, 3), Fraction(2, 3)]).sum(precision='exact') == 1
+    assert Pipe([2**60, 1]).sum(precision='exact') == 2**60 + 1
+    assert Pipe([2**60, 1]).sum(precision='fsum') == 2.0**60
+
+
+def test_pipe_sink_sum_bad_precision():
+    with pytest.raises(ValueError):
+        Pipe([1]).sum(precision='sloppy')
+
+
+# Pipe.to_file
+
+def test_pipe_sink_to_file(tmp_path):
+    path = tmp_path / 'out.bin'
+    items = [bytes([i % 256]) * (i % 10) for i in range(1000)]
+    assert Pipe(items).to_file(path) == (1000, sum(map(len, items)))
+    assert path.read_bytes() == b''.join(items)
+    assert Pipe([bytearray(b'ab'), memoryview(b'cd')]).to_file(path, buffer_size=1) == (2, 4)
+    assert path.read_bytes() == b'abcd'
+
+
+def test_pipe_sink_to_file_object():
+    f = io.BytesIO()
+    assert Pipe([b'MEOW', b'WOOF']).to_file(f) == (2, 8)
+    assert Pipe([b'BAA']).to_file(f, compression='gzip') == (1, 3)
+    assert not f.closed
+    assert f.getvalue()[:8] == b'MEOWWOOF'
+    assert gzip.decompress(f.getvalue()[8:]) == b'BAA'
+
+
+@pytest.mark.parametrize(('suffix', 'decompress'), [
+    ('.gz', gzip.decompress), ('.bz2', bz2.decompress), ('.xz', lzma.decompress),
+])
+def test_pipe_sink_to_file_compression(tmp_path, suffix, decompress):
+    path = tmp_path / f'out{suffix}'
+    items = [str(i).encode() for i in range(10000)]
+    assert Pipe(items).to_file(path) == (10000, sum(map(len, items)))
+    assert decompress(path.read_bytes()) == b''.join(items)
+    assert Pipe(items).to_file(path, compression=None)
+    assert path.read_bytes() == b''.join(items)
+
+
+def test_pipe_sink_to_file_atomic(tmp_path):
+    path = tmp_path / 'out.bin'
+    path.write_bytes(b'old')
+    def items():
+        yield b'new'
+        raise RuntimeError
+    with pytest.raises(RuntimeError):
+        Pipe(items()).to_file(path, atomic=True, buffer_size=1)
+    assert path.read_bytes() == b'old'
+    assert list(tmp_path.iterdir()) == [path]
+    assert Pipe([b'new']).to_file(path, atomic=True) == (1, 3)
+    assert path.read_bytes() == b'new'
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_pipe_sink_to_file_bad(tmp_path):
+    with pytest.raises(TypeError):
+        Pipe([b'a']).to_file(io.BytesIO(), atomic=True)
+    with pytest.raises(ValueError):
+        Pipe([b'a']).to_file(tmp_path / 'out', compression='zip')
+    with pytest.raises(ValueError):
+        Pipe([b'a']).to_file(tmp_path / 'out', buffer_size=0)
+    with pytest.raises(TypeError):
+        Pipe(['a']).to_file(tmp_path / 'out')
+
+
+# Pipe.to_lines
+
+def test_pipe_sink_to_lines(tmp_path):
+    path = tmp_path / 'out.txt'
+    assert Pipe(LOG_LINES).to_lines(path) == (500, sum(len(line) + 1 for line in LOG_LINES))
+    assert path.read_text() == ''.join(f'{line}\n' for line in LOG_LINES)
+    assert Pipe.lines(path).list() == LOG_LINES
+    assert Pipe(['caf\xe9', '']).to_lines(path, newline='\r\n', encoding='latin-1') == (2, 8)
+    assert path.read_bytes() == b'caf\xe9\r\n\r\n'
+
+
+def test_pipe_sink_to_lines_roundtrip_compressed(tmp_path):
+    path = tmp_path / 'out.log.gz'
+    lines = [f'line {i}' for i in range(5000)]
+    assert Pipe(lines).to_lines(path, atomic=True, buffer_size=100) == (5000, sum(len(line) + 1 for line in lines))
+    assert Pipe.lines(path).list() == lines
+
+
+def test_pipe_sink_to_lines_gzip_object(tmp_path):
+    path = tmp_path / 'out.log.gz'
+    with gzip.open(path, 'wb') as f:
+        assert Pipe(['meow', 'woof']).to_lines(f) == (2, 10)
+        assert Pipe([b'baa\n']).to_file(f) == (1, 4)
+    assert Pipe.lines(path).list() == ['meow', 'woof', 'baa']
+    assert gzip.decompress(path.read_bytes()) == b'meow\nwoof\nbaa\n'
+
+
+def test_pipe_sink_to_lines_partial(tmp_path):
+    path = tmp_path / 'out.txt'
+    write = Pipe().map(str).to_lines(path)
+    assert write(range(3)) == (3, 6)
+    assert path.read_text() == '0\n1\n2\n'
+
+
+# Pipe.to_partitions
+
+def test_pipe_sink_to_partitions(tmp_path):
+    lines = [f'{i % 7} {i}' for i in range(1000)]
+    counts = Pipe(lines).to_partitions(lambda line: int(line.split()[0]), tmp_path / 'part-{key}.txt')
+    assert counts == {k: len(range(k, 1000, 7)) for k in range(7)}
+    assert list(counts) == list(range(7))
+    for k in range(7):
+        assert Pipe.lines(tmp_path / f'part-{k}.txt').list() == [line for line in lines if line.startswith(f'{k} ')]
+
+
+def test_pipe_sink_to_partitions_max_open(tmp_path, monkeypatch):
+    open_count = 0
+    max_seen = 0
+    live = set()
+    def tracking_open(*args, **kwargs):
+        nonlocal open_count, max_seen
+        f = io.open(*args, **kwargs)
+        open_count += 1
+        live.add(f)
+        max_seen = max(max_seen, sum(not g.closed for g in live))
+        return f
+    monkeypatch.setattr(builtins, 'open', tracking_open)
+    records = [(i % 20, f'record {i}') for i in range(4000)]
+    counts = Pipe(records).to_partitions(
+        X[0], lambda k: tmp_path / f'{k // 10}' / f'{k}.log', serialize=X[1], max_open=3, buffer_size=100,
+    )
+    monkeypatch.undo()
+    assert counts == {k: 200 for k in range(20)}
+    assert max_seen == 3
+    assert 20 < open_count < 4000
+    assert all(f.closed for f in live)
+    for k in range(20):
+        assert Pipe.lines(tmp_path / f'{k // 10}' / f'{k}.log').list() == [f'record {i}' for i in range(k, 4000, 20)]
+
+
+def test_pipe_sink_to_partitions_reopen_compressed(tmp_path):
+    items = [(i % 5, str(i).encode() * 3) for i in range(3000)]
+    counts = Pipe(items).to_partitions(
+        X[0], str(tmp_path / '{key}.bin.gz'), serialize=X[1], binary=True, max_open=2, buffer_size=64,
+    )
+    assert counts == {k: 600 for k in range(5)}
+    for k in range(5):
+        data = gzip.decompress((tmp_path / f'{k}.bin.gz').read_bytes())
+        assert data == b''.join(item for key, item in items if key == k)
+
+
+def test_pipe_sink_to_partitions_truncates(tmp_path):
+    path = tmp_path / 'a.txt'
+    path.write_text('old\n')
+    assert Pipe(['a1', 'a2']).to_partitions(X[0], tmp_path / '{key}.txt') == {'a': 2}
+    assert path.read_text() == 'a1\na2\n'
+    assert Pipe([]).to_partitions(X[0], tmp_path / '{key}.txt') == {}
+
+
+def test_pipe_sink_to_partitions_bad(tmp_path):
+    with pytest.raises(ValueError):
+        Pipe(['a']).to_partitions(X[0], tmp_path / '{key}', max_open=0)
+    with pytest.raises(ValueError):
+        Pipe(['a']).to_partitions(X[0], tmp_path / '{key}', compression='zip')
+
+
 # Pipe.variance
 
 def test_pipe_sink_variance_population():
@@ -1769,6 +3269,66 @@ def test_pipe_sink_variance_sample():
     assert p.variance(sample=True) == pytest.approx(4.571428571428571)
 
 
+def test_pipe_sink_variance_iterator():
+    p = Pipe(iter([4, 6, 6, 6, 7, 7, 9, 11]))
+    assert p.variance() == 4
+
+
+def test_pipe_sink_variance_stable():
+    # The naive sum-of-squares formula loses all precision here
+    p = Pipe([1e9 + 4, 1e9 + 7, 1e9 + 13, 1e9 + 16])
+    assert p.variance(sample=True) == pytest.approx(30)
+
+
+def test_pipe_sink_variance_mean():
+    p = Pipe([4, 6, 6, 6, 7, 7, 9, 11])
+    assert p.variance(mean=7) == 4
+
+
+def test_pipe_sink_variance_exact():
+    from fractions import Fraction
+    p = Pipe([Fraction(1, 3), Fraction(2, 3)])
+    assert p.variance(precision='exact') == Fraction(1, 36)
+
+
+def test_pipe_sink_variance_too_few():
+    import statistics
+    with pytest.raises(statistics.StatisticsError):
+        Pipe([]).variance()
+    with pytest.raises(statistics.StatisticsError):
+        Pipe([1]).variance(sample=True)
+    with pytest.raises(statistics.StatisticsError):
+        Pipe([1]).variance(sample=True, mean=1)
+
+
+def test_pipe_sink_variance_fsum():
+    p = Pipe(iter([4, 6, 6, 6, 7, 7, 9, 11]))
+    assert p.variance(precision='fsum') == 4
+    p = Pipe([1e9 + 4, 1e9 + 7, 1e9 + 13, 1e9 + 16])
+    assert p.variance(sample=True, precision='fsum') == 30
+    assert p.variance(mean=1e9 + 10, precision='fsum') == 22.5
+
+
+def test_pipe_sink_variance_decimal():
+    p = Pipe([Decimal(1), Decimal(2), Decimal(4)])
+    assert p.variance() == statistics.pvariance([Decimal(1), Decimal(2), Decimal(4)])
+    assert isinstance(p.variance(sample=True), Decimal)
+    assert abs(p.variance(sample=True) - Decimal(7) / 3) < Decimal('1e-25')
+    assert p.variance(mean=Decimal(2)) == Decimal(5) / 3
+
+
+def test_pipe_sink_variance_fraction():
+    p = Pipe([Fraction(1), Fraction(2), Fraction(4)])
+    assert p.variance() == Fraction(14, 9)
+    assert p.variance(sample=True) == Fraction(7, 3)
+    assert isinstance(p.variance(mean=Fraction(2)), Fraction)
+
+
+def test_pipe_sink_variance_bad_precision():
+    with pytest.raises(ValueError):
+        Pipe([1]).variance(precision='sloppy')
+
+
 # Pipe.width
 
 def test_pipe_sink_width():
@@ -1776,6 +3336,15 @@ def test_pipe_sink_width():
     assert p.width() == 4
 
 
+def test_pipe_sink_width_key():
+    p = Pipe(iter([2, 5, 4, 1, 3]))
+    assert p.width(key=lambda x: -x) == -4
+
+
+def test_pipe_sink_width_default():
+    assert Pipe([]).width(default=0) == 0
+
+
 ########################################################################
 # Complex examples
 
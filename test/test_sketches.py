@@ -0,0 +1,417 @@
+import bisect
+import collections
+import os
+import pickle
+import random
+import subprocess
+import sys
+
+import pytest
+
+from seittik.utils.sketches import (
+    BloomFilter, check_error_rate, HyperLogLog, KLLSketch, mix64, SpaceSaving,
+    stable_hash,
+)
+
+
+# mix64
+
+def test_mix64_range():
+    for x in (0, 1, -1, 2**64, 2**100 + 7):
+        assert 0 <= mix64(x) < 2**64
+
+
+def test_mix64_scrambles():
+    values = [mix64(x) for x in range(1000)]
+    assert len(set(values)) == 1000
+    # Consecutive inputs shouldn't map to consecutive outputs
+    assert sorted(values) != values
+
+
+# check_error_rate
+
+@pytest.mark.parametrize('value', [0.5, 1e-9, 0.999])
+def test_check_error_rate(value):
+    check_error_rate('p', value)
+
+
+@pytest.mark.parametrize('value', [0, 1, -0.5, 1.5])
+def test_check_error_rate_bad_value(value):
+    with pytest.raises(ValueError):
+        check_error_rate('p', value)
+
+
+def test_check_error_rate_bad_type():
+    with pytest.raises(TypeError):
+        check_error_rate('p', '0.5')
+
+
+# BloomFilter
+
+def test_bloomfilter_add():
+    bf = BloomFilter(100)
+    assert bf.add('a')
+    assert not bf.add('a')
+    assert 'a' in bf
+    assert 'b' not in bf
+
+
+def test_bloomfilter_no_false_negatives():
+    bf = BloomFilter(1000)
+    for x in range(1000):
+        bf.add(x)
+    assert all(x in bf for x in range(1000))
+
+
+def test_bloomfilter_hash_collisions():
+    # hash(-1) == hash(-2) in CPython.
+    bf = BloomFilter(1000)
+    assert bf.add(-1)
+    assert bf.add(-2)
+    assert -3 not in bf
+
+
+def test_bloomfilter_false_positive_rate():
+    bf = BloomFilter(10_000, error_rate=0.01)
+    for x in range(10_000):
+        bf.add(x)
+    false_positives = sum(x in bf for x in range(10_000, 110_000))
+    # Expect about 1,000; allow generous slack
+    assert false_positives < 2_000
+
+
+def test_bloomfilter_size():
+    bf = BloomFilter(1000, error_rate=0.01)
+    assert bf.num_bits == 9586
+    assert bf.num_hashes == 7
+
+
+def test_bloomfilter_len_repr():
+    bf = BloomFilter(100)
+    for x in 'abcab':
+        bf.add(x)
+    assert len(bf) == 3
+    assert repr(bf) == '<BloomFilter (3/100)>'
+
+
+def test_bloomfilter_bad_args():
+    with pytest.raises(TypeError):
+        BloomFilter(1.5)
+    with pytest.raises(ValueError):
+        BloomFilter(0)
+    with pytest.raises(ValueError):
+        BloomFilter(100, error_rate=0)
+
+
+# stable_hash
+
+@pytest.mark.parametrize('a, b', [
+    (1, 1.0),
+    (1, True),
+    (0, False),
+    (2**70, float(2**70)),
+    ((1, 'a'), (1.0, 'a')),
+    (frozenset({1, 2, 3}), frozenset({3, 2, 1})),
+])
+def test_stable_hash_equal(a, b):
+    assert stable_hash(a) == stable_hash(b)
+
+
+@pytest.mark.parametrize('a, b', [
+    (-1, -2),
+    ('a', b'a'),
+    ('1', 1),
+    (2**64 - 1, -1),
+    (2**70, -2**70),
+    (0.5, 0.25),
+    ((1, 2), (2, 1)),
+    (('ab', 'c'), ('a', 'bc')),
+    (None, 0),
+])
+def test_stable_hash_distinct(a, b):
+    assert stable_hash(a) != stable_hash(b)
+
+
+def test_stable_hash_across_processes():
+    code = "from seittik.utils.sketches import stable_hash; print(stable_hash(('abc', b'd', 1.5)))"
+    env = {**os.environ, 'PYTHONHASHSEED': 'random'}
+    results = {
+        subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True, check=True).stdout
+        for _ in range(3)
+    }
+    assert results == {f"{stable_hash(('abc', b'd', 1.5))}\n"}
+
+
+def test_stable_hash_range():
+    for x in ('', 'abc', b'', 0, -1, 2**100, 1.5, float('inf'), None, (), frozenset()):
+        assert 0 <= stable_hash(x) < 2**64
+
+
+# HyperLogLog
+
+@pytest.mark.parametrize('n', [0, 1, 10, 1000, 100_000])
+def test_hyperloglog_estimate(n):
+    hll = HyperLogLog()
+    hll.update(f'id-{i}' for i in range(n))
+    assert abs(len(hll) - n) <= max(1, n * 4 * hll.relative_error)
+
+
+def test_hyperloglog_duplicates():
+    hll = HyperLogLog()
+    for _ in range(5):
+        hll.update(range(100))
+    assert len(hll) == 100
+
+
+def test_hyperloglog_add():
+    hll = HyperLogLog(8)
+    hll.add('a')
+    hll.add('a')
+    hll.add('b')
+    assert len(hll) == 2
+
+
+def test_hyperloglog_merge():
+    a = HyperLogLog(10)
+    a.update(range(0, 6000))
+    b = HyperLogLog(10)
+    b.update(range(3000, 9000))
+    c = HyperLogLog(10)
+    c.update(range(9000))
+    assert a | b == c
+    a.merge(b)
+    assert a == c
+
+
+def test_hyperloglog_merge_precision_mismatch():
+    with pytest.raises(ValueError):
+        HyperLogLog(10).merge(HyperLogLog(11))
+
+
+def test_hyperloglog_copy():
+    a = HyperLogLog(8)
+    a.update('abc')
+    b = a.copy()
+    b.add('d')
+    assert len(a) == 3
+    assert len(b) == 4
+
+
+def test_hyperloglog_pickle():
+    a = HyperLogLog(8)
+    a.update('abc')
+    assert pickle.loads(pickle.dumps(a)) == a
+
+
+def test_hyperloglog_repr():
+    hll = HyperLogLog(8)
+    hll.update('abc')
+    assert repr(hll) == '<HyperLogLog (~3)>'
+
+
+def test_hyperloglog_relative_error():
+    assert HyperLogLog(14).relative_error == pytest.approx(0.008125)
+
+
+@pytest.mark.parametrize('precision, exc', [(3, ValueError), (19, ValueError), (10.0, TypeError)])
+def test_hyperloglog_bad_precision(precision, exc):
+    with pytest.raises(exc):
+        HyperLogLog(precision)
+
+
+# KLLSketch
+
+def _rank_errors(kll, data, qs):
+    data = sorted(data)
+    return [abs(bisect.bisect_right(data, x) / len(data) - q) for x, q in zip(kll.quantiles(qs), qs)]
+
+
+def test_kllsketch_accuracy():
+    rng = random.Random(0)
+    data = [rng.random() for _ in range(100_000)]
+    kll = KLLSketch(rng=random.Random(1))
+    kll.update(data)
+    assert max(_rank_errors(kll, data, [0, 0.01, 0.25, 0.5, 0.95, 0.99, 1])) < 0.0165
+
+
+def test_kllsketch_bounded_size():
+    kll = KLLSketch(k=100, rng=random.Random(0))
+    kll.update(range(1_000_000))
+    assert len(kll) == 1_000_000
+    assert sum(map(len, kll.compactors)) < 3 * 100 + 20
+
+
+def test_kllsketch_small_is_exact():
+    kll = KLLSketch()
+    kll.update([5, 1, 4, 2, 3])
+    assert kll.quantiles([0, 0.5, 1]) == [1, 3, 5]
+    assert kll.rank(3) == 0.6
+    assert kll.rank(0) == 0.0
+
+
+def test_kllsketch_add():
+    kll = KLLSketch()
+    for x in (3, 1, 2):
+        kll.add(x)
+    assert kll.quantile(0.5) == 2
+
+
+def test_kllsketch_merge():
+    rng = random.Random(0)
+    data = [rng.random() for _ in range(100_000)]
+    parts = [KLLSketch(rng=random.Random(n)) for n in range(4)]
+    for n, part in enumerate(parts):
+        part.update(data[n::4])
+    merged = parts[0] | parts[1]
+    merged.merge(parts[2], parts[3])
+    assert len(merged) == 100_000
+    assert len(parts[0]) == 25_000
+    assert max(_rank_errors(merged, data, [0.01, 0.5, 0.99])) < 0.0165
+
+
+def test_kllsketch_merge_k_mismatch():
+    with pytest.raises(ValueError):
+        KLLSketch(100).merge(KLLSketch(200))
+
+
+def test_kllsketch_copy():
+    a = KLLSketch()
+    a.update([1, 2, 3])
+    b = a.copy()
+    b.add(4)
+    assert len(a) == 3
+    assert a.quantile(1) == 3
+
+
+def test_kllsketch_pickle():
+    a = KLLSketch(rng=random.Random(0))
+    a.update(range(10_000))
+    b = pickle.loads(pickle.dumps(a))
+    assert b.quantiles([0.1, 0.5]) == a.quantiles([0.1, 0.5])
+
+
+def test_kllsketch_empty():
+    kll = KLLSketch()
+    with pytest.raises(ValueError):
+        kll.quantile(0.5)
+    with pytest.raises(ValueError):
+        kll.rank(0)
+
+
+def test_kllsketch_repr():
+    kll = KLLSketch()
+    kll.update(range(5))
+    assert repr(kll) == '<KLLSketch (5)>'
+
+
+def test_kllsketch_bad_args():
+    with pytest.raises(ValueError):
+        KLLSketch(7)
+    with pytest.raises(TypeError):
+        KLLSketch(200.0)
+    with pytest.raises(ValueError):
+        KLLSketch().quantiles([-0.1])
+
+
+# SpaceSaving
+
+def test_spacesaving_exact_when_under_capacity():
+    ss = SpaceSaving(10)
+    ss.update('abaabcdbbacea')
+    assert ss.most_common() == collections.Counter('abaabcdbbacea').most_common()
+    assert ss.most_common(2) == [('a', 5), ('b', 4)]
+    assert all(ss.error(x) == 0 for x in 'abcde')
+    assert ss.total == 13
+
+
+def test_spacesaving_bounds():
+    rng = random.Random(0)
+    data = [min(int(rng.paretovariate(1.2)), 5000) for _ in range(50_000)]
+    data += [rng.randrange(10**6) + 10**7 for _ in range(50_000)]
+    rng.shuffle(data)
+    true = collections.Counter(data)
+    ss = SpaceSaving(200)
+    ss.update(data)
+    bound = len(data) / 200
+    assert len(ss) == 200
+    for obj, count in ss.most_common():
+        assert true[obj] <= count <= true[obj] + bound
+        assert count - ss.error(obj) <= true[obj]
+    for obj, count in true.items():
+        if count > bound:
+            assert obj in ss
+
+
+def test_spacesaving_add():
+    ss = SpaceSaving(2)
+    ss.add('a', 3)
+    ss.add('b')
+    ss.add('c')
+    assert ss['a'] == 3
+    assert ss['c'] == 2
+    assert ss['b'] == 0
+    assert 'b' not in ss
+    assert ss.error('c') == 1
+    assert ss.error('b') == 2
+
+
+def test_spacesaving_merge():
+    rng = random.Random(1)
+    data = [min(int(rng.paretovariate(1.2)), 5000) for _ in range(40_000)]
+    true = collections.Counter(data)
+    parts = [SpaceSaving(100) for _ in range(4)]
+    for n, part in enumerate(parts):
+        part.update(data[n::4])
+    merged = parts[0] | parts[1]
+    merged.merge(parts[2], parts[3])
+    assert merged.total == len(data)
+    assert len(merged) <= 100
+    bound = len(data) / 100
+    for obj, count in merged.most_common():
+        assert true[obj] <= count <= true[obj] + bound
+    assert [obj for obj, _ in merged.most_common(3)] == [obj for obj, _ in true.most_common(3)]
+
+
+def test_spacesaving_merge_capacity_mismatch():
+    with pytest.raises(ValueError):
+        SpaceSaving(10).merge(SpaceSaving(20))
+
+
+def test_spacesaving_copy():
+    a = SpaceSaving(5)
+    a.update('aab')
+    b = a.copy()
+    b.add('c')
+    assert len(a) == 2
+    assert len(b) == 3
+
+
+def test_spacesaving_copy_mixed_types():
+    a = SpaceSaving(3)
+    a.add('a')
+    b = a.copy()
+    b.add(5)
+    b.add(('x',))
+    b.add(2.5)
+    a.add(7)
+    assert a.total == 2
+    assert b.total == 4
+
+
+def test_spacesaving_pickle():
+    a = SpaceSaving(5)
+    a.update('aabbbcdddd')
+    assert pickle.loads(pickle.dumps(a)).most_common() == a.most_common()
+
+
+def test_spacesaving_repr():
+    ss = SpaceSaving(5)
+    ss.update('aab')
+    assert repr(ss) == '<SpaceSaving (2/5, total=3)>'
+
+
+def test_spacesaving_bad_args():
+    with pytest.raises(ValueError):
+        SpaceSaving(0)
+    with pytest.raises(ValueError):
+        SpaceSaving(5).add('a', 0)
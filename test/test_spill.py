@@ -0,0 +1,196 @@
+import collections
+import operator
+import random
+import weakref
+
+import pytest
+
+import seittik.utils.spill
+from seittik.utils.spill import batched, external_sort, spill_groups, SpillFile
+
+
+# batched
+
+def test_batched():
+    assert list(batched(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+def test_batched_empty():
+    assert list(batched([], 3)) == []
+
+
+# SpillFile
+
+def test_spillfile_roundtrip():
+    with SpillFile() as spill:
+        spill.write(range(3000))
+        spill.write(['a', ('b', 1)])
+        assert len(spill) == 3002
+        assert list(spill) == [*range(3000), 'a', ('b', 1)]
+        # Iterating again starts over
+        assert list(spill)[-1] == ('b', 1)
+    assert spill.closed
+
+
+def test_spillfile_empty():
+    with SpillFile() as spill:
+        assert list(spill) == []
+
+
+def test_spillfile_repr():
+    with SpillFile() as spill:
+        spill.write('abc')
+        assert repr(spill) == '<SpillFile (3)>'
+
+
+def test_spillfile_dir(tmp_path):
+    with SpillFile(dir=tmp_path) as spill:
+        spill.write([1, 2])
+        assert list(spill) == [1, 2]
+
+
+# external_sort
+
+@pytest.mark.parametrize('run_size', [1, 3, 10, 1000])
+@pytest.mark.parametrize('reverse', [False, True])
+def test_external_sort(run_size, reverse):
+    rng = random.Random(0)
+    data = [rng.randrange(50) for _ in range(500)]
+    assert list(external_sort(data, run_size=run_size, reverse=reverse)) == sorted(data, reverse=reverse)
+
+
+@pytest.mark.parametrize('reverse', [False, True])
+def test_external_sort_stable(reverse):
+    rng = random.Random(0)
+    data = [(rng.randrange(5), i) for i in range(200)]
+    def key(x):
+        return x[0]
+    result = list(external_sort(data, key=key, reverse=reverse, run_size=7, fan_in=3))
+    assert result == sorted(data, key=key, reverse=reverse)
+
+
+def test_external_sort_fan_in():
+    data = list(range(100, 0, -1))
+    assert list(external_sort(data, run_size=2, fan_in=2)) == list(range(1, 101))
+
+
+def test_external_sort_empty():
+    assert list(external_sort([], run_size=3)) == []
+
+
+def _track_spills(monkeypatch):
+    spills = []
+    original_init = SpillFile.__init__
+    def tracking_init(self, *args, **kwargs):
+        original_init(self, *args, **kwargs)
+        spills.append(self)
+    monkeypatch.setattr(SpillFile, '__init__', tracking_init)
+    return spills
+
+
+def test_external_sort_single_run_in_memory(monkeypatch):
+    spills = _track_spills(monkeypatch)
+    assert list(external_sort(range(10, 0, -1), run_size=10)) == list(range(1, 11))
+    assert spills == []
+    assert list(external_sort(range(11, 0, -1), run_size=10)) == list(range(1, 12))
+    assert len(spills) == 2
+
+
+class _Item:
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return self.value < other.value
+
+
+def test_external_sort_holds_one_run():
+    run_size = 10
+    live = weakref.WeakSet()
+    peak = 0
+    def items():
+        nonlocal peak
+        for x in range(100, 0, -1):
+            item = _Item(x)
+            live.add(item)
+            peak = max(peak, len(live))
+            yield item
+            del item
+    result = external_sort(items(), run_size=run_size)
+    assert [item.value for item in result] == list(range(1, 101))
+    # The run being read, plus the item looked ahead at after the first run
+    assert peak <= run_size + 1
+
+
+def test_external_sort_closes_on_early_exit(monkeypatch):
+    spills = _track_spills(monkeypatch)
+    ix = external_sort(range(100, 0, -1), run_size=10)
+    assert next(ix) == 1
+    assert spills and not any(spill.closed for spill in spills)
+    ix.close()
+    assert all(spill.closed for spill in spills)
+
+
+# spill_groups
+
+def _count_groups(data, **kwargs):
+    return dict(spill_groups(data, collections.Counter.update, operator.add, table=collections.Counter, **kwargs))
+
+
+def _list_groups(data, key, **kwargs):
+    def update(groups, items):
+        for item in items:
+            groups.setdefault(key(item), []).append(item)
+    def merge(group, other):
+        group.extend(other)
+        return group
+    return dict(spill_groups(data, update, merge, **kwargs))
+
+
+@pytest.mark.parametrize('max_groups', [1, 10, 100, 10_000])
+def test_spill_groups(max_groups):
+    rng = random.Random(0)
+    data = [rng.randrange(1000) for _ in range(20_000)]
+    assert _count_groups(data, max_groups=max_groups) == collections.Counter(data)
+
+
+def test_spill_groups_in_memory_order():
+    data = [3, 1, 3, 2, 1]
+    assert list(spill_groups(data, collections.Counter.update, operator.add, max_groups=10)) == [(3, 2), (1, 2), (2, 1)]
+
+
+def test_spill_groups_keeps_item_order():
+    data = list(range(10_000))
+    groups = _list_groups(data, lambda x: x % 97, max_groups=5)
+    assert groups == {k: list(range(k, 10_000, 97)) for k in range(97)}
+
+
+def test_spill_groups_max_depth(monkeypatch):
+    # Once partitions can't be split any further, they're aggregated in
+    # memory regardless of their size.
+    monkeypatch.setattr(seittik.utils.spill, 'MAX_GROUP_DEPTH', 1)
+    data = list(range(5000)) * 2
+    assert _count_groups(data, max_groups=10, fan_out=2) == dict.fromkeys(range(5000), 2)
+
+
+def test_spill_groups_empty():
+    assert _count_groups([], max_groups=1) == {}
+
+
+def test_spill_groups_dir(tmp_path):
+    data = list(range(5000))
+    assert _count_groups(data, max_groups=10, dir=tmp_path) == dict.fromkeys(data, 1)
+
+
+def test_spill_groups_closes_on_early_exit(monkeypatch):
+    spills = []
+    original_init = SpillFile.__init__
+    def tracking_init(self, *args, **kwargs):
+        original_init(self, *args, **kwargs)
+        spills.append(self)
+    monkeypatch.setattr(SpillFile, '__init__', tracking_init)
+    ix = spill_groups(range(5000), collections.Counter.update, operator.add, table=collections.Counter, max_groups=10)
+    next(ix)
+    assert spills and not all(spill.closed for spill in spills)
+    ix.close()
+    assert all(spill.closed for spill in spills)
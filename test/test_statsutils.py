@@ -0,0 +1,212 @@
+from decimal import Decimal
+from fractions import Fraction
+import math
+import random
+import statistics
+
+import pytest
+
+from seittik.utils.statsutils import (
+    check_precision, check_quantile, exact_sum, fsum_variance, mean,
+    PRECISIONS, quantiles, RunningStats, select, variance,
+)
+
+
+# select
+
+@pytest.mark.parametrize('data', [
+    [],
+    [5],
+    [3, 1, 4, 1, 5, 9, 2, 6, 5, 3, 5],
+    list(range(1000)),
+    list(range(1000, 0, -1)),
+    [7] * 500,
+    [random.Random(n).randrange(100) for n in range(2000)],
+])
+def test_select(data):
+    expected = sorted(data)
+    ranks = range(0, len(data), max(1, len(data) // 17))
+    assert select(data, ranks) == {r: expected[r] for r in ranks}
+
+
+def test_select_does_not_modify():
+    data = [3, 1, 2] * 100
+    copy = data.copy()
+    select(data, [0, 150, 299])
+    assert data == copy
+
+
+def test_select_out_of_range():
+    with pytest.raises(IndexError):
+        select([1, 2, 3], [3])
+    with pytest.raises(IndexError):
+        select([1, 2, 3], [-1])
+
+
+# check_quantile
+
+@pytest.mark.parametrize('q', [0, 0.5, 1])
+def test_check_quantile(q):
+    check_quantile('q', q)
+
+
+def test_check_quantile_bad():
+    with pytest.raises(ValueError):
+        check_quantile('q', 1.01)
+    with pytest.raises(TypeError):
+        check_quantile('q', None)
+
+
+# quantiles
+
+def test_quantiles():
+    assert quantiles([1, 2, 3, 5, 8, 13], [0, 0.5, 0.9, 1]) == [1, 4.0, 10.5, 13]
+
+
+def test_quantiles_single():
+    assert quantiles([42], [0, 0.5, 1]) == [42, 42, 42]
+
+
+def test_quantiles_equal_items():
+    assert quantiles(['a', 'a', 'b'], [0.25]) == ['a']
+
+
+def test_quantiles_empty():
+    with pytest.raises(ValueError):
+        quantiles([], [0.5])
+
+
+# check_precision
+
+def test_check_precision():
+    for precision in PRECISIONS:
+        check_precision('precision', precision)
+    with pytest.raises(ValueError):
+        check_precision('precision', 'sloppy')
+
+
+# mean
+
+def test_mean():
+    assert mean([1, 2, 3, 5, 8]) == 3.8
+    assert mean(iter([1, 2, 3, 5, 8])) == 3.8
+    assert mean(x for x in range(5)) == 2
+
+
+def test_mean_empty():
+    with pytest.raises(statistics.StatisticsError):
+        mean([])
+    with pytest.raises(statistics.StatisticsError):
+        mean(iter([]))
+
+
+# exact_sum
+
+def test_exact_sum_floats():
+    rng = random.Random(0)
+    data = [rng.uniform(-1e6, 1e6) for _ in range(10_000)]
+    assert exact_sum(iter(data)) == math.fsum(data)
+
+
+def test_exact_sum_types():
+    assert exact_sum([]) == 0
+    assert exact_sum([1, 2, 3]) == 6
+    assert exact_sum([Fraction(1, 3), Fraction(1, 6)]) == Fraction(1, 2)
+    assert exact_sum([Decimal('0.1'), Decimal('0.2')]) == Decimal('0.3')
+    # Unlike with `math.fsum`, ints aren't rounded to floats
+    result = exact_sum([2**60 + 1, -2**60, 0.5])
+    assert isinstance(result, float)
+    assert result == 1.5
+    assert math.fsum([2**60 + 1, -2**60, 0.5]) == 0.5
+
+
+@pytest.mark.parametrize(('data', 'expected'), [
+    ([1.5, math.inf, 2], math.inf),
+    ([1.5, -math.inf, Fraction(1, 3)], -math.inf),
+    ([math.inf, 1e308, math.inf], math.inf),
+    ([1.5, math.nan, 2], math.nan),
+    ([math.inf, 1.5, -math.inf], math.nan),
+])
+def test_exact_sum_nonfinite(data, expected):
+    result = exact_sum(iter(data))
+    assert isinstance(result, float)
+    if math.isnan(expected):
+        assert math.isnan(result)
+    else:
+        assert result == expected
+
+
+# fsum_variance
+
+def test_fsum_variance():
+    data = [4, 6, 6, 6, 7, 7, 9, 11]
+    assert fsum_variance(data) == 4
+    assert fsum_variance(data, sample=True) == pytest.approx(statistics.variance(data))
+    assert fsum_variance(data, mu=6) == statistics.pvariance(data, mu=6)
+
+
+def test_fsum_variance_too_few():
+    with pytest.raises(statistics.StatisticsError):
+        fsum_variance([])
+    with pytest.raises(statistics.StatisticsError):
+        fsum_variance([1], sample=True)
+
+
+# variance
+
+def test_variance():
+    data = [4, 6, 6, 6, 7, 7, 9, 11]
+    assert variance(iter(data)) == 4
+    assert variance(data, sample=True) == pytest.approx(statistics.variance(data))
+    assert variance(data, mu=7) == 4
+    assert variance(data, sample=True, mu=7) == pytest.approx(statistics.variance(data, xbar=7))
+
+
+# RunningStats
+
+def test_runningstats():
+    rng = random.Random(0)
+    data = [rng.gauss(100, 15) for _ in range(10_000)]
+    rs = RunningStats(data)
+    assert rs.count == 10_000
+    assert rs.mean == pytest.approx(statistics.fmean(data))
+    assert rs.variance() == pytest.approx(statistics.pvariance(data))
+    assert rs.variance(sample=True) == pytest.approx(statistics.variance(data))
+    assert rs.stdev(sample=True) == pytest.approx(statistics.stdev(data))
+
+
+def test_runningstats_merge():
+    rng = random.Random(0)
+    data = [rng.gauss(100, 15) for _ in range(10_000)]
+    parts = [RunningStats(data[n::3]) for n in range(3)]
+    merged = parts[0] | parts[1]
+    merged.merge(parts[2], RunningStats())
+    whole = RunningStats(data)
+    assert merged.count == whole.count
+    assert merged.mean == pytest.approx(whole.mean)
+    assert merged.variance() == pytest.approx(whole.variance())
+
+
+def test_runningstats_merge_into_empty():
+    rs = RunningStats()
+    rs.merge(RunningStats([1, 2, 3]))
+    assert rs == RunningStats([1, 2, 3])
+
+
+def test_runningstats_copy():
+    a = RunningStats([1, 2, 3])
+    b = a.copy()
+    b.update([4])
+    assert a.count == 3
+    assert b.count == 4
+
+
+def test_runningstats_too_few():
+    with pytest.raises(statistics.StatisticsError):
+        RunningStats().variance()
+    with pytest.raises(statistics.StatisticsError):
+        RunningStats([1]).variance(sample=True)
+
+
+def test_runningstats_repr():
+    assert repr(RunningStats([1, 2, 3])) == '<RunningStats (count=3, mean=2.0)>'
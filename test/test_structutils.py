@@ -1,5 +1,160 @@
-from seittik.utils.structutils import calc_struct_input
+import array
+import io
+import mmap
+import struct
+import sys
+
+import pytest
+
+from seittik.utils.structutils import (
+    array_layout, calc_struct_input, get_struct, iter_framed_unpack, iter_mmap_unpack,
+    pack_items, record_view, struct_fields, struct_value_count,
+)
 
 
 def test_calc_struct_input():
     assert calc_struct_input('4i6sxx') == 10
+
+
+def test_get_struct_cached():
+    assert get_struct('<i') is get_struct('<i')
+    assert get_struct('<i').size == 4
+
+
+@pytest.mark.parametrize('release', [False, True])
+def test_iter_mmap_unpack_blocks(tmp_path, release):
+    path = tmp_path / 'records.bin'
+    path.write_bytes(array.array('q', range(5000)).tobytes())
+    result = list(iter_mmap_unpack(path, 'q', release=release, block_size=1000))
+    assert result == [(i,) for i in range(5000)]
+
+
+def test_iter_mmap_unpack_unaligned_offset(tmp_path):
+    # Offsets past the first allocation boundary, not aligned to it.
+    path = tmp_path / 'records.bin'
+    path.write_bytes(bytes(range(256)) * 1000)
+    offset = mmap.ALLOCATIONGRANULARITY + 3
+    assert list(iter_mmap_unpack(path, 'B', offset=offset, limit=2)) == [(offset % 256,), ((offset + 1) % 256,)]
+
+
+def test_iter_mmap_unpack_close(tmp_path):
+    path = tmp_path / 'records.bin'
+    path.write_bytes(bytes(10_000))
+    ix = iter_mmap_unpack(path, 'B', block_size=100)
+    next(ix)
+    ix.close()
+    assert list(ix) == []
+
+
+@pytest.mark.parametrize('format_', ['<hx2i4s', '@bi', '@bid', '>?3xq', '5s', 'bhq', '@c2xh', '!10p i', ''])
+def test_struct_fields(format_):
+    data = bytes(range(1, struct.calcsize(format_) + 1))
+    fields = struct_fields(format_)
+    assert tuple(struct.unpack_from(f, data, offset)[0] for f, offset in fields) == struct.unpack(format_, data)
+
+
+def test_record_view():
+    Point = record_view('<hxh', 'x, y', 'Point')
+    assert record_view('<hxh', ('x', 'y'), 'Point') is Point
+    buf = bytearray(b'\x01\x00\xff\x02\x00' * 2)
+    p = Point(buf, 5)
+    assert (p.x, p.y) == (1, 2)
+    assert len(p) == 2
+    assert p[-1] == 2
+    assert p[:1] == (1,)
+    assert list(p) == [1, 2]
+    assert p == (1, 2)
+    assert p == Point(buf)
+    assert p != (1, 3)
+    assert p._asdict() == {'x': 1, 'y': 2}
+    buf[5] = 7
+    assert p.x == 7
+    with pytest.raises(AttributeError):
+        p.z = 3
+    with pytest.raises(TypeError):
+        hash(p)
+
+
+@pytest.mark.parametrize('fields', ['x', 'x y z', 'x x', 'x _y', 'x 1y'])
+def test_record_view_bad_fields(fields):
+    with pytest.raises(ValueError):
+        record_view('<hh', fields)
+
+
+@pytest.mark.parametrize(('format_', 'count'), [('', 0), ('<i', 1), ('4i6sxx', 5), ('<3s2p?', 3)])
+def test_struct_value_count(format_, count):
+    assert struct_value_count(format_) == count
+
+
+def test_array_layout():
+    little = sys.byteorder == 'little'
+    assert array_layout('<2I') == ('I', not little)
+    assert array_layout('>q') == ('l', little)
+    assert array_layout('=b') == ('b', False)
+    assert array_layout('3d') == ('d', False)
+    for format_ in ('', '<f', '<e', '<?', '<2s', '<ihx', '<ih', '@hi'):
+        assert array_layout(format_) is None
+
+
+@pytest.mark.parametrize('format_', ['<i', '>2H', '<hd', '>3s', '<qx'])
+def test_pack_items_file_blocks(format_):
+    st = struct.Struct(format_)
+    count = struct_value_count(format_)
+    records = [
+        tuple(bytes([i]) * 3 if f.endswith('s') else i for f, _ in struct_fields(format_))
+        for i in range(100)
+    ]
+    items = [v for record in records for v in record]
+    expected = b''.join(st.pack(*record) for record in records)
+    assert len(items) == count * 100
+    assert pack_items(items, format_) == expected
+    f = io.BytesIO()
+    assert pack_items(iter(items), format_, file=f, block_size=st.size * 7 + 1) == len(expected)
+    assert f.getvalue() == expected
+
+
+def test_iter_framed_unpack_reuses_partial():
+    data = struct.pack('<10h', *range(10))
+    chunks = [data[:3], data[3:4], data[4:15], data[15:]]
+    assert list(iter_framed_unpack(chunks, '<h')) == [(i,) for i in range(10)]
+    # Views of whole records share their chunk; split records get a copy.
+    View = record_view('<h', 'n')
+    chunk = bytearray(data[3:])
+    views = list(iter_framed_unpack([data[:3], chunk], '<h', view_class=View))
+    assert [v.n for v in views] == list(range(10))
+    chunk[-2:] = b'\x07\x00'
+    assert views[-1].n == 7
+
+
+def test_pack_items_file_streams_arrays():
+    consumed = 0
+    def items():
+        nonlocal consumed
+        for i in range(10000):
+            consumed += 1
+            yield i
+    writes = []
+    f = io.BytesIO()
+    f.write = lambda data: writes.append((consumed, bytes(data)))
+    assert pack_items(items(), '>2i', file=f, block_size=4096) == 40000
+    # Each block is written as soon as it fills, not once the items run out.
+    assert [n for n, _ in writes] == [1024 * (i + 1) for i in range(9)] + [10000]
+    assert all(len(data) <= 4096 for _, data in writes)
+    assert b''.join(data for _, data in writes) == struct.pack('>10000i', *range(10000))
+
+
+def test_pack_items_file_array_source():
+    arr = array.array('d', map(float, range(1000)))
+    writes = []
+    f = io.BytesIO()
+    f.write = lambda data: writes.append(bytes(data))
+    assert pack_items(arr, '>d', file=f, block_size=800) == 8000
+    assert len(writes) == 10
+    assert b''.join(writes) == struct.pack('>1000d', *arr)
+    assert arr[1] == 1.0
+
+
+def test_pack_items_array_fallback():
+    with pytest.raises(struct.error):
+        pack_items([1, 2, 2**40], '<i', file=io.BytesIO(), block_size=4)
+    assert pack_items([True, 2], '<2b') == b'\x01\x02'
@@ -0,0 +1,115 @@
+import pytest
+
+from seittik.utils.windows import (
+    chunks, rolling_max, rolling_mean, rolling_min, rolling_sum, rolling_variance, windows, WindowView,
+)
+
+
+# WindowView
+
+def test_windowview():
+    view = WindowView([4, 5, 3], 2)
+    assert list(view) == [3, 4, 5]
+    assert len(view) == 3
+    assert [view[i] for i in range(-3, 3)] == [3, 4, 5, 3, 4, 5]
+    assert view[::2] == [3, 5]
+    assert 4 in view
+    assert list(reversed(view)) == [5, 4, 3]
+    assert repr(view) == 'WindowView([3, 4, 5])'
+
+
+def test_windowview_index_error():
+    view = WindowView([1, 2])
+    with pytest.raises(IndexError):
+        view[2]
+    with pytest.raises(IndexError):
+        view[-3]
+
+
+def test_windowview_reflects_buffer():
+    buf = [1, 2, 3]
+    view = WindowView(buf, 1)
+    buf[1] = 7
+    assert list(view) == [7, 3, 1]
+
+
+# windows
+
+@pytest.mark.parametrize('length', range(12))
+@pytest.mark.parametrize('n', [1, 2, 3, 5])
+@pytest.mark.parametrize('step', [1, 2, 3, 5, 8])
+def test_windows(length, n, step):
+    data = list(range(length))
+    expected = [tuple(data[i:i + n]) for i in range(0, length - n + 1, step)]
+    assert [tuple(w) for w in windows(iter(data), n, step)] == expected
+
+
+def test_windows_shares_buffer():
+    ix = windows(range(5), 3)
+    first = next(ix)
+    assert list(first) == [0, 1, 2]
+    next(ix)
+    assert list(first) == [3, 1, 2]
+
+
+# rolling_*
+
+@pytest.mark.parametrize('func', [rolling_max, rolling_mean, rolling_min, rolling_sum, rolling_variance])
+def test_rolling_short(func):
+    assert list(func([1, 2], 3)) == []
+
+
+def test_rolling_min_max_ties():
+    data = [2, 2, 1, 1, 2, 2]
+    assert list(rolling_min(data, 2)) == [2, 1, 1, 1, 2]
+    assert list(rolling_max(data, 2)) == [2, 2, 1, 2, 2]
+
+
+def test_rolling_mean():
+    assert list(rolling_mean([1, 2, 3, 4], 2)) == [1.5, 2.5, 3.5]
+
+
+def test_rolling_variance_constant():
+    result = list(rolling_variance([0.1] * 50, 7))
+    assert len(result) == 44
+    assert all(0 <= v < 1e-15 for v in result)
+
+
+def test_rolling_sum_exact_types():
+    from fractions import Fraction
+    data = [Fraction(1, 3)] * 5
+    assert list(rolling_sum(data, 3)) == [Fraction(1)] * 3
+
+
+# chunks
+
+def chunks_model(data, n, step, fillvalue, fair):
+    # Chunks start every `step` items. With a step of 1, only a short
+    # source yields a partial chunk; otherwise, the first partial chunk is
+    # the last.
+    ret = []
+    for i in range(0, len(data), step):
+        chunk = data[i:i + n]
+        if len(chunk) < n:
+            if step == 1 and ret:
+                break
+            if not fair:
+                if fillvalue is not None:
+                    chunk = chunk + [fillvalue] * (n - len(chunk))
+                ret.append(tuple(chunk))
+            break
+        ret.append(tuple(chunk))
+    return ret
+
+
+@pytest.mark.parametrize('length', range(12))
+@pytest.mark.parametrize('n', [1, 2, 3, 5])
+@pytest.mark.parametrize('step', [1, 2, 3, 5, 8])
+@pytest.mark.parametrize('fillvalue, fair', [(None, False), ('x', False), (None, True)])
+def test_chunks(length, n, step, fillvalue, fair):
+    data = list(range(length))
+    kwargs = {'fair': fair}
+    if fillvalue is not None:
+        kwargs['fillvalue'] = fillvalue
+    expected = chunks_model(data, n, step, fillvalue, fair)
+    assert list(chunks(iter(data), n, step, **kwargs)) == expected